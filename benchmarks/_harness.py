@@ -0,0 +1,227 @@
+"""Shared harness for end-to-end benchmarks.
+
+Workloads run against a real :class:`viser.ViserServer`, with headless
+:class:`viser.infra.WebsockClient` instances standing in for browsers. Clients run
+on their own event loop thread in the same process, so timestamps on both sides
+are directly comparable.
+
+Latency is measured with marker labels: after each step of a workload, a label is
+added to the scene, and we record how long it takes every client to receive it.
+Labels aren't prioritized by the server, so they arrive after everything that was
+queued before them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import dataclasses
+import importlib.metadata
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as onp
+import psutil
+
+import viser
+from viser import _messages, infra
+
+_MARKER_NAME = "/_benchmark_marker"
+
+
+def _percentiles_ms(values: List[float]) -> Dict[str, float]:
+    if len(values) == 0:
+        return {}
+    array = onp.asarray(values) * 1000.0
+    return {
+        "p50": float(onp.percentile(array, 50)),
+        "p95": float(onp.percentile(array, 95)),
+        "max": float(onp.max(array)),
+    }
+
+
+class _PeakRssSampler:
+    """Samples the resident set size of this process in a background thread."""
+
+    def __init__(self, interval_sec: float = 0.02) -> None:
+        self._process = psutil.Process()
+        self._interval_sec = interval_sec
+        self._stop = threading.Event()
+        self.start_rss = self._process.memory_info().rss
+        self.peak_rss = self.start_rss
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_sec):
+            self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
+
+
+@dataclasses.dataclass
+class BenchmarkSession:
+    """A running server with connected headless clients."""
+
+    server: viser.ViserServer
+    clients: List[infra.WebsockClient]
+    _event_loop: asyncio.AbstractEventLoop
+    _marker_times: Dict[int, List[float]] = dataclasses.field(default_factory=dict)
+    _marker_lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    _marker_count: int = 0
+    _latencies: List[float] = dataclasses.field(default_factory=list)
+    _start_time: float = 0.0
+
+    def elapsed(self) -> float:
+        """Seconds since the workload was started."""
+        return time.perf_counter() - self._start_time
+
+    def run_on_clients(self, coroutine: Any, timeout_sec: float = 120.0) -> Any:
+        """Run a coroutine on the clients' event loop, and wait for the result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._event_loop).result(
+            timeout_sec
+        )
+
+    def _on_marker(self, message: _messages.LabelMessage) -> None:
+        with self._marker_lock:
+            self._marker_times.setdefault(int(message.text), []).append(
+                time.perf_counter()
+            )
+
+    def sync(self, timeout_sec: float = 120.0) -> float:
+        """Add a marker to the scene, and block until every client has received it.
+        Returns the latency from queueing the marker to the slowest client receiving
+        it, which is also recorded for the final results."""
+        marker_index = self._marker_count
+        self._marker_count += 1
+        start_time = time.perf_counter()
+        self.server.scene.add_label(_MARKER_NAME, text=str(marker_index))
+        while True:
+            with self._marker_lock:
+                times = self._marker_times.get(marker_index, [])
+                if len(times) >= len(self.clients):
+                    latency = max(times) - start_time
+                    break
+            if time.perf_counter() - start_time > timeout_sec:
+                raise TimeoutError(f"Clients didn't receive marker {marker_index}.")
+            time.sleep(0.0005)
+        self._latencies.append(latency)
+        return latency
+
+
+def run_benchmark(
+    name: str,
+    workload: Callable[[BenchmarkSession], Dict[str, Any]],
+    num_clients: int,
+    params: Dict[str, Any],
+    port: int = 8110,
+    json_output: bool = False,
+    output_path: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Run a workload against a fresh server, and report results.
+
+    Args:
+        name: Name of the benchmark.
+        workload: Function that drives the server. Should call `session.sync()`
+            after each step, and return workload-specific results.
+        num_clients: Number of headless clients to connect.
+        params: Workload parameters, included in the results.
+        port: Port for the server.
+        json_output: Print results as JSON instead of text.
+        output_path: If set, results are also appended to this file as a line of
+            JSON. Useful for tracking results across versions.
+
+    Returns:
+        Dictionary of results.
+    """
+    # Keep stdout clean for JSON results.
+    with contextlib.redirect_stdout(sys.stderr):
+        server = viser.ViserServer(port=port, verbose=False)
+
+    # Clients get their own event loop, so they keep receiving while the workload
+    # blocks the main thread.
+    event_loop = asyncio.new_event_loop()
+    threading.Thread(target=event_loop.run_forever, daemon=True).start()
+    session = BenchmarkSession(server, [], event_loop)
+
+    async def connect_clients() -> None:
+        for _ in range(num_clients):
+            client = infra.WebsockClient(
+                f"ws://127.0.0.1:{server.get_port()}", _messages.Message, mirror=False
+            )
+            client.register_handler(_messages.LabelMessage, session._on_marker)
+            await client.connect()
+
+            # Browsers send the camera state right after connecting. The server
+            # considers clients to be connected after the first camera message.
+            await client.send(
+                _messages.ViewerCameraMessage(
+                    wxyz=(1.0, 0.0, 0.0, 0.0),
+                    position=(0.0, 0.0, 3.0),
+                    fov=1.0,
+                    aspect=16.0 / 9.0,
+                    look_at=(0.0, 0.0, 0.0),
+                    up_direction=(0.0, 0.0, 1.0),
+                )
+            )
+            session.clients.append(client)
+
+    session.run_on_clients(connect_clients())
+    while len(server.get_clients()) < num_clients:
+        time.sleep(0.01)
+    session.sync()
+    session._latencies.clear()
+
+    bytes_before = sum(client.bytes_received for client in session.clients)
+    messages_before = sum(client.messages_received for client in session.clients)
+    rss_sampler = _PeakRssSampler()
+    session._start_time = time.perf_counter()
+    workload_results = workload(session)
+    elapsed = session.elapsed()
+    rss_sampler.stop()
+    bytes_received = (
+        sum(client.bytes_received for client in session.clients) - bytes_before
+    )
+    messages_received = (
+        sum(client.messages_received for client in session.clients) - messages_before
+    )
+    metrics = server.get_metrics()
+
+    async def close_clients() -> None:
+        for client in session.clients:
+            await client.close()
+
+    session.run_on_clients(close_clients())
+    event_loop.call_soon_threadsafe(event_loop.stop)
+    server.stop()
+
+    results = {
+        "benchmark": name,
+        "viser_version": importlib.metadata.version("viser"),
+        "params": dict(params, num_clients=num_clients),
+        "seconds": elapsed,
+        "messages_received_per_sec": messages_received / elapsed,
+        "bytes_received_per_sec": bytes_received / elapsed,
+        "latency_ms": _percentiles_ms(session._latencies),
+        "peak_rss_mb": rss_sampler.peak_rss / 1024**2,
+        "rss_growth_mb": (rss_sampler.peak_rss - rss_sampler.start_rss) / 1024**2,
+        "serialization_seconds": metrics.serialization_seconds_total,
+        "max_event_loop_lag_ms": metrics.max_event_loop_lag_seconds * 1000.0,
+        **workload_results,
+    }
+    if output_path is not None:
+        with output_path.open("a") as f:
+            f.write(json.dumps(results) + "\n")
+    if json_output:
+        print(json.dumps(results))
+    else:
+        for k, v in results.items():
+            print(f"{k:>28}: {v}")
+    return results
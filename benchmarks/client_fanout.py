@@ -0,0 +1,141 @@
+"""Client fan-out
+
+Connects many headless clients to a websocket server, broadcasts messages, and
+measures how long it takes for every client to receive all of them.
+
+Usage:
+    python benchmarks/client_fanout.py --num-clients 200
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+import numpy as onp
+import tyro
+
+from viser import _messages
+from viser.infra import WebsockClient, WebsockServer
+
+
+async def run(
+    server: WebsockServer,
+    num_clients: int,
+    num_messages: int,
+    num_points: int,
+    timeout_sec: float,
+) -> tuple[float, int]:
+    """Broadcast messages to `num_clients` clients. Returns seconds until every
+    client has received the final message, and total bytes received."""
+    clients = [
+        WebsockClient(f"ws://127.0.0.1:{server._port}", _messages.Message, mirror=False)
+        for _ in range(num_clients)
+    ]
+    done_events = [asyncio.Event() for _ in clients]
+    for client, done_event in zip(clients, done_events):
+        # Each client waits for a sentinel message, sent after everything else.
+        # Labels aren't prioritized, so they can't skip ahead of the point cloud.
+        client.register_handler(
+            _messages.LabelMessage,
+            lambda message, done_event=done_event: done_event.set(),
+        )
+    await asyncio.gather(*[client.connect() for client in clients])
+
+    # Clients send camera messages on connect, like the browser client.
+    await asyncio.gather(
+        *[
+            client.send(
+                _messages.ViewerCameraMessage(
+                    wxyz=(1.0, 0.0, 0.0, 0.0),
+                    position=(0.0, 0.0, 1.0),
+                    fov=1.0,
+                    aspect=1.0,
+                    look_at=(0.0, 0.0, 0.0),
+                    up_direction=(0.0, 0.0, 1.0),
+                )
+            )
+            for client in clients
+        ]
+    )
+
+    start_time = time.perf_counter()
+    points = onp.random.uniform(-1.0, 1.0, size=(num_points, 3)).astype(onp.float32)
+    server.queue_message(
+        _messages.PointCloudMessage(
+            name="/points",
+            points=points,
+            colors=onp.zeros((3,), dtype=onp.uint8),
+            point_size=0.01,
+            point_ball_norm=float("inf"),
+            precision="float32",
+            points_bbox=None,
+            color_palette=None,
+        )
+    )
+    for i in range(num_messages):
+        server.queue_message(
+            _messages.SetPositionMessage(f"/node/{i}", (float(i), 0.0, 0.0))
+        )
+    server.queue_message(_messages.LabelMessage("/sentinel", "done"))
+    await asyncio.wait_for(
+        asyncio.gather(*[done_event.wait() for done_event in done_events]),
+        timeout=timeout_sec,
+    )
+    elapsed = time.perf_counter() - start_time
+    bytes_received = sum(client.bytes_received for client in clients)
+
+    await asyncio.gather(*[client.close() for client in clients])
+    return elapsed, bytes_received
+
+
+def main(
+    num_clients: int = 50,
+    num_messages: int = 1000,
+    num_points: int = 100_000,
+    timeout_sec: float = 120.0,
+    json_output: bool = False,
+) -> None:
+    """Run the benchmark.
+
+    Args:
+        num_clients: Number of simulated clients.
+        num_messages: Number of small messages to broadcast.
+        num_points: Number of points in a broadcasted point cloud.
+        timeout_sec: Give up if clients haven't received everything after this long.
+        json_output: Print results as JSON instead of text.
+    """
+    server = WebsockServer(
+        "127.0.0.1",
+        8099,
+        _messages.Message,
+        verbose=False,
+        client_api_version=1,
+        zero_copy_min_bytes=64 * 1024,
+    )
+    server.start()
+    elapsed, bytes_received = asyncio.run(
+        run(server, num_clients, num_messages, num_points, timeout_sec)
+    )
+    server.stop()
+
+    delivered = num_clients * (num_messages + 2)
+    results = {
+        "benchmark": "client_fanout",
+        "num_clients": num_clients,
+        "num_messages": num_messages,
+        "num_points": num_points,
+        "seconds": elapsed,
+        "messages_delivered_per_sec": delivered / elapsed,
+        "bytes_received": bytes_received,
+    }
+    if json_output:
+        print(json.dumps(results))
+    else:
+        for k, v in results.items():
+            print(f"{k:>28}: {v}")
+
+
+if __name__ == "__main__":
+    tyro.cli(main)
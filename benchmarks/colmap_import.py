@@ -0,0 +1,125 @@
+"""COLMAP import
+
+Sends a sparse reconstruction the way the COLMAP visualizer example does: one large
+point cloud, followed by a frame and image frustum for every registered camera. Uses
+synthetic data unless a COLMAP sparse model directory is passed in.
+
+Usage:
+    python benchmarks/colmap_import.py --num-cameras 300
+    python benchmarks/colmap_import.py --colmap-path examples/assets/colmap_garden/sparse/0
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as onp
+import tyro
+from _harness import BenchmarkSession, run_benchmark
+
+import viser.transforms as tf
+
+
+def load_scene(
+    colmap_path: Optional[Path], num_cameras: int, num_points: int
+) -> Tuple[onp.ndarray, onp.ndarray, onp.ndarray, onp.ndarray]:
+    """Returns points, colors, camera orientations (wxyz), and camera positions."""
+    if colmap_path is not None:
+        from viser.extras.colmap import read_images_binary, read_points3d_binary
+
+        images = read_images_binary(colmap_path / "images.bin")
+        points3d = read_points3d_binary(colmap_path / "points3D.bin")
+        points = onp.array([p.xyz for p in points3d.values()], dtype=onp.float32)
+        colors = onp.array([p.rgb for p in points3d.values()], dtype=onp.uint8)
+        T_world_cameras = [
+            tf.SE3.from_rotation_and_translation(
+                tf.SO3(image.qvec), image.tvec
+            ).inverse()
+            for image in images.values()
+        ]
+        wxyzs = onp.array([T.rotation().wxyz for T in T_world_cameras])
+        positions = onp.array([T.translation() for T in T_world_cameras])
+        return points, colors, wxyzs, positions
+
+    rng = onp.random.default_rng(0)
+    points = rng.normal(size=(num_points, 3)).astype(onp.float32)
+    colors = rng.integers(0, 256, size=(num_points, 3), dtype=onp.uint8)
+    angles = onp.linspace(0.0, 2.0 * onp.pi, num_cameras, endpoint=False)
+    positions = onp.stack(
+        [3.0 * onp.cos(angles), 3.0 * onp.sin(angles), onp.zeros_like(angles)], axis=-1
+    )
+    wxyzs = onp.array([tf.SO3.from_z_radians(a).wxyz for a in angles])
+    return points, colors, wxyzs, positions
+
+
+def main(
+    colmap_path: Optional[Path] = None,
+    num_cameras: int = 200,
+    num_points: int = 200_000,
+    image_size: int = 96,
+    num_clients: int = 4,
+    port: int = 8110,
+    json_output: bool = False,
+    output_path: Optional[Path] = None,
+) -> None:
+    """Run the benchmark.
+
+    Args:
+        colmap_path: Optional path to a COLMAP sparse model directory, containing
+            `images.bin` and `points3D.bin`. Synthetic data is used if not set.
+        num_cameras: Number of synthetic cameras.
+        num_points: Number of synthetic points.
+        image_size: Side length of the image shown in each camera frustum.
+        num_clients: Number of headless clients.
+        port: Port for the server.
+        json_output: Print results as JSON instead of text.
+        output_path: Optional JSONL file to append results to.
+    """
+    points, colors, wxyzs, positions = load_scene(colmap_path, num_cameras, num_points)
+    image = onp.random.default_rng(0).integers(
+        0, 256, size=(image_size, image_size, 3), dtype=onp.uint8
+    )
+
+    def workload(session: BenchmarkSession) -> Dict[str, Any]:
+        server = session.server
+        server.scene.add_point_cloud(
+            "/colmap/pcd", points=points, colors=colors, point_size=0.02
+        )
+        session.sync()
+        for i, (wxyz, position) in enumerate(zip(wxyzs, positions)):
+            server.scene.add_frame(
+                f"/colmap/frame_{i}",
+                wxyz=wxyz,
+                position=position,
+                axes_length=0.1,
+                axes_radius=0.005,
+            )
+            server.scene.add_camera_frustum(
+                f"/colmap/frame_{i}/frustum",
+                fov=1.0,
+                aspect=1.0,
+                scale=0.15,
+                image=image,
+            )
+        session.sync()
+        return {"cameras_per_sec": len(wxyzs) / session.elapsed()}
+
+    run_benchmark(
+        "colmap_import",
+        workload,
+        num_clients=num_clients,
+        params={
+            "colmap_path": None if colmap_path is None else str(colmap_path),
+            "num_cameras": len(wxyzs),
+            "num_points": len(points),
+            "image_size": image_size,
+        },
+        port=port,
+        json_output=json_output,
+        output_path=output_path,
+    )
+
+
+if __name__ == "__main__":
+    tyro.cli(main)
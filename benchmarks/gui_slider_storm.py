@@ -0,0 +1,143 @@
+"""GUI slider storm
+
+Floods the server with slider updates in both directions. First, the server
+writes new values to a panel of sliders as fast as it can, as a script that
+animates its GUI would. Then, every client drags sliders at once by sending
+`GuiUpdateMessage`s, and we measure how long it takes for the last update from
+each burst to reach its `on_update()` callback.
+
+Usage:
+    python benchmarks/gui_slider_storm.py --num-sliders 50 --num-clients 8
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as onp
+import tyro
+from _harness import BenchmarkSession, run_benchmark
+
+import viser
+from viser import _messages
+
+
+def main(
+    num_sliders: int = 50,
+    num_server_steps: int = 200,
+    num_client_bursts: int = 50,
+    updates_per_burst: int = 20,
+    num_clients: int = 8,
+    port: int = 8110,
+    json_output: bool = False,
+    output_path: Optional[Path] = None,
+) -> None:
+    """Run the benchmark.
+
+    Args:
+        num_sliders: Number of sliders in the GUI panel.
+        num_server_steps: Number of times the server updates every slider.
+        num_client_bursts: Number of bursts of client-side updates.
+        updates_per_burst: Updates that each client sends to a slider per burst.
+        num_clients: Number of headless clients.
+        port: Port for the server.
+        json_output: Print results as JSON instead of text.
+        output_path: Optional JSONL file to append results to.
+    """
+
+    def workload(session: BenchmarkSession) -> Dict[str, Any]:
+        server = session.server
+        sliders = [
+            server.gui.add_slider(
+                f"Slider {i}", min=0.0, max=1.0, step=0.001, initial_value=0.0
+            )
+            for i in range(num_sliders)
+        ]
+        session.sync()
+
+        # Server -> clients.
+        server_start = time.perf_counter()
+        for t in range(num_server_steps):
+            for i, slider in enumerate(sliders):
+                slider.value = (t * num_sliders + i) % 1000 / 1000.0
+            session.sync()
+        server_updates_per_sec = (
+            num_server_steps * num_sliders / (time.perf_counter() - server_start)
+        )
+
+        # Clients -> server. Each burst ends with a unique value, so we can tell when
+        # the server has processed it.
+        final_value_received = threading.Event()
+        final_value = [-1.0]
+
+        @sliders[0].on_update
+        def _(event: viser.GuiEvent) -> None:
+            if sliders[0].value == final_value[0]:
+                final_value_received.set()
+
+        callback_latencies: List[float] = []
+        client_start = time.perf_counter()
+        for burst in range(num_client_bursts):
+
+            async def send_burst() -> None:
+                for j in range(updates_per_burst):
+                    for client in session.clients:
+                        await client.send(
+                            _messages.GuiUpdateMessage(
+                                sliders[j % num_sliders]._impl.id,
+                                {"value": j / updates_per_burst / 2.0},
+                            )
+                        )
+
+            final_value_received.clear()
+            final_value[0] = 0.5 + burst / num_client_bursts / 2.0
+            burst_start = time.perf_counter()
+            session.run_on_clients(send_burst())
+            session.run_on_clients(
+                session.clients[-1].send(
+                    _messages.GuiUpdateMessage(
+                        sliders[0]._impl.id, {"value": final_value[0]}
+                    )
+                )
+            )
+            if not final_value_received.wait(timeout=60.0):
+                raise TimeoutError("Server didn't process slider updates.")
+            callback_latencies.append(time.perf_counter() - burst_start)
+        client_updates_per_sec = (
+            num_client_bursts
+            * (updates_per_burst * num_clients + 1)
+            / (time.perf_counter() - client_start)
+        )
+
+        latencies_ms = onp.asarray(callback_latencies) * 1000.0
+        return {
+            "server_updates_per_sec": server_updates_per_sec,
+            "client_updates_per_sec": client_updates_per_sec,
+            "burst_callback_latency_ms": {
+                "p50": float(onp.percentile(latencies_ms, 50)),
+                "p95": float(onp.percentile(latencies_ms, 95)),
+                "max": float(onp.max(latencies_ms)),
+            },
+        }
+
+    run_benchmark(
+        "gui_slider_storm",
+        workload,
+        num_clients=num_clients,
+        params={
+            "num_sliders": num_sliders,
+            "num_server_steps": num_server_steps,
+            "num_client_bursts": num_client_bursts,
+            "updates_per_burst": updates_per_burst,
+        },
+        port=port,
+        json_output=json_output,
+        output_path=output_path,
+    )
+
+
+if __name__ == "__main__":
+    tyro.cli(main)
@@ -0,0 +1,158 @@
+"""Message serialization throughput
+
+Measures how many messages per second can be converted to serializable dicts, keyed
+for redundancy culling, and msgpack-encoded. Compares compiled per-class serializers
+against the reflective, type hint-driven path.
+
+Also measures the per-message cost of queueing: computing redundancy keys and
+persistent scopes, and pushing into a persistent message buffer, which culls and
+indexes by both.
+
+Usage:
+    python benchmarks/message_serialization.py --num-messages 200000
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Callable, Dict, List
+
+import msgspec
+import numpy as onp
+import tyro
+
+from viser import _messages
+from viser.infra._async_message_buffer import AsyncMessageBuffer
+
+
+def reflective_redundancy_key(message: _messages.Message) -> str:
+    """Reference implementation of the default redundancy key, which looks up
+    attributes on every call."""
+    parts = [type(message).__name__]
+    for k in ("name", "id"):
+        value = getattr(message, k, None)
+        if value is not None:
+            parts.append(value)
+    return "_".join(parts)
+
+
+def make_messages(num_messages: int) -> Dict[str, List[_messages.Message]]:
+    """High-rate message types, as sent when dragging gizmos or sliders."""
+    return {
+        "SetPositionMessage": [
+            _messages.SetPositionMessage(f"/node/{i % 100}", (i * 0.1, 0.0, 1.0))
+            for i in range(num_messages)
+        ],
+        "SetOrientationMessage": [
+            _messages.SetOrientationMessage(f"/node/{i % 100}", (1.0, 0.0, 0.0, 0.0))
+            for i in range(num_messages)
+        ],
+        "GuiUpdateMessage": [
+            _messages.GuiUpdateMessage(f"slider-{i % 10}", {"value": float(i)})
+            for i in range(num_messages)
+        ],
+    }
+
+
+def run_trial(
+    messages: List[_messages.Message],
+    serialize: Callable[[_messages.Message], dict],
+    redundancy_key: Callable[[_messages.Message], str],
+) -> float:
+    """Serialize, key, and encode each message. Returns messages per second."""
+    start_time = time.perf_counter()
+    for message in messages:
+        redundancy_key(message)
+        msgspec.msgpack.encode(serialize(message))
+    return len(messages) / (time.perf_counter() - start_time)
+
+
+def run_keying_trial(messages: List[_messages.Message]) -> float:
+    """Compute redundancy keys and persistent scopes for each message. Returns
+    messages per second."""
+    start_time = time.perf_counter()
+    for message in messages:
+        message.redundancy_keys()
+        message.persistent_scopes()
+    return len(messages) / (time.perf_counter() - start_time)
+
+
+def run_buffer_trial(messages: List[_messages.Message]) -> float:
+    """Push each message into a fresh persistent buffer. Returns messages per
+    second."""
+    event_loop = asyncio.new_event_loop()
+    try:
+        buffer = AsyncMessageBuffer(event_loop, persistent_messages=True)
+        start_time = time.perf_counter()
+        for message in messages:
+            buffer.push(message)
+        return len(messages) / (time.perf_counter() - start_time)
+    finally:
+        event_loop.close()
+
+
+def main(
+    num_messages: int = 100_000,
+    trials: int = 5,
+    json_output: bool = False,
+) -> None:
+    """Run the benchmark.
+
+    Args:
+        num_messages: Messages per message type, per trial.
+        trials: Number of trials per configuration; the median is reported.
+        json_output: Print results as JSON instead of a table.
+    """
+    implementations = {
+        "reflective": (
+            _messages.Message._as_serializable_dict_reflective,
+            reflective_redundancy_key,
+        ),
+        "compiled": (
+            _messages.Message.as_serializable_dict,
+            _messages.Message.redundancy_key,
+        ),
+    }
+    results: Dict[str, Dict[str, float]] = {}
+    for message_type, messages in make_messages(num_messages).items():
+        results[message_type] = {}
+        for impl_name, (serialize, redundancy_key) in implementations.items():
+            rates = [
+                run_trial(messages, serialize, redundancy_key) for _ in range(trials)
+            ]
+            results[message_type][impl_name] = float(onp.median(rates))
+        results[message_type]["keying"] = float(
+            onp.median([run_keying_trial(messages) for _ in range(trials)])
+        )
+        results[message_type]["buffer_push"] = float(
+            onp.median([run_buffer_trial(messages) for _ in range(trials)])
+        )
+
+    if json_output:
+        print(
+            json.dumps(
+                {
+                    "benchmark": "message_serialization",
+                    "num_messages": num_messages,
+                    "messages_per_sec": results,
+                }
+            )
+        )
+    else:
+        print(
+            f"{'message type':>22} {'reflective':>14} {'compiled':>14} {'speedup':>8}"
+            f" {'keying':>14} {'buffer push':>14}"
+        )
+        for message_type, rates in results.items():
+            print(
+                f"{message_type:>22} {rates['reflective']:>14,.0f}"
+                f" {rates['compiled']:>14,.0f}"
+                f" {rates['compiled'] / rates['reflective']:>7.2f}x"
+                f" {rates['keying']:>14,.0f} {rates['buffer_push']:>14,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    tyro.cli(main)
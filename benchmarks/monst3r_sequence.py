@@ -0,0 +1,148 @@
+"""MonST3R-style dynamic sequence
+
+Streams a dynamic reconstruction frame by frame, like the MonST3R visualizer does:
+each timestep adds a dense colored point cloud and a camera frustum with its image,
+and toggles visibility so only the current frame is shown. Synthetic data is used,
+with sizes that match a downsampled MonST3R output. With `--batched`, the whole
+sequence is loaded up front using the batched scene node constructors instead.
+
+Usage:
+    python benchmarks/monst3r_sequence.py --num-frames 60 --num-clients 4
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Literal, Optional, Sequence
+
+import numpy as onp
+import tyro
+from _harness import BenchmarkSession, run_benchmark
+
+import viser
+
+
+def main(
+    num_frames: int = 60,
+    points_per_frame: int = 100_000,
+    image_size: int = 128,
+    position_precision: Literal["float32", "float16", "int16"] = "float32",
+    batched: bool = False,
+    num_clients: int = 4,
+    port: int = 8110,
+    json_output: bool = False,
+    output_path: Optional[Path] = None,
+) -> None:
+    """Run the benchmark.
+
+    Args:
+        num_frames: Number of timesteps in the sequence.
+        points_per_frame: Points in each frame's point cloud.
+        image_size: Side length of the image shown in each camera frustum.
+        position_precision: Point position encoding. Ignored if `batched` is set.
+        batched: Add all frames at once, via `add_frames()`, `add_point_clouds()`,
+            and `add_camera_frustums()`.
+        num_clients: Number of headless clients.
+        port: Port for the server.
+        json_output: Print results as JSON instead of text.
+        output_path: Optional JSONL file to append results to.
+    """
+    rng = onp.random.default_rng(0)
+
+    def make_frame(t: int) -> tuple[onp.ndarray, onp.ndarray, onp.ndarray]:
+        # Points drift over time, like a dynamic scene.
+        points = rng.normal(size=(points_per_frame, 3)).astype(onp.float32)
+        points[:, 0] += 0.01 * t
+        colors = rng.integers(0, 256, size=(points_per_frame, 3), dtype=onp.uint8)
+        image = rng.integers(0, 256, size=(image_size, image_size, 3), dtype=onp.uint8)
+        return points, colors, image
+
+    def load_batched(
+        session: BenchmarkSession,
+    ) -> viser.SceneNodeBatchHandle[viser.FrameHandle]:
+        server = session.server
+        points, colors, images = zip(*[make_frame(t) for t in range(num_frames)])
+        names = [f"/frames/t{t}" for t in range(num_frames)]
+        frame_nodes = server.scene.add_frames(names, show_axes=False, visible=False)
+        server.scene.add_point_clouds(
+            [f"{name}/point_cloud" for name in names],
+            points=points,
+            colors=colors,
+            point_size=0.01,
+        )
+        server.scene.add_camera_frustums(
+            [f"{name}/frustum" for name in names],
+            fovs=1.0,
+            aspects=1.0,
+            scale=0.1,
+            images=images,
+            positions=onp.array([(0.01 * t, 0.0, -2.0) for t in range(num_frames)]),
+        )
+        frame_nodes[num_frames - 1].visible = True
+        session.sync()
+        return frame_nodes
+
+    def workload(session: BenchmarkSession) -> Dict[str, Any]:
+        server = session.server
+        if batched:
+            frame_nodes = load_batched(session)
+            return scrub(session, frame_nodes)
+
+        frame_nodes = []
+        for t in range(num_frames):
+            points, colors, image = make_frame(t)
+            frame = server.scene.add_frame(f"/frames/t{t}", show_axes=False)
+            server.scene.add_point_cloud(
+                f"/frames/t{t}/point_cloud",
+                points=points,
+                colors=colors,
+                point_size=0.01,
+                position_precision=position_precision,
+            )
+            server.scene.add_camera_frustum(
+                f"/frames/t{t}/frustum",
+                fov=1.0,
+                aspect=1.0,
+                scale=0.1,
+                image=image,
+                position=(0.01 * t, 0.0, -2.0),
+            )
+            if len(frame_nodes) > 0:
+                frame_nodes[-1].visible = False
+            frame_nodes.append(frame)
+            session.sync()
+        return scrub(session, frame_nodes)
+
+    def scrub(
+        session: BenchmarkSession,
+        frame_nodes: Sequence[viser.FrameHandle]
+        | viser.SceneNodeBatchHandle[viser.FrameHandle],
+    ) -> Dict[str, Any]:
+        # Scrub back through the sequence, which only toggles visibility.
+        server = session.server
+        for t in range(num_frames - 1, 0, -1):
+            with server.atomic():
+                frame_nodes[t].visible = False
+                frame_nodes[t - 1].visible = True
+            session.sync()
+        return {"frames_per_sec": num_frames / session.elapsed()}
+
+    run_benchmark(
+        "monst3r_sequence",
+        workload,
+        num_clients=num_clients,
+        params={
+            "num_frames": num_frames,
+            "points_per_frame": points_per_frame,
+            "image_size": image_size,
+            "position_precision": position_precision,
+            "batched": batched,
+        },
+        port=port,
+        json_output=json_output,
+        output_path=output_path,
+    )
+
+
+if __name__ == "__main__":
+    tyro.cli(main)
@@ -0,0 +1,103 @@
+"""Queue message throughput
+
+Measures how many messages per second can be queued from concurrent producer
+threads, with and without `atomic()` blocks mixed in.
+
+Usage:
+    python benchmarks/queue_message_throughput.py --messages-per-thread 20000
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Dict, List
+
+import numpy as onp
+import tyro
+
+from viser import _messages
+from viser.infra import WebsockServer
+
+
+def run_trial(
+    server: WebsockServer,
+    num_threads: int,
+    messages_per_thread: int,
+    atomic_every: int,
+) -> float:
+    """Queue messages from `num_threads` threads. Returns messages per second."""
+    barrier = threading.Barrier(num_threads + 1)
+
+    def producer(thread_index: int) -> None:
+        name = f"/bench/{thread_index}"
+        position = (0.0, 0.0, 0.0)
+        barrier.wait()
+        for i in range(messages_per_thread):
+            message = _messages.SetPositionMessage(name, position)
+            if atomic_every > 0 and i % atomic_every == 0:
+                with server.atomic():
+                    server.queue_message(message)
+            else:
+                server.queue_message(message)
+
+    threads = [threading.Thread(target=producer, args=(i,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start_time
+    return num_threads * messages_per_thread / elapsed
+
+
+def main(
+    thread_counts: List[int] = [1, 2, 4, 8, 16],
+    messages_per_thread: int = 20_000,
+    atomic_every: int = 16,
+    trials: int = 3,
+    json_output: bool = False,
+) -> None:
+    """Run the benchmark.
+
+    Args:
+        thread_counts: Numbers of concurrent producer threads to test.
+        messages_per_thread: Messages queued by each thread, per trial.
+        atomic_every: Wrap every N-th message in an `atomic()` block. 0 disables.
+        trials: Number of trials per thread count; the median is reported.
+        json_output: Print results as JSON instead of a table.
+    """
+    server = WebsockServer(
+        "127.0.0.1", 8099, _messages.Message, verbose=False, client_api_version=1
+    )
+    server.start()
+    results: Dict[int, float] = {}
+    for num_threads in thread_counts:
+        rates = [
+            run_trial(server, num_threads, messages_per_thread, atomic_every)
+            for _ in range(trials)
+        ]
+        results[num_threads] = float(onp.median(rates))
+    server.stop()
+
+    if json_output:
+        print(
+            json.dumps(
+                {
+                    "benchmark": "queue_message_throughput",
+                    "messages_per_thread": messages_per_thread,
+                    "atomic_every": atomic_every,
+                    "messages_per_sec": {str(k): v for k, v in results.items()},
+                }
+            )
+        )
+    else:
+        print(f"{'threads':>8} {'messages/sec':>14}")
+        for num_threads, rate in results.items():
+            print(f"{num_threads:>8} {rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    tyro.cli(main)
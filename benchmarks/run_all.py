@@ -0,0 +1,58 @@
+"""Run all end-to-end benchmarks
+
+Runs each workload in its own process, and appends results to a JSONL file.
+
+Usage:
+    python benchmarks/run_all.py --output-path results.jsonl
+    python benchmarks/run_all.py --output-path results.jsonl --workloads urdf_sweep
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+from typing import Tuple
+
+import tyro
+
+WORKLOADS = (
+    "monst3r_sequence",
+    "colmap_import",
+    "smpl_animation",
+    "urdf_sweep",
+    "gui_slider_storm",
+)
+
+
+def main(
+    output_path: Path = Path("benchmark_results.jsonl"),
+    workloads: Tuple[str, ...] = WORKLOADS,
+    num_clients: int = 4,
+) -> None:
+    """Run the benchmarks.
+
+    Args:
+        output_path: JSONL file to append results to.
+        workloads: Names of the workloads to run.
+        num_clients: Number of headless clients for each workload.
+    """
+    for workload in workloads:
+        assert workload in WORKLOADS, f"Unknown workload {workload}."
+        print(f"Running {workload}...", flush=True)
+        subprocess.run(
+            [
+                sys.executable,
+                str(Path(__file__).parent / f"{workload}.py"),
+                "--json-output",
+                "--output-path",
+                str(output_path),
+                "--num-clients",
+                str(num_clients),
+            ],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    tyro.cli(main)
@@ -0,0 +1,91 @@
+"""SMPL skinned animation
+
+Animates a skinned mesh with SMPL's dimensions (6890 vertices, 13776 faces, 24
+bones) by writing every bone's orientation each frame, like the skinned SMPL
+visualizer example. The mesh and skin weights are synthetic.
+
+Usage:
+    python benchmarks/smpl_animation.py --num-frames 300 --num-clients 4
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as onp
+import tyro
+from _harness import BenchmarkSession, run_benchmark
+
+import viser.transforms as tf
+
+
+def main(
+    num_frames: int = 300,
+    num_vertices: int = 6890,
+    num_faces: int = 13776,
+    num_bones: int = 24,
+    num_clients: int = 4,
+    port: int = 8110,
+    json_output: bool = False,
+    output_path: Optional[Path] = None,
+) -> None:
+    """Run the benchmark.
+
+    Args:
+        num_frames: Number of animation frames.
+        num_vertices: Vertices in the mesh.
+        num_faces: Faces in the mesh.
+        num_bones: Bones in the skeleton.
+        num_clients: Number of headless clients.
+        port: Port for the server.
+        json_output: Print results as JSON instead of text.
+        output_path: Optional JSONL file to append results to.
+    """
+    rng = onp.random.default_rng(0)
+    vertices = rng.normal(size=(num_vertices, 3)).astype(onp.float32)
+    faces = rng.integers(0, num_vertices, size=(num_faces, 3), dtype=onp.uint32)
+    skin_weights = rng.uniform(size=(num_vertices, num_bones)).astype(onp.float32)
+    skin_weights /= skin_weights.sum(axis=-1, keepdims=True)
+    bone_positions = rng.normal(size=(num_bones, 3)).astype(onp.float32)
+    bone_wxyzs = onp.tile(onp.array([1.0, 0.0, 0.0, 0.0]), (num_bones, 1))
+
+    def workload(session: BenchmarkSession) -> Dict[str, Any]:
+        server = session.server
+        handle = server.scene.add_mesh_skinned(
+            "/smpl",
+            vertices=vertices,
+            faces=faces,
+            bone_wxyzs=bone_wxyzs,
+            bone_positions=bone_positions,
+            skin_weights=skin_weights,
+        )
+        session.sync()
+        for t in range(num_frames):
+            with server.atomic():
+                for i, bone in enumerate(handle.bones):
+                    bone.wxyz = tf.SO3.from_x_radians(0.3 * onp.sin(0.1 * t + i)).wxyz
+            session.sync()
+        return {
+            "frames_per_sec": num_frames / session.elapsed(),
+            "bone_updates_per_sec": num_frames * num_bones / session.elapsed(),
+        }
+
+    run_benchmark(
+        "smpl_animation",
+        workload,
+        num_clients=num_clients,
+        params={
+            "num_frames": num_frames,
+            "num_vertices": num_vertices,
+            "num_faces": num_faces,
+            "num_bones": num_bones,
+        },
+        port=port,
+        json_output=json_output,
+        output_path=output_path,
+    )
+
+
+if __name__ == "__main__":
+    tyro.cli(main)
@@ -0,0 +1,115 @@
+"""URDF joint sweep
+
+Loads a robot with :class:`viser.extras.ViserUrdf` and sweeps all of its joints
+through their limits, as happens when dragging joint sliders in the URDF visualizer
+example. A synthetic serial chain of box links is generated by default.
+
+Usage:
+    python benchmarks/urdf_sweep.py --num-links 12 --num-steps 300
+    python benchmarks/urdf_sweep.py --urdf-path path/to/robot.urdf
+"""
+
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as onp
+import tyro
+from _harness import BenchmarkSession, run_benchmark
+
+from viser.extras import ViserUrdf
+
+
+def make_chain_urdf(num_links: int) -> str:
+    """Make a URDF for a serial chain of box links, connected by revolute joints."""
+    links = [
+        f"""
+  <link name="link{i}">
+    <visual>
+      <origin xyz="0 0 0.1"/>
+      <geometry><box size="0.05 0.05 0.2"/></geometry>
+    </visual>
+  </link>"""
+        for i in range(num_links + 1)
+    ]
+    joints = [
+        f"""
+  <joint name="joint{i}" type="revolute">
+    <parent link="link{i}"/>
+    <child link="link{i + 1}"/>
+    <origin xyz="0 0 0.2"/>
+    <axis xyz="{"1 0 0" if i % 2 == 0 else "0 1 0"}"/>
+    <limit lower="-1.5" upper="1.5" effort="1" velocity="1"/>
+  </joint>"""
+        for i in range(num_links)
+    ]
+    return f'<robot name="chain">{"".join(links)}{"".join(joints)}\n</robot>\n'
+
+
+def main(
+    urdf_path: Optional[Path] = None,
+    num_links: int = 12,
+    num_steps: int = 300,
+    num_clients: int = 4,
+    port: int = 8110,
+    json_output: bool = False,
+    output_path: Optional[Path] = None,
+) -> None:
+    """Run the benchmark.
+
+    Args:
+        urdf_path: Optional path to a URDF file. A synthetic chain is used if not set.
+        num_links: Number of links in the synthetic chain.
+        num_steps: Number of configurations in the sweep.
+        num_clients: Number of headless clients.
+        port: Port for the server.
+        json_output: Print results as JSON instead of text.
+        output_path: Optional JSONL file to append results to.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if urdf_path is None:
+            path = Path(tmp_dir) / "chain.urdf"
+            path.write_text(make_chain_urdf(num_links))
+        else:
+            path = urdf_path
+
+        def workload(session: BenchmarkSession) -> Dict[str, Any]:
+            urdf = ViserUrdf(session.server, path)
+            session.sync()
+            limits = onp.array(
+                [
+                    (
+                        -onp.pi if lower is None else lower,
+                        onp.pi if upper is None else upper,
+                    )
+                    for lower, upper in urdf.get_actuated_joint_limits().values()
+                ]
+            )
+            for t in range(num_steps):
+                alpha = 0.5 + 0.5 * onp.sin(2.0 * onp.pi * t / num_steps)
+                urdf.update_cfg(limits[:, 0] + alpha * (limits[:, 1] - limits[:, 0]))
+                session.sync()
+            return {
+                "num_joints": len(limits),
+                "configurations_per_sec": num_steps / session.elapsed(),
+            }
+
+        run_benchmark(
+            "urdf_sweep",
+            workload,
+            num_clients=num_clients,
+            params={
+                "urdf_path": None if urdf_path is None else str(urdf_path),
+                "num_links": num_links,
+                "num_steps": num_steps,
+            },
+            port=port,
+            json_output=json_output,
+            output_path=output_path,
+        )
+
+
+if __name__ == "__main__":
+    tyro.cli(main)
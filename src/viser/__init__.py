@@ -25,9 +25,12 @@ from ._scene_handles import MeshHandle as MeshHandle
 from ._scene_handles import MeshSkinnedBoneHandle as MeshSkinnedBoneHandle
 from ._scene_handles import MeshSkinnedHandle as MeshSkinnedHandle
 from ._scene_handles import PointCloudHandle as PointCloudHandle
+from ._scene_handles import PointCloudLodHandle as PointCloudLodHandle
+from ._scene_handles import SceneNodeBatchHandle as SceneNodeBatchHandle
 from ._scene_handles import SceneNodeHandle as SceneNodeHandle
 from ._scene_handles import SceneNodePointerEvent as SceneNodePointerEvent
 from ._scene_handles import ScenePointerEvent as ScenePointerEvent
+from ._scene_handles import TimelineHandle as TimelineHandle
 from ._scene_handles import TransformControlsHandle as TransformControlsHandle
 from ._viser import CameraHandle as CameraHandle
 from ._viser import ClientHandle as ClientHandle
@@ -4,12 +4,15 @@
 from __future__ import annotations
 
 import dataclasses
+import functools
+import io
 import uuid
 from typing import (
     Any,
     Callable,
     ClassVar,
     Dict,
+    FrozenSet,
     Optional,
     Tuple,
     Type,
@@ -53,22 +56,92 @@ class Message(infra.Message):
         For example: if we send 1000 GuiSetValue messages for the same GUI element, we
         should only keep the latest messages.
         """
-        parts = [type(self).__name__]
+        return type(self)._redundancy_key_fn()(self)
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _redundancy_key_fn(cls) -> Callable[[Message], str]:
+        """Build the default redundancy key function for this message type. Keys are
+        the type name, followed by the "name" field for scene node manipulation
+        messages or the "id" field for GUI and notification messages."""
+        type_name = cls.__name__
+        field_names = {field.name for field in dataclasses.fields(cls)}  # type: ignore
+        key_fields = [k for k in ("name", "id") if k in field_names]
+        if len(key_fields) == 0:
+            return lambda message: type_name
+
+        def redundancy_key(message: Message) -> str:
+            parts = [type_name]
+            for k in key_fields:
+                value = getattr(message, k)
+                if value is not None:
+                    parts.append(value)
+            return "_".join(parts)
+
+        if len(key_fields) > 1:
+            return redundancy_key
+
+        # Common case: a single key field.
+        (key_field,) = key_fields
+        prefix = type_name + "_"
+
+        def redundancy_key_single(message: Message) -> str:
+            value = getattr(message, key_field)
+            return type_name if value is None else prefix + value
+
+        return redundancy_key_single
 
-        # Scene node manipulation messages all have a "name" field.
-        node_name = getattr(self, "name", None)
-        if node_name is not None:
-            parts.append(node_name)
-
-        # GUI and notification messages all have an "id" field.
-        node_name = getattr(self, "id", None)
-        if node_name is not None:
-            parts.append(node_name)
+    @override
+    @classmethod
+    def priority(cls) -> Literal["interactive", "default", "bulk"]:
+        """Priority class of this message type, from its tags."""
+        if "InteractiveMessage" in cls._tags:
+            return "interactive"
+        elif "BulkMessage" in cls._tags:
+            return "bulk"
+        else:
+            return "default"
 
-        return "_".join(parts)
+    @override
+    def persistent_scope(self) -> Optional[str]:
+        """Scene node messages are scoped by node name, so they're dropped when the
+        node or one of its ancestors is removed. The world axes node is kept by the
+        client across scene resets, so its messages aren't scoped."""
+        name = getattr(self, "name", None)
+        if not isinstance(name, str) or name == "/WorldAxes":
+            return None
+        return name
 
 
 T = TypeVar("T", bound=Type[Message])
+TMessage = TypeVar("TMessage", bound=Message)
+
+
+def _degrade_image(
+    media_type: Literal["image/jpeg", "image/png"], data: bytes
+) -> tuple[Literal["image/jpeg", "image/png"], bytes]:
+    """Halve the resolution of an encoded image. Images without an alpha channel are
+    re-encoded as low-quality JPEGs."""
+    import imageio.v3 as iio
+
+    image = iio.imread(
+        io.BytesIO(data), extension=".png" if media_type == "image/png" else ".jpeg"
+    )
+    image = image[::2, ::2]
+    with io.BytesIO() as data_buffer:
+        if image.ndim == 3 and image.shape[-1] == 4:
+            iio.imwrite(data_buffer, image, extension=".png")
+            return "image/png", data_buffer.getvalue()
+        iio.imwrite(data_buffer, image, extension=".jpeg", quality=50)
+        return "image/jpeg", data_buffer.getvalue()
+
+
+def _subsample_rows(array: onpt.NDArray[Any], max_rows: int) -> onpt.NDArray[Any]:
+    """Evenly subsample the leading axis of an array."""
+    if array.shape[0] <= max_rows:
+        return array
+    stride = int(onp.ceil(array.shape[0] / max_rows))
+    return array[::stride]
 
 
 def tag_class(tag: str) -> Callable[[T], T]:
@@ -81,6 +154,13 @@ def tag_class(tag: str) -> Callable[[T], T]:
     return wrapper
 
 
+def _copy_message(message: TMessage, **changes: Any) -> TMessage:
+    """Copy a message with some fields replaced."""
+    out = dataclasses.replace(message, **changes)  # type: ignore
+    out.excluded_self_client = message.excluded_self_client
+    return out
+
+
 @dataclasses.dataclass
 class RunJavascriptMessage(Message):
     """Message for running some arbitrary Javascript on the client.
@@ -128,6 +208,13 @@ class ViewerCameraMessage(Message):
     look_at: Tuple[float, float, float]
     up_direction: Tuple[float, float, float]
 
+    @override
+    @classmethod
+    def coalesce_incoming(cls) -> bool:
+        """Camera messages are sent continuously while the viewer is orbiting; only
+        the latest pose needs to be handled."""
+        return True
+
 
 # The list of scene pointer events supported by the viser frontend.
 ScenePointerEventType = Literal["click", "rect-select"]
@@ -161,6 +248,50 @@ class ScenePointerEnableMessage(Message):
         )
 
 
+@dataclasses.dataclass
+class _SceneNodeBatchMessage(Message):
+    """Base class for messages that add a batch of scene nodes at once. Each node
+    gets its own name, and its pose and visibility are set from the batch, so no
+    follow-up messages are needed."""
+
+    names: Tuple[str, ...]
+    wxyzs: onpt.NDArray[onp.float32]
+    """Orientations of each node, with shape (N, 4)."""
+    positions: onpt.NDArray[onp.float32]
+    """Positions of each node, with shape (N, 3)."""
+    visible: bool
+
+    @override
+    def redundancy_key(self) -> str:
+        return type(self).__name__ + "_" + "\n".join(self.names)
+
+    @override
+    def persistent_scopes(self) -> Tuple[str, ...]:
+        return self.names
+
+    @override
+    def without_scopes(
+        self: TSceneNodeBatchMessage, scopes: FrozenSet[str]
+    ) -> TSceneNodeBatchMessage:
+        indices = onp.array(
+            [i for i, name in enumerate(self.names) if name not in scopes],
+            dtype=onp.int64,
+        )
+        return _copy_message(self, **self._select_changes(indices))
+
+    def _select_changes(self, indices: onpt.NDArray[onp.int64]) -> Dict[str, Any]:
+        """Field changes for keeping only the nodes at `indices`."""
+        return {
+            "names": tuple(self.names[i] for i in indices),
+            "wxyzs": self.wxyzs[indices],
+            "positions": self.positions[indices],
+        }
+
+
+TSceneNodeBatchMessage = TypeVar("TSceneNodeBatchMessage", bound=_SceneNodeBatchMessage)
+
+
+@tag_class("BulkMessage")
 @dataclasses.dataclass
 class CameraFrustumMessage(Message):
     """Variant of CameraMessage used for visualizing camera frustums.
@@ -176,7 +307,65 @@ class CameraFrustumMessage(Message):
     image_media_type: Optional[Literal["image/jpeg", "image/png"]]
     image_binary: Optional[bytes]
 
+    @override
+    def degrade(self) -> CameraFrustumMessage:
+        if self.image_media_type is None or self.image_binary is None:
+            return self
+        media_type, binary = _degrade_image(self.image_media_type, self.image_binary)
+        return _copy_message(self, image_media_type=media_type, image_binary=binary)
+
+
+@tag_class("BulkMessage")
+@dataclasses.dataclass
+class CameraFrustumsMessage(_SceneNodeBatchMessage):
+    """Batch of camera frustums. Expanded by the client into one scene node per
+    frustum, equivalent to `CameraFrustumMessage`."""
+
+    fovs: onpt.NDArray[onp.float32]
+    aspects: onpt.NDArray[onp.float32]
+    scale: float
+    colors: onpt.NDArray[onp.uint8]
+    """Colors of each frustum, with shape (N, 3)."""
+    thickness: float
+    image_media_type: Optional[Literal["image/jpeg", "image/png"]]
+    image_binaries: Tuple[bytes, ...]
+    """One image for each frustum, or empty if `image_media_type` is None."""
+
+    @override
+    def _select_changes(self, indices: onpt.NDArray[onp.int64]) -> Dict[str, Any]:
+        return {
+            **super()._select_changes(indices),
+            "fovs": self.fovs[indices],
+            "aspects": self.aspects[indices],
+            "colors": self.colors[indices],
+            "image_binaries": (
+                tuple(self.image_binaries[i] for i in indices)
+                if self.image_media_type is not None
+                else ()
+            ),
+        }
+
+    @override
+    def degrade(self) -> CameraFrustumsMessage:
+        if self.image_media_type is None:
+            return self
+        degraded = [
+            _degrade_image(self.image_media_type, binary)
+            for binary in self.image_binaries
+        ]
+        # Images with an alpha channel stay PNGs. The batch shares a media type, so
+        # we can only degrade if every image ends up with the same one.
+        media_types = set(media_type for media_type, _ in degraded)
+        if len(media_types) != 1:
+            return self
+        return _copy_message(
+            self,
+            image_media_type=media_types.pop(),
+            image_binaries=tuple(binary for _, binary in degraded),
+        )
+
 
+@tag_class("BulkMessage")
 @dataclasses.dataclass
 class GlbMessage(Message):
     """GlTF message."""
@@ -197,6 +386,17 @@ class FrameMessage(Message):
     origin_radius: float
 
 
+@dataclasses.dataclass
+class FramesMessage(_SceneNodeBatchMessage):
+    """Batch of coordinate frames. Expanded by the client into one scene node per
+    frame, equivalent to `FrameMessage`."""
+
+    show_axes: bool
+    axes_length: float
+    axes_radius: float
+    origin_radius: float
+
+
 @dataclasses.dataclass
 class BatchedAxesMessage(Message):
     """Batched axes message.
@@ -241,6 +441,31 @@ class LabelMessage(Message):
     text: str
 
 
+@dataclasses.dataclass
+class TimelineMessage(Message):
+    """Add a timeline to the scene, which shows one of a sequence of scene nodes at
+    a time. Frames are advanced by the client; see `TimelinePlaybackMessage`."""
+
+    name: str
+    frame_names: Tuple[str, ...]
+    """Names of the scene nodes for each frame, in order."""
+
+
+@tag_class("InteractiveMessage")
+@dataclasses.dataclass
+class TimelinePlaybackMessage(Message):
+    """Play, pause, or seek a timeline. Clients start playback from `frame` when
+    the message is received."""
+
+    name: str
+    playing: bool
+    frame: int
+    fps: float
+    loop: bool
+    show_all: bool
+    """If set, every frame is shown, regardless of the playback state."""
+
+
 @dataclasses.dataclass
 class Gui3DMessage(Message):
     """Add a 3D gui element to the scene."""
@@ -250,30 +475,149 @@ class Gui3DMessage(Message):
     container_id: str
 
 
+@tag_class("BulkMessage")
 @dataclasses.dataclass
 class PointCloudMessage(Message):
     """Point cloud message.
 
-    Positions are internally canonicalized to float32, colors to uint8.
+    Positions are internally canonicalized to float32, colors to uint8. Both can
+    optionally be sent in more compact encodings, which are decoded by the client.
 
     Float color inputs should be in the range [0,1], int color inputs should be in the
     range [0,255]."""
 
     name: str
-    points: onpt.NDArray[onp.float32]
+    points: onpt.NDArray[Any]
+    """Positions of shape (N, 3), with dtype matching `precision`."""
     colors: onpt.NDArray[onp.uint8]
+    """Colors of shape (N, 3), a single color of shape (3,), or palette indices of
+    shape (N,) if `color_palette` is set."""
     point_size: float
     point_ball_norm: float
+    precision: Literal["float32", "float16", "int16"]
+    points_bbox: Optional[Tuple[float, float, float, float, float, float]]
+    """Bounding box for int16 positions, as (min_x, min_y, min_z, max_x, max_y,
+    max_z). int16 values are mapped linearly from [-32768, 32767] to this box."""
+    color_palette: Optional[onpt.NDArray[onp.uint8]]
+    """Palette of up to 256 colors, with shape (K, 3)."""
 
     def __post_init__(self):
         # Check shapes.
-        assert self.points.shape == self.colors.shape
-        assert self.points.shape[-1] == 3
+        assert len(self.points.shape) == 2 and self.points.shape[-1] == 3
+        if self.color_palette is None:
+            assert self.colors.shape in {self.points.shape, (3,)}
+        else:
+            assert self.colors.shape == self.points.shape[:1]
+            assert self.color_palette.shape[-1] == 3
+            assert self.color_palette.shape[0] <= 256
 
         # Check dtypes.
-        assert self.points.dtype == onp.float32
+        assert (
+            self.points.dtype
+            == {
+                "float32": onp.float32,
+                "float16": onp.float16,
+                "int16": onp.int16,
+            }[self.precision]
+        )
+        assert (self.points_bbox is not None) == (self.precision == "int16")
         assert self.colors.dtype == onp.uint8
 
+    @override
+    def degrade(self) -> PointCloudMessage:
+        # Send at most a quarter of the points.
+        max_points = max(self.points.shape[0] // 4, 1)
+        uniform_color = self.color_palette is None and len(self.colors.shape) == 1
+        return _copy_message(
+            self,
+            points=_subsample_rows(self.points, max_points),
+            colors=(
+                self.colors
+                if uniform_color
+                else _subsample_rows(self.colors, max_points)
+            ),
+        )
+
+
+@tag_class("BulkMessage")
+@dataclasses.dataclass
+class PointCloudsMessage(_SceneNodeBatchMessage):
+    """Batch of point clouds. Expanded by the client into one scene node per point
+    cloud, equivalent to `PointCloudMessage` with float32 positions."""
+
+    points: onpt.NDArray[onp.float32]
+    """Positions of all point clouds, concatenated, with shape (M, 3)."""
+    colors: onpt.NDArray[onp.uint8]
+    """Colors of all point clouds, concatenated, with shape (M, 3)."""
+    point_counts: onpt.NDArray[onp.uint32]
+    """Number of points in each point cloud, with shape (N,)."""
+    point_size: float
+    point_ball_norm: float
+
+    def __post_init__(self):
+        assert self.points.shape == self.colors.shape
+        assert self.points.shape[-1] == 3
+        assert self.point_counts.shape == (len(self.names),)
+        assert int(onp.sum(self.point_counts)) == self.points.shape[0]
+
+    def _select_points(
+        self, indices: onpt.NDArray[onp.int64], subsample: bool
+    ) -> Dict[str, Any]:
+        """Field changes for keeping only the point clouds at `indices`. If
+        `subsample` is set, at most a quarter of each point cloud is kept."""
+        offsets = onp.concatenate([[0], onp.cumsum(self.point_counts, dtype=onp.int64)])
+        rows = [onp.arange(offsets[i], offsets[i + 1]) for i in indices]
+        if subsample:
+            rows = [_subsample_rows(r, max(r.shape[0] // 4, 1)) for r in rows]
+        row_indices = onp.concatenate([onp.zeros(0, dtype=onp.int64)] + rows)
+        return {
+            **super()._select_changes(indices),
+            "points": self.points[row_indices],
+            "colors": self.colors[row_indices],
+            "point_counts": onp.array([r.shape[0] for r in rows], dtype=onp.uint32),
+        }
+
+    @override
+    def _select_changes(self, indices: onpt.NDArray[onp.int64]) -> Dict[str, Any]:
+        return self._select_points(indices, subsample=False)
+
+    @override
+    def degrade(self) -> PointCloudsMessage:
+        return _copy_message(
+            self,
+            **self._select_points(onp.arange(len(self.names)), subsample=True),
+        )
+
+
+@tag_class("BulkMessage")
+@dataclasses.dataclass
+class SceneNodeArrayUpdateMessage(Message):
+    """Update rows of an array attribute of an existing scene node: the points or
+    colors of a point cloud, or the vertices of a mesh.
+
+    Partial updates contain every row that has changed since the last full update,
+    so each message supersedes the previous message of the same kind."""
+
+    name: str
+    array_name: Literal["points", "colors", "vertices"]
+    full: bool
+    start_row: int
+    row_indices: Optional[onpt.NDArray[onp.uint32]]
+    """If set, `values` contains one row for each of these indices. Otherwise,
+    `values` contains a contiguous range of rows, starting at `start_row`."""
+    values: onpt.NDArray[Any]
+
+    @override
+    def redundancy_key(self) -> str:
+        return "_".join(
+            [
+                type(self).__name__,
+                self.name,
+                self.array_name,
+                "full" if self.full else "partial",
+            ]
+        )
+
 
 @dataclasses.dataclass
 class MeshBoneMessage(Message):
@@ -282,6 +626,7 @@ class MeshBoneMessage(Message):
     name: str
 
 
+@tag_class("BulkMessage")
 @dataclasses.dataclass
 class MeshMessage(Message):
     """Mesh message.
@@ -383,6 +728,7 @@ class TransformControlsMessage(Message):
     opacity: float
 
 
+@tag_class("InteractiveMessage")
 @dataclasses.dataclass
 class SetCameraPositionMessage(Message):
     """Server -> client message to set the camera's position."""
@@ -390,6 +736,7 @@ class SetCameraPositionMessage(Message):
     position: Tuple[float, float, float]
 
 
+@tag_class("InteractiveMessage")
 @dataclasses.dataclass
 class SetCameraUpDirectionMessage(Message):
     """Server -> client message to set the camera's up direction."""
@@ -397,6 +744,7 @@ class SetCameraUpDirectionMessage(Message):
     position: Tuple[float, float, float]
 
 
+@tag_class("InteractiveMessage")
 @dataclasses.dataclass
 class SetCameraLookAtMessage(Message):
     """Server -> client message to set the camera's look-at point."""
@@ -404,6 +752,7 @@ class SetCameraLookAtMessage(Message):
     look_at: Tuple[float, float, float]
 
 
+@tag_class("InteractiveMessage")
 @dataclasses.dataclass
 class SetCameraFovMessage(Message):
     """Server -> client message to set the camera's field of view."""
@@ -411,6 +760,7 @@ class SetCameraFovMessage(Message):
     fov: float
 
 
+@tag_class("InteractiveMessage")
 @dataclasses.dataclass
 class SetOrientationMessage(Message):
     """Server -> client message to set a scene node's orientation.
@@ -421,6 +771,7 @@ class SetOrientationMessage(Message):
     wxyz: Tuple[float, float, float, float]
 
 
+@tag_class("InteractiveMessage")
 @dataclasses.dataclass
 class SetPositionMessage(Message):
     """Server -> client message to set a scene node's position.
@@ -431,6 +782,99 @@ class SetPositionMessage(Message):
     position: Tuple[float, float, float]
 
 
+@dataclasses.dataclass
+class _SceneNodeBulkUpdateMessage(Message):
+    """Base class for messages that update a property of many scene nodes at once.
+
+    Each node is covered by the same redundancy key as the equivalent per-node
+    message, so bulk and per-node updates supersede each other in the message
+    buffer. Nodes that are superseded or removed are pruned from buffered
+    messages."""
+
+    _node_message_type: ClassVar[str]
+    """Name of the equivalent per-node message type."""
+    _values_field: ClassVar[str]
+    """Name of the array field with one row per node."""
+
+    names: Tuple[str, ...]
+
+    @override
+    def redundancy_key(self) -> str:
+        return type(self).__name__ + "_" + "\n".join(self.names)
+
+    @override
+    def redundancy_keys(self) -> Tuple[str, ...]:
+        prefix = self._node_message_type + "_"
+        return tuple(prefix + name for name in self.names)
+
+    @override
+    def persistent_scopes(self) -> Tuple[str, ...]:
+        return tuple(name for name in self.names if name != "/WorldAxes")
+
+    @override
+    def without_scopes(
+        self: TSceneNodeBulkUpdateMessage, scopes: FrozenSet[str]
+    ) -> TSceneNodeBulkUpdateMessage:
+        return self._without_names(scopes)
+
+    @override
+    def without_redundancy_keys(
+        self: TSceneNodeBulkUpdateMessage, keys: FrozenSet[str]
+    ) -> TSceneNodeBulkUpdateMessage:
+        prefix_len = len(self._node_message_type) + 1
+        return self._without_names(frozenset(key[prefix_len:] for key in keys))
+
+    def _without_names(
+        self: TSceneNodeBulkUpdateMessage, names: FrozenSet[str]
+    ) -> TSceneNodeBulkUpdateMessage:
+        indices = onp.array(
+            [i for i, name in enumerate(self.names) if name not in names],
+            dtype=onp.int64,
+        )
+        return _copy_message(
+            self,
+            names=tuple(self.names[i] for i in indices),
+            **{self._values_field: getattr(self, self._values_field)[indices]},
+        )
+
+
+TSceneNodeBulkUpdateMessage = TypeVar(
+    "TSceneNodeBulkUpdateMessage", bound=_SceneNodeBulkUpdateMessage
+)
+
+
+@tag_class("InteractiveMessage")
+@dataclasses.dataclass
+class SetOrientationsMessage(_SceneNodeBulkUpdateMessage):
+    """Server -> client message to set the orientations of many scene nodes. Bulk
+    version of `SetOrientationMessage`."""
+
+    _node_message_type: ClassVar[str] = "SetOrientationMessage"
+    _values_field: ClassVar[str] = "wxyzs"
+
+    wxyzs: onpt.NDArray[onp.float32]
+    """Orientations of each node, with shape (N, 4)."""
+
+    def __post_init__(self) -> None:
+        assert self.wxyzs.shape == (len(self.names), 4)
+
+
+@tag_class("InteractiveMessage")
+@dataclasses.dataclass
+class SetPositionsMessage(_SceneNodeBulkUpdateMessage):
+    """Server -> client message to set the positions of many scene nodes. Bulk
+    version of `SetPositionMessage`."""
+
+    _node_message_type: ClassVar[str] = "SetPositionMessage"
+    _values_field: ClassVar[str] = "positions"
+
+    positions: onpt.NDArray[onp.float32]
+    """Positions of each node, with shape (N, 3)."""
+
+    def __post_init__(self) -> None:
+        assert self.positions.shape == (len(self.names), 3)
+
+
 @dataclasses.dataclass
 class TransformControlsUpdateMessage(Message):
     """Client -> server message when a transform control is updated.
@@ -441,7 +885,14 @@ class TransformControlsUpdateMessage(Message):
     wxyz: Tuple[float, float, float, float]
     position: Tuple[float, float, float]
 
+    @override
+    @classmethod
+    def coalesce_incoming(cls) -> bool:
+        """Sent continuously while a transform control is dragged."""
+        return True
+
 
+@tag_class("BulkMessage")
 @dataclasses.dataclass
 class BackgroundImageMessage(Message):
     """Message for rendering a background image."""
@@ -450,7 +901,22 @@ class BackgroundImageMessage(Message):
     rgb_bytes: bytes
     depth_bytes: Optional[bytes]
 
+    @override
+    def degrade(self) -> BackgroundImageMessage:
+        # Depth is encoded in the channels of a PNG, so we can't resample it
+        # without also resampling the RGB image.
+        if self.depth_bytes is not None:
+            return self
+        media_type, rgb_bytes = _degrade_image(self.media_type, self.rgb_bytes)
+        return _copy_message(self, media_type=media_type, rgb_bytes=rgb_bytes)
+
+    @override
+    def persistent_scope(self) -> Optional[str]:
+        # Background images are cleared by scene resets.
+        return ""
 
+
+@tag_class("BulkMessage")
 @dataclasses.dataclass
 class ImageMessage(Message):
     """Message for rendering 2D images."""
@@ -461,6 +927,11 @@ class ImageMessage(Message):
     render_width: float
     render_height: float
 
+    @override
+    def degrade(self) -> ImageMessage:
+        media_type, data = _degrade_image(self.media_type, self.data)
+        return _copy_message(self, media_type=media_type, data=data)
+
 
 @dataclasses.dataclass
 class RemoveSceneNodeMessage(Message):
@@ -468,7 +939,12 @@ class RemoveSceneNodeMessage(Message):
 
     name: str
 
+    @override
+    def clears_scope(self) -> Optional[str]:
+        return self.name
+
 
+@tag_class("InteractiveMessage")
 @dataclasses.dataclass
 class SetSceneNodeVisibilityMessage(Message):
     """Set the visibility of a particular node in the scene."""
@@ -477,6 +953,22 @@ class SetSceneNodeVisibilityMessage(Message):
     visible: bool
 
 
+@tag_class("InteractiveMessage")
+@dataclasses.dataclass
+class SetSceneNodeVisibilitiesMessage(_SceneNodeBulkUpdateMessage):
+    """Set the visibility of many nodes in the scene. Bulk version of
+    `SetSceneNodeVisibilityMessage`."""
+
+    _node_message_type: ClassVar[str] = "SetSceneNodeVisibilityMessage"
+    _values_field: ClassVar[str] = "visible"
+
+    visible: onpt.NDArray[onp.bool_]
+    """Visibility of each node, with shape (N,)."""
+
+    def __post_init__(self) -> None:
+        assert self.visible.shape == (len(self.names),)
+
+
 @dataclasses.dataclass
 class SetSceneNodeClickableMessage(Message):
     """Set the clickability of a particular node in the scene."""
@@ -501,6 +993,10 @@ class SceneNodeClickMessage(Message):
 class ResetSceneMessage(Message):
     """Reset scene."""
 
+    @override
+    def clears_scope(self) -> Optional[str]:
+        return ""
+
 
 @dataclasses.dataclass
 class ResetGuiMessage(Message):
@@ -705,6 +1201,7 @@ class GuiRemoveMessage(Message):
     id: str
 
 
+@tag_class("InteractiveMessage")
 @dataclasses.dataclass
 class GuiUpdateMessage(Message):
     """Sent client<->server when any property of a GUI component is changed."""
@@ -766,6 +1263,7 @@ class CubicBezierSplineMessage(Message):
     segments: Optional[int]
 
 
+@tag_class("BulkMessage")
 @dataclasses.dataclass
 class GaussianSplatsMessage(Message):
     """Message from server->client carrying splattable Gaussians."""
@@ -786,6 +1284,14 @@ class GaussianSplatsMessage(Message):
     - rgba (int32)
     Where cov1-6 are the upper triangular elements of the covariance matrix."""
 
+    @override
+    def degrade(self) -> GaussianSplatsMessage:
+        # Send at most a quarter of the Gaussians.
+        return _copy_message(
+            self,
+            buffer=_subsample_rows(self.buffer, max(self.buffer.shape[0] // 4, 1)),
+        )
+
 
 @dataclasses.dataclass
 class GetRenderRequestMessage(Message):
@@ -830,6 +1336,7 @@ class FileTransferPart(Message):
     transfer_uuid: str
     part: int
     content: bytes
+    """Parts received from clients are decoded as zero-copy memoryviews."""
 
     @override
     def redundancy_key(self) -> str:
@@ -856,6 +1363,57 @@ class FileTransferPartAck(Message):
         )
 
 
+@tag_class("BulkMessage")
+@dataclasses.dataclass
+class SceneNodeTransferStart(Message):
+    """Signal that an array-heavy scene node message is about to be streamed in
+    parts. Clients render the scene node progressively as parts arrive."""
+
+    name: str
+    transfer_uuid: str
+    message_type: str
+    """Type of the scene node message that's being streamed."""
+    props: Dict[str, Any]
+    """Fields of the scene node message that aren't streamed."""
+    array_names: Tuple[str, ...]
+    array_sizes: Tuple[int, ...]
+    """Total size of each streamed array, in bytes."""
+    array_row_sizes: Tuple[int, ...]
+    """Size of one row of each streamed array, in bytes. Arrays are rendered in
+    units of rows."""
+    array_groups: Tuple[int, ...]
+    """Group index of each array. Arrays in the same group are streamed in
+    lockstep, and rendered with the same number of rows. Groups are streamed in
+    order."""
+    part_count: int
+
+    @override
+    def redundancy_key(self) -> str:
+        # Shared with the streamed message type, so streamed and unstreamed
+        # versions of a scene node supersede each other.
+        return self.message_type + "_" + self.name
+
+
+@tag_class("BulkMessage")
+@dataclasses.dataclass
+class SceneNodeTransferPart(Message):
+    """Part of a streamed scene node message."""
+
+    name: str
+    transfer_uuid: str
+    part: int
+    array_name: str
+    offset: int
+    """Byte offset of this part in the streamed array."""
+    content: onpt.NDArray[onp.uint8]
+
+    @override
+    def redundancy_key(self) -> str:
+        # Parts of a new transfer replace parts of older transfers for the same
+        # scene node.
+        return type(self).__name__ + "-" + self.name + "-" + str(self.part)
+
+
 @dataclasses.dataclass
 class ShareUrlRequest(Message):
     """Message from client->server to connect to the share URL server."""
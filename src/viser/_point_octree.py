@@ -0,0 +1,232 @@
+"""Octree for streaming large point clouds at multiple levels of detail."""
+
+from __future__ import annotations
+
+import dataclasses
+
+import numpy as onp
+import numpy.typing as onpt
+
+_MAX_DEPTH = 21
+"""Maximum octree depth. Cell coordinates are interleaved into 63-bit codes."""
+
+_SHOWN_PRIORITY_SCALE = 1.5
+"""Priority boost for nodes that are already shown, so that nodes near the cutoff
+aren't repeatedly dropped and resent as the camera moves."""
+
+
+def _spread_bits(x: onpt.NDArray[onp.uint64]) -> onpt.NDArray[onp.uint64]:
+    """Insert two zeros between each of the lowest 21 bits of each integer."""
+    x = x & onp.uint64(0x1FFFFF)
+    x = (x | (x << onp.uint64(32))) & onp.uint64(0x1F00000000FFFF)
+    x = (x | (x << onp.uint64(16))) & onp.uint64(0x1F0000FF0000FF)
+    x = (x | (x << onp.uint64(8))) & onp.uint64(0x100F00F00F00F00F)
+    x = (x | (x << onp.uint64(4))) & onp.uint64(0x10C30C30C30C30C3)
+    x = (x | (x << onp.uint64(2))) & onp.uint64(0x1249249249249249)
+    return x
+
+
+def _compact_bits(x: onpt.NDArray[onp.uint64]) -> onpt.NDArray[onp.uint64]:
+    """Inverse of `_spread_bits()`."""
+    x = x & onp.uint64(0x1249249249249249)
+    x = (x | (x >> onp.uint64(2))) & onp.uint64(0x10C30C30C30C30C3)
+    x = (x | (x >> onp.uint64(4))) & onp.uint64(0x100F00F00F00F00F)
+    x = (x | (x >> onp.uint64(8))) & onp.uint64(0x1F0000FF0000FF)
+    x = (x | (x >> onp.uint64(16))) & onp.uint64(0x1F00000000FFFF)
+    x = (x | (x >> onp.uint64(32))) & onp.uint64(0x1FFFFF)
+    return x
+
+
+def spheres_in_view_cone(
+    offsets: onpt.NDArray[onp.float64],
+    radii: onpt.NDArray[onp.float64],
+    camera_direction: onpt.NDArray[onp.float64],
+    tan_half_fov: float,
+) -> onpt.NDArray[onp.bool_]:
+    """Conservative test for whether spheres overlap a camera's view, which is
+    approximated by a cone around its diagonal field of view.
+
+    Args:
+        offsets: Sphere centers relative to the camera position, with shape (N, 3).
+        radii: Sphere radii, with shape (N,).
+        camera_direction: Unit vector that the camera is looking along.
+        tan_half_fov: Tangent of half of the camera's diagonal field of view.
+    """
+    distances = onp.linalg.norm(offsets, axis=-1)
+    along = offsets @ camera_direction
+    lateral = onp.sqrt(onp.maximum(distances**2 - along**2, 0.0))
+    return (along > -radii) & (
+        lateral - radii <= onp.maximum(along + radii, 0.0) * tan_half_fov
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class PointOctree:
+    """Points and colors, reordered so that each octree node is a contiguous range.
+
+    Each node holds an evenly spaced subsample of the points in its cell that
+    aren't held by its ancestors, so showing a node and all of its ancestors gives
+    a uniformly dense view of the cell. Nodes are sorted by depth, so coarse levels
+    come first."""
+
+    points: onpt.NDArray[onp.float32]
+    colors: onpt.NDArray[onp.uint8]
+    """Colors of shape (N, 3), or a single color of shape (3,)."""
+    keys: tuple[str, ...]
+    """Path of each node from the root, as one octal digit per level."""
+    starts: onpt.NDArray[onp.int64]
+    ends: onpt.NDArray[onp.int64]
+    depths: onpt.NDArray[onp.int64]
+    centers: onpt.NDArray[onp.float64]
+    """Center of each node's cell, with shape (K, 3)."""
+    half_sizes: onpt.NDArray[onp.float64]
+    """Half of the side length of each node's cell, with shape (K,)."""
+
+    @property
+    def point_counts(self) -> onpt.NDArray[onp.int64]:
+        return self.ends - self.starts
+
+    def select_nodes(
+        self,
+        camera_position: onpt.NDArray[onp.float64],
+        camera_direction: onpt.NDArray[onp.float64],
+        tan_half_fov: float,
+        max_points: int,
+        shown: onpt.NDArray[onp.bool_] | None = None,
+    ) -> onpt.NDArray[onp.int64]:
+        """Indices of the nodes that should be shown for a camera, in the local
+        frame of the point cloud, most important first.
+
+        Nodes are ranked by the size of their bounding sphere relative to its
+        distance from the camera. Nodes outside of the view cone are skipped. A
+        node never ranks below its descendants, so selected nodes always include
+        their ancestors.
+
+        Args:
+            camera_position: Position of the camera.
+            camera_direction: Unit vector that the camera is looking along.
+            tan_half_fov: Tangent of half of the camera's diagonal field of view.
+            max_points: Maximum total number of points in the selected nodes.
+            shown: Mask of nodes that are already shown, which are preferred over
+                other nodes with similar priorities. Should include the ancestors
+                of each shown node.
+        """
+        offsets = self.centers - camera_position
+        distances = onp.linalg.norm(offsets, axis=-1)
+        radii = self.half_sizes * onp.sqrt(3.0)
+        in_view = spheres_in_view_cone(offsets, radii, camera_direction, tan_half_fov)
+
+        candidates = onp.flatnonzero(in_view)
+        priorities = radii[candidates] / onp.maximum(
+            distances[candidates] - radii[candidates], radii[candidates] * 1e-3
+        )
+        if shown is not None:
+            priorities[shown[candidates]] *= _SHOWN_PRIORITY_SCALE
+        # Sort by priority, with ties broken by depth so parents come first.
+        order = onp.lexsort((self.depths[candidates], -priorities))
+        candidates = candidates[order]
+        total_points = onp.cumsum(self.point_counts[candidates])
+        return candidates[total_points <= max_points]
+
+
+def build_point_octree(
+    points: onpt.NDArray[onp.float32],
+    colors: onpt.NDArray[onp.uint8],
+    points_per_node: int,
+) -> PointOctree:
+    """Build an octree over a point cloud.
+
+    Args:
+        points: Positions, with shape (N, 3).
+        colors: Colors, with shape (N, 3) or (3,).
+        points_per_node: Maximum number of points held by each node. Nodes at the
+            maximum depth can hold more.
+    """
+    assert points_per_node > 0
+    num_points = points.shape[0]
+    if num_points == 0:
+        return PointOctree(
+            points=points,
+            colors=colors,
+            keys=(),
+            starts=onp.zeros(0, dtype=onp.int64),
+            ends=onp.zeros(0, dtype=onp.int64),
+            depths=onp.zeros(0, dtype=onp.int64),
+            centers=onp.zeros((0, 3)),
+            half_sizes=onp.zeros(0),
+        )
+
+    # Sort points by the Morton code of their cell at the maximum depth. Cells at
+    # every depth are then contiguous.
+    bbox_min = points.min(axis=0).astype(onp.float64)
+    size = max(float(onp.max(points.max(axis=0) - bbox_min)), 1e-9)
+    grid = (points - bbox_min) * ((1 << _MAX_DEPTH) / size)
+    grid = onp.clip(grid, 0, (1 << _MAX_DEPTH) - 1).astype(onp.uint64)
+    codes = (
+        (_spread_bits(grid[:, 0]) << onp.uint64(2))
+        | (_spread_bits(grid[:, 1]) << onp.uint64(1))
+        | _spread_bits(grid[:, 2])
+    )
+    del grid
+    order = onp.argsort(codes)
+    codes = codes[order]
+
+    # Assign points to depths, from the root down. Each cell takes an evenly
+    # spaced subsample of the points that haven't been taken by its ancestors.
+    point_depths = onp.full(num_points, -1, dtype=onp.int8)
+    for depth in range(_MAX_DEPTH + 1):
+        remaining = onp.flatnonzero(point_depths < 0)
+        if remaining.shape[0] == 0:
+            break
+        if depth == _MAX_DEPTH:
+            point_depths[remaining] = depth
+            break
+        cells = codes[remaining] >> onp.uint64(3 * (_MAX_DEPTH - depth))
+        cell_starts = onp.concatenate([[0], onp.flatnonzero(onp.diff(cells)) + 1])
+        cell_counts = onp.diff(onp.append(cell_starts, remaining.shape[0]))
+        ranks = onp.arange(remaining.shape[0]) - onp.repeat(cell_starts, cell_counts)
+        counts = onp.repeat(cell_counts, cell_counts)
+        keep = (ranks * points_per_node) // counts != (
+            (ranks - 1) * points_per_node
+        ) // counts
+        point_depths[remaining[keep]] = depth
+
+    # Reorder points by depth. Within each depth, points are still sorted by code,
+    # so each node is contiguous. Stable sorts of small integers are radix sorts.
+    depth_order = onp.argsort(point_depths, kind="stable")
+    point_depths = point_depths[depth_order]
+    cells = codes[depth_order] >> (
+        onp.uint64(3) * (onp.uint64(_MAX_DEPTH) - point_depths.astype(onp.uint64))
+    )
+    del codes
+    order = order[depth_order]
+
+    is_start = onp.ones(num_points, dtype=bool)
+    is_start[1:] = (onp.diff(point_depths) != 0) | (onp.diff(cells) != 0)
+    starts = onp.flatnonzero(is_start)
+    ends = onp.append(starts[1:], num_points)
+    depths = point_depths[starts].astype(onp.int64)
+    node_cells = cells[starts]
+
+    cell_sizes = size / (1 << depths).astype(onp.float64)
+    cell_coords = onp.stack(
+        [
+            _compact_bits(node_cells >> onp.uint64(2)),
+            _compact_bits(node_cells >> onp.uint64(1)),
+            _compact_bits(node_cells),
+        ],
+        axis=-1,
+    ).astype(onp.float64)
+    return PointOctree(
+        points=points[order],
+        colors=colors if colors.shape == (3,) else colors[order],
+        keys=tuple(
+            format(int(cell), f"0{depth}o") if depth > 0 else ""
+            for cell, depth in zip(node_cells, depths)
+        ),
+        starts=starts,
+        ends=ends,
+        depths=depths,
+        centers=bbox_min + (cell_coords + 0.5) * cell_sizes[:, None],
+        half_sizes=cell_sizes / 2.0,
+    )
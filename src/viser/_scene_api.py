@@ -2,9 +2,20 @@ from __future__ import annotations
 
 import io
 import time
+import uuid
 import warnings
 from concurrent.futures import ThreadPoolExecutor
-from typing import TYPE_CHECKING, Callable, Tuple, TypeVar, Union, cast, get_args
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+    get_args,
+)
 
 import imageio.v3 as iio
 import numpy as onp
@@ -13,6 +24,7 @@ from typing_extensions import Literal, ParamSpec, TypeAlias, assert_never
 
 from . import _messages
 from . import transforms as tf
+from ._point_octree import build_point_octree, spheres_in_view_cone
 from ._scene_handles import (
     BatchedAxesHandle,
     BoneState,
@@ -27,18 +39,25 @@ from ._scene_handles import (
     MeshSkinnedBoneHandle,
     MeshSkinnedHandle,
     PointCloudHandle,
+    PointCloudLodHandle,
+    SceneNodeBatchHandle,
     SceneNodeHandle,
     SceneNodePointerEvent,
     ScenePointerEvent,
+    TimelineHandle,
     TransformControlsHandle,
+    TSceneNodeHandle,
+    _PointCloudLodState,
+    _SceneNodeBatchState,
     _SceneNodeHandleState,
+    _TimelineState,
     _TransformControlsState,
 )
 
 if TYPE_CHECKING:
     import trimesh
 
-    from ._viser import ClientHandle, ViserServer
+    from ._viser import CameraHandle, ClientHandle, ViserServer
     from .infra import ClientId
 
 
@@ -97,6 +116,147 @@ def _encode_image_binary(
     return media_type, binary
 
 
+_CHUNKED_TRANSFER_MIN_BYTES = 8 * 1024 * 1024
+"""Scene node messages with array payloads larger than this are streamed in parts."""
+_CHUNKED_TRANSFER_PART_BYTES = 1024 * 1024
+"""Approximate size of each streamed part."""
+
+
+def _make_transfer_messages(
+    message: _messages.Message,
+    name: str,
+    array_groups: tuple[tuple[str, ...], ...],
+    part_bytes: int,
+) -> list[_messages.Message]:
+    """Split an array-heavy scene node message into a transfer start message and
+    parts. Arrays in the same group should have the same number of rows; they're
+    streamed in lockstep, so clients can render a consistent prefix of rows."""
+    array_names: list[str] = []
+    arrays: list[onpt.NDArray[onp.uint8]] = []
+    row_sizes: list[int] = []
+    group_indices: list[int] = []
+    for group_index, group in enumerate(array_groups):
+        for array_name in group:
+            array = getattr(message, array_name)
+            if array is None:
+                continue
+            array = onp.ascontiguousarray(array)
+            array_names.append(array_name)
+            row_sizes.append(array[0:1].nbytes if array.shape[0] > 0 else 1)
+            arrays.append(array.reshape(-1).view(onp.uint8))
+            group_indices.append(group_index)
+
+    props = {k: v for k, v in vars(message).items() if k not in array_names}
+    transfer_uuid = str(uuid.uuid4())
+
+    # Parts are views into the original arrays; nothing is copied.
+    parts: list[_messages.Message] = []
+    for group_index in range(len(array_groups)):
+        indices = [i for i in range(len(arrays)) if group_indices[i] == group_index]
+        if len(indices) == 0:
+            continue
+        num_rows = arrays[indices[0]].shape[0] // row_sizes[indices[0]]
+        rows_per_part = max(
+            part_bytes // sum(row_sizes[i] for i in indices),
+            1,
+        )
+        for start in range(0, num_rows, rows_per_part):
+            end = min(start + rows_per_part, num_rows)
+            for i in indices:
+                parts.append(
+                    _messages.SceneNodeTransferPart(
+                        name=name,
+                        transfer_uuid=transfer_uuid,
+                        part=len(parts),
+                        array_name=array_names[i],
+                        offset=start * row_sizes[i],
+                        content=arrays[i][start * row_sizes[i] : end * row_sizes[i]],
+                    )
+                )
+
+    start_message = _messages.SceneNodeTransferStart(
+        name=name,
+        transfer_uuid=transfer_uuid,
+        message_type=type(message).__name__,
+        props=props,
+        array_names=tuple(array_names),
+        array_sizes=tuple(array.nbytes for array in arrays),
+        array_row_sizes=tuple(row_sizes),
+        array_groups=tuple(group_indices),
+        part_count=len(parts),
+    )
+    return [start_message] + parts
+
+
+def _encode_points(
+    points: onpt.NDArray[onp.float32],
+    precision: Literal["float32", "float16", "int16"],
+) -> tuple[onpt.NDArray[Any], tuple[float, float, float, float, float, float] | None]:
+    """Encode point positions. Returns the encoded points, and for int16 the bounding
+    box that quantized values are relative to."""
+    if precision == "float32":
+        return points, None
+    elif precision == "float16":
+        return points.astype(onp.float16), None
+    elif precision == "int16":
+        if points.shape[0] == 0:
+            return points.astype(onp.int16), (0.0,) * 6
+        bbox_min = points.min(axis=0)
+        bbox_max = points.max(axis=0)
+        extent = onp.maximum(bbox_max - bbox_min, onp.finfo(onp.float32).tiny)
+        quantized = onp.round((points - bbox_min) / extent * 65535.0) - 32768.0
+        return (
+            onp.clip(quantized, -32768, 32767).astype(onp.int16),
+            cast(
+                "tuple[float, float, float, float, float, float]",
+                tuple(map(float, onp.concatenate([bbox_min, bbox_max]))),
+            ),
+        )
+    else:
+        assert_never(precision)
+
+
+def _batched_poses(
+    num_nodes: int,
+    wxyzs: tuple[float, float, float, float] | onp.ndarray,
+    positions: tuple[float, float, float] | onp.ndarray,
+) -> tuple[onp.ndarray, onp.ndarray]:
+    """Broadcast poses for a batch of scene nodes to shapes (N, 4) and (N, 3)."""
+    wxyzs_out = onp.array(
+        onp.broadcast_to(onp.asarray(wxyzs, dtype=onp.float64), (num_nodes, 4))
+    )
+    positions_out = onp.array(
+        onp.broadcast_to(onp.asarray(positions, dtype=onp.float64), (num_nodes, 3))
+    )
+    return wxyzs_out, positions_out
+
+
+def _split_batch(nbytes: list[int], max_bytes: int) -> list[slice]:
+    """Split a batch of scene nodes into contiguous ranges, each with a payload of
+    at most `max_bytes` unless it only contains a single node."""
+    out: list[slice] = []
+    start = 0
+    total = 0
+    for i, size in enumerate(nbytes):
+        if i > start and total + size > max_bytes:
+            out.append(slice(start, i))
+            start = i
+            total = 0
+        total += size
+    if start < len(nbytes):
+        out.append(slice(start, len(nbytes)))
+    return out
+
+
+_POINT_BALL_NORM_FROM_SHAPE = {
+    "square": float("inf"),
+    "diamond": 1.0,
+    "circle": 2.0,
+    "rounded": 3.0,
+    "sparkle": 0.6,
+}
+
+
 TVector = TypeVar("TVector", bound=tuple)
 
 
@@ -149,6 +309,14 @@ class SceneApi:
             str, TransformControlsHandle
         ] = {}
         self._handle_from_node_name: dict[str, SceneNodeHandle] = {}
+        self._transfer_part_count_from_name: dict[str, int] = {}
+
+        server = owner if isinstance(owner, ViserServer) else owner._viser_server
+        self._bounds_from_name: dict[str, tuple[onp.ndarray, float]] | None = (
+            {} if server._camera_aware_streaming else None
+        )
+        """Bounding spheres of scene nodes with geometry, as a center and radius in
+        the local frame of each node. Only tracked for camera-aware streaming."""
 
         self._scene_pointer_cb: Callable[[ScenePointerEvent], None] | None = None
         self._scene_pointer_done_cb: Callable[[], None] = lambda: None
@@ -169,6 +337,160 @@ class SceneApi:
 
         self._thread_executor = thread_executor
 
+    def _queue_array_message(
+        self,
+        message: _messages.Message,
+        name: str,
+        array_groups: tuple[tuple[str, ...], ...],
+    ) -> None:
+        """Queue a scene node message with array payloads. Large messages are
+        streamed to clients in parts, which are rendered progressively. Once a scene
+        node has been streamed, it's streamed until it's removed, so that parts of
+        old transfers are always overwritten."""
+        array_bytes = sum(
+            getattr(message, array_name).nbytes
+            for group in array_groups
+            for array_name in group
+            if getattr(message, array_name) is not None
+        )
+        if (
+            array_bytes < _CHUNKED_TRANSFER_MIN_BYTES
+            and name not in self._transfer_part_count_from_name
+        ):
+            self._websock_interface.queue_message(message)
+            return
+
+        messages = _make_transfer_messages(
+            message, name, array_groups, _CHUNKED_TRANSFER_PART_BYTES
+        )
+        for transfer_message in messages:
+            self._websock_interface.queue_message(transfer_message)
+
+        # Parts are culled by scene node name and part index. If a previous transfer
+        # for this node had more parts, we overwrite the leftovers with empty ones.
+        start_message = messages[0]
+        assert isinstance(start_message, _messages.SceneNodeTransferStart)
+        part_count = start_message.part_count
+        for part in range(part_count, self._transfer_part_count_from_name.get(name, 0)):
+            self._websock_interface.queue_message(
+                _messages.SceneNodeTransferPart(
+                    name=name,
+                    transfer_uuid=start_message.transfer_uuid,
+                    part=part,
+                    array_name="",
+                    offset=0,
+                    content=onp.zeros(0, dtype=onp.uint8),
+                )
+            )
+        self._transfer_part_count_from_name[name] = part_count
+
+    def _forget_transfers(self, name: str) -> None:
+        """Forget the streamed parts of a scene node and its descendants, which are
+        dropped from the message buffer when the scene node is removed."""
+        prefix = name.rstrip("/") + "/"
+        for transfer_name in [
+            transfer_name
+            for transfer_name in self._transfer_part_count_from_name
+            if transfer_name == name or transfer_name.startswith(prefix)
+        ]:
+            self._transfer_part_count_from_name.pop(transfer_name)
+
+    def _register_bounds(self, name: str, points: onp.ndarray) -> None:
+        """Record the bounding sphere of a scene node's geometry, if bounds are
+        being tracked."""
+        if self._bounds_from_name is None or points.shape[0] == 0:
+            return
+        bbox_min = points.min(axis=0).astype(onp.float64)
+        bbox_max = points.max(axis=0).astype(onp.float64)
+        self._bounds_from_name[name] = (
+            (bbox_min + bbox_max) / 2.0,
+            float(onp.linalg.norm(bbox_max - bbox_min)) / 2.0,
+        )
+
+    def _get_T_world_node(self, name: str) -> tf.SE3:
+        """Pose of a scene node in the world frame, from the poses of it and its
+        ancestors. Nodes without handles are assumed to have identity poses."""
+        T_world_node = tf.SE3.identity()
+        parts = name.split("/")
+        for i in range(1, len(parts) + 1):
+            handle = self._handle_from_node_name.get("/".join(parts[:i]), None)
+            if handle is None:
+                continue
+            T_world_node = T_world_node @ tf.SE3.from_rotation_and_translation(
+                tf.SO3(onp.asarray(handle.wxyz, dtype=onp.float64)),
+                onp.asarray(handle.position, dtype=onp.float64),
+            )
+        return T_world_node
+
+    def _rank_for_camera(
+        self,
+        names: Sequence[str],
+        camera: CameraHandle,
+        wxyzs: onp.ndarray | None = None,
+        positions: onp.ndarray | None = None,
+    ) -> float:
+        """Rank scene nodes for streaming to a client, and return the highest rank.
+
+        Nodes that overlap the camera's view rank above nodes that don't, and closer
+        nodes rank above farther ones. Poses relative to parent frames default to
+        the poses of the nodes' handles. Nodes without recorded bounds are treated
+        as points."""
+        num_nodes = len(names)
+        centers = onp.zeros((num_nodes, 3))
+        radii = onp.zeros(num_nodes)
+        T_world_parents = onp.zeros((num_nodes, 7))
+        T_world_parent_from_name: dict[str, tf.SE3] = {}
+        for i, name in enumerate(names):
+            if self._bounds_from_name is not None and name in self._bounds_from_name:
+                centers[i], radii[i] = self._bounds_from_name[name]
+            parent_name = name.rpartition("/")[0]
+            if parent_name not in T_world_parent_from_name:
+                T_world_parent_from_name[parent_name] = self._get_T_world_node(
+                    parent_name
+                )
+            T_world_parents[i] = T_world_parent_from_name[parent_name].wxyz_xyz
+
+        if wxyzs is None or positions is None:
+            handles = [self._handle_from_node_name.get(name, None) for name in names]
+            wxyzs = onp.array(
+                [(1.0, 0.0, 0.0, 0.0) if h is None else h.wxyz for h in handles]
+            )
+            positions = onp.array(
+                [(0.0, 0.0, 0.0) if h is None else h.position for h in handles]
+            )
+        T_world_nodes = tf.SE3(T_world_parents) @ tf.SE3.from_rotation_and_translation(
+            tf.SO3(wxyzs.astype(onp.float64)), positions.astype(onp.float64)
+        )
+
+        offsets = T_world_nodes @ centers - camera.position
+        in_view = spheres_in_view_cone(
+            offsets,
+            radii,
+            tf.SO3(camera.wxyz) @ onp.array([0.0, 0.0, 1.0]),
+            float(onp.tan(camera.fov / 2.0) * onp.sqrt(1.0 + camera.aspect**2)),
+        )
+        distances = onp.maximum(onp.linalg.norm(offsets, axis=-1) - radii, 0.0)
+        return float(onp.max(in_view + 1.0 / (1.0 + distances)))
+
+    def _make_batch_handle(
+        self,
+        handle_type: type[TSceneNodeHandle],
+        names: tuple[str, ...],
+        wxyzs: onp.ndarray,
+        positions: onp.ndarray,
+        visible: bool,
+    ) -> SceneNodeBatchHandle[TSceneNodeHandle]:
+        return SceneNodeBatchHandle(
+            _SceneNodeBatchState(
+                names,
+                self,
+                handle_type,
+                wxyzs,
+                positions,
+                onp.full(len(names), visible),
+            )
+        )
+
     def set_up_direction(
         self,
         direction: Literal["+x", "+y", "+z", "-x", "-y", "-z"]
@@ -254,6 +576,112 @@ class SceneApi:
             _messages.SetSceneNodeVisibilityMessage("", visible)
         )
 
+    def set_poses(
+        self,
+        names: Sequence[str],
+        wxyzs: tuple[float, float, float, float] | onp.ndarray | None = None,
+        positions: tuple[float, float, float] | onp.ndarray | None = None,
+    ) -> None:
+        """Set the poses of many scene nodes at once. Equivalent to assigning `wxyz`
+        and `position` for each node, but orientations and positions are each sent
+        as a single message. Both messages are applied by clients atomically.
+
+        Handles of the nodes are updated. For nodes that were added as a batch, for
+        example via :meth:`add_frames()`, assigning to the properties of the
+        :class:`SceneNodeBatchHandle` also keeps the batch's arrays in sync.
+
+        Args:
+            names: Names of the scene nodes.
+            wxyzs: Orientations, with shape (N, 4) or (4,). If None, orientations
+                aren't changed.
+            positions: Positions, with shape (N, 3) or (3,). If None, positions
+                aren't changed.
+        """
+        names = tuple(names)
+        if len(names) == 0:
+            return
+        if wxyzs is not None:
+            wxyzs = onp.array(
+                onp.broadcast_to(onp.asarray(wxyzs, dtype=onp.float64), (len(names), 4))
+            )
+        if positions is not None:
+            positions = onp.array(
+                onp.broadcast_to(
+                    onp.asarray(positions, dtype=onp.float64), (len(names), 3)
+                )
+            )
+
+        with self._owner.atomic():
+            is_world_axes = self._world_axes_mask(names)
+            if onp.any(is_world_axes):
+                index = int(onp.flatnonzero(is_world_axes)[-1])
+                if wxyzs is not None:
+                    self.world_axes.wxyz = wxyzs[index]
+                    wxyzs = wxyzs[~is_world_axes]
+                if positions is not None:
+                    self.world_axes.position = positions[index]
+                    positions = positions[~is_world_axes]
+                names = tuple(n for n, w in zip(names, is_world_axes) if not w)
+                if len(names) == 0:
+                    return
+
+            handles = [self._handle_from_node_name.get(name, None) for name in names]
+            if wxyzs is not None:
+                for handle, wxyz in zip(handles, wxyzs):
+                    if handle is not None:
+                        handle._impl.wxyz = wxyz
+                self._websock_interface.queue_message(
+                    _messages.SetOrientationsMessage(names, wxyzs.astype(onp.float32))
+                )
+            if positions is not None:
+                for handle, position in zip(handles, positions):
+                    if handle is not None:
+                        handle._impl.position = position
+                self._websock_interface.queue_message(
+                    _messages.SetPositionsMessage(names, positions.astype(onp.float32))
+                )
+
+    def set_visibility(self, names: Sequence[str], visible: bool | onp.ndarray) -> None:
+        """Set the visibility of many scene nodes at once. Equivalent to assigning
+        `visible` for each node, but sent as a single message.
+
+        Args:
+            names: Names of the scene nodes.
+            visible: Whether each node should be visible. Either a single boolean,
+                or a boolean mask with shape (N,).
+        """
+        names = tuple(names)
+        if len(names) == 0:
+            return
+        visible = onp.array(
+            onp.broadcast_to(onp.asarray(visible, dtype=onp.bool_), (len(names),))
+        )
+
+        with self._owner.atomic():
+            is_world_axes = self._world_axes_mask(names)
+            if onp.any(is_world_axes):
+                index = int(onp.flatnonzero(is_world_axes)[-1])
+                self.world_axes.visible = bool(visible[index])
+                visible = visible[~is_world_axes]
+                names = tuple(n for n, w in zip(names, is_world_axes) if not w)
+                if len(names) == 0:
+                    return
+
+            for name, node_visible in zip(names, visible):
+                handle = self._handle_from_node_name.get(name, None)
+                if handle is not None:
+                    handle._impl.visible = bool(node_visible)
+            self._websock_interface.queue_message(
+                _messages.SetSceneNodeVisibilitiesMessage(names, visible)
+            )
+
+    def _world_axes_mask(self, names: tuple[str, ...]) -> onp.ndarray:
+        """Mask of the world axes in a bulk update. Updates for the world axes aren't
+        scoped, so that they persist across scene resets (see
+        :meth:`Message.persistent_scope()`). They're sent per-node instead, since
+        a bulk update is dropped once all of its scopes are cleared."""
+        return onp.array([name == "/WorldAxes" for name in names], dtype=bool)
+
     def add_glb(
         self,
         name: str,
@@ -464,6 +892,95 @@ class SceneApi:
         )
         return CameraFrustumHandle._make(self, name, wxyz, position, visible)
 
+    def add_camera_frustums(
+        self,
+        names: Sequence[str],
+        fovs: float | Sequence[float] | onp.ndarray,
+        aspects: float | Sequence[float] | onp.ndarray,
+        scale: float = 0.3,
+        colors: RgbTupleOrArray = (20, 20, 20),
+        images: Sequence[onp.ndarray] | None = None,
+        format: Literal["png", "jpeg"] = "jpeg",
+        jpeg_quality: int | None = None,
+        wxyzs: tuple[float, float, float, float] | onp.ndarray = (1.0, 0.0, 0.0, 0.0),
+        positions: tuple[float, float, float] | onp.ndarray = (0.0, 0.0, 0.0),
+        visible: bool = True,
+        thickness: float = 1.0,
+    ) -> SceneNodeBatchHandle[CameraFrustumHandle]:
+        """Add a batch of camera frustums to the scene.
+
+        Equivalent to calling :meth:`add_camera_frustum()` for each name, but
+        frustums are sent to clients together, with their poses and visibility, in
+        as few messages as possible.
+
+        Args:
+            names: Scene tree names, one for each frustum.
+            fovs: Field of view of each camera (in radians). Can be a single value
+                or one value for each frustum.
+            aspects: Aspect ratio of each camera (width over height). Can be a single
+                value or one value for each frustum.
+            scale: Scale factor for the size of the frustums.
+            colors: Colors of the frustums, with shape (3,) or (N, 3).
+            images: Optional images to be displayed on the frustums, one for each.
+            format: Format of the provided images ('png' or 'jpeg').
+            jpeg_quality: Quality of the jpeg images (if jpeg format is used).
+            wxyzs: Quaternion rotations to parent frames from local frames (R_pl),
+                with shape (4,) or (N, 4).
+            positions: Translations to parent frames from local frames (t_pl), with
+                shape (3,) or (N, 3).
+            visible: Whether or not these scene nodes are initially visible.
+            thickness: Thickness of the frustum lines.
+
+        Returns:
+            Handle for the batch of scene nodes.
+        """
+        names = tuple(names)
+        num_nodes = len(names)
+        wxyzs_cast, positions_cast = _batched_poses(num_nodes, wxyzs, positions)
+        fovs_cast = onp.broadcast_to(onp.asarray(fovs, dtype=onp.float32), num_nodes)
+        aspects_cast = onp.broadcast_to(
+            onp.asarray(aspects, dtype=onp.float32), num_nodes
+        )
+        colors_cast = onp.broadcast_to(
+            _colors_to_uint8(onp.asarray(colors)), (num_nodes, 3)
+        )
+
+        media_type = None
+        binaries: list[bytes] = []
+        if images is not None:
+            assert len(images) == num_nodes, "Expected one image for each frustum."
+            for image in images:
+                media_type, binary = _encode_image_binary(
+                    image, format, jpeg_quality=jpeg_quality
+                )
+                binaries.append(binary)
+
+        # Very large batches are split, so they don't hold up other messages.
+        for batch in _split_batch(
+            [len(binary) for binary in binaries]
+            if images is not None
+            else [0] * num_nodes,
+            _CHUNKED_TRANSFER_MIN_BYTES,
+        ):
+            self._websock_interface.queue_message(
+                _messages.CameraFrustumsMessage(
+                    names=names[batch],
+                    wxyzs=wxyzs_cast[batch].astype(onp.float32),
+                    positions=positions_cast[batch].astype(onp.float32),
+                    visible=visible,
+                    fovs=onp.ascontiguousarray(fovs_cast[batch]),
+                    aspects=onp.ascontiguousarray(aspects_cast[batch]),
+                    scale=scale,
+                    colors=onp.ascontiguousarray(colors_cast[batch]),
+                    thickness=thickness,
+                    image_media_type=media_type,
+                    image_binaries=tuple(binaries[batch]),
+                )
+            )
+        return self._make_batch_handle(
+            CameraFrustumHandle, names, wxyzs_cast, positions_cast, visible
+        )
+
     def add_frame(
         self,
         name: str,
@@ -513,6 +1030,59 @@ class SceneApi:
         )
         return FrameHandle._make(self, name, wxyz, position, visible)
 
+    def add_frames(
+        self,
+        names: Sequence[str],
+        show_axes: bool = True,
+        axes_length: float = 0.5,
+        axes_radius: float = 0.025,
+        origin_radius: float | None = None,
+        wxyzs: tuple[float, float, float, float] | onp.ndarray = (1.0, 0.0, 0.0, 0.0),
+        positions: tuple[float, float, float] | onp.ndarray = (0.0, 0.0, 0.0),
+        visible: bool = True,
+    ) -> SceneNodeBatchHandle[FrameHandle]:
+        """Add a batch of coordinate frames to the scene.
+
+        Equivalent to calling :meth:`add_frame()` for each name, but frames are sent
+        to clients in a single message, with their poses and visibility. Unlike
+        :meth:`add_batched_axes()`, each frame is a separate scene node, which
+        other nodes can be parented to.
+
+        Args:
+            names: Scene tree names, one for each frame.
+            show_axes: Boolean to indicate whether to show the frames as a set of axes + origin sphere.
+            axes_length: Length of each axis.
+            axes_radius: Radius of each axis.
+            origin_radius: Radius of the origin sphere. If not set, defaults to `2 * axes_radius`.
+            wxyzs: Quaternion rotations to parent frames from local frames (R_pl),
+                with shape (4,) or (N, 4).
+            positions: Translations to parent frames from local frames (t_pl), with
+                shape (3,) or (N, 3).
+            visible: Whether or not these scene nodes are initially visible.
+
+        Returns:
+            Handle for the batch of scene nodes.
+        """
+        if origin_radius is None:
+            origin_radius = axes_radius * 2
+        names = tuple(names)
+        wxyzs_cast, positions_cast = _batched_poses(len(names), wxyzs, positions)
+        self._websock_interface.queue_message(
+            _messages.FramesMessage(
+                names=names,
+                wxyzs=wxyzs_cast.astype(onp.float32),
+                positions=positions_cast.astype(onp.float32),
+                visible=visible,
+                show_axes=show_axes,
+                axes_length=axes_length,
+                axes_radius=axes_radius,
+                origin_radius=origin_radius,
+            )
+        )
+        return self._make_batch_handle(
+            FrameHandle, names, wxyzs_cast, positions_cast, visible
+        )
+
     def add_batched_axes(
         self,
         name: str,
@@ -655,6 +1225,64 @@ class SceneApi:
         self._websock_interface.queue_message(_messages.LabelMessage(name, text))
         return LabelHandle._make(self, name, wxyz, position, visible=visible)
 
+    def add_timeline(
+        self,
+        name: str,
+        frame_names: Sequence[str],
+        fps: float = 10.0,
+        playing: bool = False,
+        loop: bool = True,
+        frame: int = 0,
+        show_all: bool = False,
+        wxyz: tuple[float, float, float, float] | onp.ndarray = (1.0, 0.0, 0.0, 0.0),
+        position: tuple[float, float, float] | onp.ndarray = (0.0, 0.0, 0.0),
+        visible: bool = True,
+    ) -> TimelineHandle:
+        """Add a timeline to the scene, for playing back a sequence of scene nodes.
+
+        One frame is shown at a time. Frames are advanced by each client at `fps`,
+        so playback is smooth regardless of server load or network latency; the
+        returned handle only sends play, pause, and seek commands. Frames are
+        typically children of the timeline, for example `{name}/t0`, `{name}/t1`,
+        and so on, and can be added before or after the timeline.
+
+        Args:
+            name: Name of the timeline.
+            frame_names: Names of the scene nodes for each frame, in order.
+            fps: Playback rate, in frames per second.
+            playing: Whether to start playing immediately.
+            loop: Whether playback restarts from the first frame after the last one.
+            frame: Index of the initial frame.
+            show_all: Show every frame at once, regardless of the playback state.
+            wxyz: Quaternion rotation to parent frame from local frame (R_pl).
+            position: Translation to parent frame from local frame (t_pl).
+            visible: Whether or not this scene node is initially visible.
+
+        Returns:
+            Handle for controlling playback.
+        """
+        assert fps > 0.0
+        frame_names = tuple(frame_names)
+        self._websock_interface.queue_message(
+            _messages.TimelineMessage(name, frame_names)
+        )
+        node_handle = SceneNodeHandle._make(self, name, wxyz, position, visible)
+        handle = TimelineHandle(
+            node_handle._impl,
+            _TimelineState(
+                frame_names=frame_names,
+                playing=playing,
+                frame=range(len(frame_names))[frame] if len(frame_names) > 0 else 0,
+                fps=fps,
+                loop=loop,
+                show_all=show_all,
+                frame_time=time.time(),
+            ),
+        )
+        self._handle_from_node_name[name] = handle
+        handle._update()
+        return handle
+
     def add_point_cloud(
         self,
         name: str,
@@ -667,6 +1295,8 @@ class SceneApi:
         wxyz: tuple[float, float, float, float] | onp.ndarray = (1.0, 0.0, 0.0, 0.0),
         position: tuple[float, float, float] | onp.ndarray = (0.0, 0.0, 0.0),
         visible: bool = True,
+        position_precision: Literal["float32", "float16", "int16"] = "float32",
+        color_palette: bool = False,
     ) -> PointCloudHandle:
         """Add a point cloud to the scene.
 
@@ -679,6 +1309,11 @@ class SceneApi:
             wxyz: Quaternion rotation to parent frame from local frame (R_pl).
             position: Translation to parent frame from local frame (t_pl).
             visible: Whether or not this scene node is initially visible.
+            position_precision: Precision used to send point positions to clients.
+                "float16" halves the payload size. "int16" also halves it, and
+                quantizes positions uniformly within the bounding box of the points.
+            color_palette: If True and there are at most 256 unique colors, send
+                colors as 1-byte indices into a palette.
 
         Returns:
             Handle for manipulating scene node.
@@ -692,25 +1327,281 @@ class SceneApi:
             (3,),
         }, "Shape of colors should be (N, 3) or (3,)."
 
+        points_cast = points.astype(onp.float32)
+        points_encoded, points_bbox = _encode_points(points_cast, position_precision)
+
+        # A single color is sent as-is. The client broadcasts it to all points.
+        colors_encoded = colors_cast
+        palette = None
+        if color_palette and colors_cast.shape != (3,):
+            palette, indices = onp.unique(colors_cast, axis=0, return_inverse=True)
+            if palette.shape[0] <= 256:
+                colors_encoded = indices.reshape(-1).astype(onp.uint8)
+            else:
+                palette = None
+
+        message = _messages.PointCloudMessage(
+            name=name,
+            points=points_encoded,
+            colors=colors_encoded,
+            point_size=point_size,
+            point_ball_norm=_POINT_BALL_NORM_FROM_SHAPE[point_shape],
+            precision=position_precision,
+            points_bbox=points_bbox,
+            color_palette=palette,
+        )
+        self._register_bounds(name, points_cast)
+        self._queue_array_message(
+            message,
+            name,
+            array_groups=(
+                (("points",),)
+                if palette is None and colors_encoded.shape == (3,)
+                else (("points", "colors"),)
+            ),
+        )
+
+        # Updates from the handle are always sent in the canonical encoding.
         if colors_cast.shape == (3,):
             colors_cast = onp.tile(colors_cast[None, :], reps=(points.shape[0], 1))
+        handle = PointCloudHandle._make(self, name, wxyz, position, visible)
+        handle._register_array("points", points_cast)
+        handle._register_array("colors", colors_cast)
+        return handle
+
+    def add_point_clouds(
+        self,
+        names: Sequence[str],
+        points: Sequence[onp.ndarray],
+        colors: Sequence[onp.ndarray | tuple[float, float, float]]
+        | tuple[float, float, float]
+        | onp.ndarray,
+        point_size: float = 0.1,
+        point_shape: Literal[
+            "square", "diamond", "circle", "rounded", "sparkle"
+        ] = "square",
+        wxyzs: tuple[float, float, float, float] | onp.ndarray = (1.0, 0.0, 0.0, 0.0),
+        positions: tuple[float, float, float] | onp.ndarray = (0.0, 0.0, 0.0),
+        visible: bool = True,
+    ) -> SceneNodeBatchHandle[SceneNodeHandle]:
+        """Add a batch of point clouds to the scene.
+
+        Equivalent to calling :meth:`add_point_cloud()` for each name, but point
+        clouds are sent to clients together, with their poses and visibility, in as
+        few messages as possible. Points and colors of batched point clouds can't be
+        updated after they're added. Point clouds that are large enough to be
+        streamed in parts are added individually.
+
+        Args:
+            names: Scene tree names, one for each point cloud.
+            points: Location of points for each point cloud. Each should have shape
+                (N_i, 3).
+            colors: Colors of points for each point cloud. Each should have shape
+                (N_i, 3) or (3,). A single color of shape (3,) is used for all points.
+            point_size: Size of each point.
+            point_shape: Shape to draw each point.
+            wxyzs: Quaternion rotations to parent frames from local frames (R_pl),
+                with shape (4,) or (N, 4).
+            positions: Translations to parent frames from local frames (t_pl), with
+                shape (3,) or (N, 3).
+            visible: Whether or not these scene nodes are initially visible.
+
+        Returns:
+            Handle for the batch of scene nodes.
+        """
+        names = tuple(names)
+        num_nodes = len(names)
+        assert len(points) == num_nodes, "Expected points for each point cloud."
+        wxyzs_cast, positions_cast = _batched_poses(num_nodes, wxyzs, positions)
+
+        if (isinstance(colors, onp.ndarray) and colors.shape == (3,)) or (
+            isinstance(colors, tuple)
+            and len(colors) == 3
+            and not any(isinstance(c, (onp.ndarray, tuple)) for c in colors)
+        ):
+            colors = [cast(Tuple[float, float, float], colors)] * num_nodes
+        assert len(colors) == num_nodes, "Expected colors for each point cloud."
+
+        points_list: list[onp.ndarray] = []
+        colors_list: list[onp.ndarray] = []
+        for points_i, colors_i in zip(points, colors):
+            assert (
+                len(points_i.shape) == 2 and points_i.shape[-1] == 3
+            ), "Shape of points should be (N, 3)."
+            colors_i = _colors_to_uint8(onp.asarray(colors_i))
+            assert colors_i.shape in {
+                points_i.shape,
+                (3,),
+            }, "Shape of colors should be (N, 3) or (3,)."
+            points_list.append(points_i.astype(onp.float32))
+            colors_list.append(onp.broadcast_to(colors_i, points_i.shape))
+        for name_i, points_i in zip(names, points_list):
+            self._register_bounds(name_i, points_i)
+
+        handle = self._make_batch_handle(
+            SceneNodeHandle, names, wxyzs_cast, positions_cast, visible
+        )
+        point_ball_norm = _POINT_BALL_NORM_FROM_SHAPE[point_shape]
+        for batch in _split_batch(
+            [p.nbytes + c.nbytes for p, c in zip(points_list, colors_list)],
+            _CHUNKED_TRANSFER_MIN_BYTES,
+        ):
+            indices = range(num_nodes)[batch]
+            if (
+                len(indices) == 1
+                and points_list[batch.start].nbytes + colors_list[batch.start].nbytes
+                >= _CHUNKED_TRANSFER_MIN_BYTES
+            ):
+                # Large point clouds are streamed in parts.
+                index = batch.start
+                handle._impl.handles[index] = self.add_point_cloud(
+                    names[index],
+                    points=points_list[index],
+                    colors=onp.ascontiguousarray(colors_list[index]),
+                    point_size=point_size,
+                    point_shape=point_shape,
+                    wxyz=wxyzs_cast[index],
+                    position=positions_cast[index],
+                    visible=visible,
+                )
+                continue
+
+            self._websock_interface.queue_message(
+                _messages.PointCloudsMessage(
+                    names=names[batch],
+                    wxyzs=wxyzs_cast[batch].astype(onp.float32),
+                    positions=positions_cast[batch].astype(onp.float32),
+                    visible=visible,
+                    points=onp.concatenate(
+                        [onp.zeros((0, 3), dtype=onp.float32)] + points_list[batch]
+                    ),
+                    colors=onp.concatenate(
+                        [onp.zeros((0, 3), dtype=onp.uint8)] + colors_list[batch]
+                    ),
+                    point_counts=onp.array(
+                        [points_list[i].shape[0] for i in indices], dtype=onp.uint32
+                    ),
+                    point_size=point_size,
+                    point_ball_norm=point_ball_norm,
+                )
+            )
+        return handle
+
+    def add_point_cloud_lod(
+        self,
+        name: str,
+        points: onp.ndarray,
+        colors: onp.ndarray | tuple[float, float, float],
+        point_size: float = 0.1,
+        point_shape: Literal[
+            "square", "diamond", "circle", "rounded", "sparkle"
+        ] = "square",
+        points_per_node: int = 50_000,
+        initial_points: int = 500_000,
+        max_points_per_client: int = 4_000_000,
+        position_precision: Literal["float32", "float16", "int16"] = "int16",
+        wxyz: tuple[float, float, float, float] | onp.ndarray = (1.0, 0.0, 0.0, 0.0),
+        position: tuple[float, float, float] | onp.ndarray = (0.0, 0.0, 0.0),
+        visible: bool = True,
+    ) -> PointCloudLodHandle:
+        """Add a point cloud that's streamed to clients at multiple levels of detail.
+
+        Intended for point clouds that are too large to send at full resolution,
+        like reconstructions with tens of millions of points. Points are organized
+        into an octree on the server. Its coarse levels are sent to every client
+        immediately, so a subsampled version of the whole cloud appears quickly.
+        Finer nodes are then streamed to each client based on its camera: nodes that
+        are large on screen are sent first, nodes outside of the view are skipped,
+        and nodes that are no longer needed are removed.
+
+        Args:
+            name: Name of scene node. Determines location in kinematic tree.
+            points: Location of points. Should have shape (N, 3).
+            colors: Colors of points. Should have shape (N, 3) or (3,).
+            point_size: Size of each point.
+            point_shape: Shape to draw each point.
+            points_per_node: Maximum number of points in each octree node.
+            initial_points: Maximum number of points sent to every client up front.
+                At least the root node is always sent.
+            max_points_per_client: Maximum number of points shown by each client,
+                not counting coarse nodes outside of its view.
+            position_precision: Precision used to send point positions to clients.
+                See :meth:`add_point_cloud()`. Positions are quantized relative to
+                each octree node, so "int16" is typically accurate enough.
+            wxyz: Quaternion rotation to parent frame from local frame (R_pl).
+            position: Translation to parent frame from local frame (t_pl).
+            visible: Whether or not this scene node is initially visible.
+
+        Returns:
+            Handle for manipulating scene node.
+        """
+        from ._viser import ViserServer
+
+        colors_cast = _colors_to_uint8(onp.asarray(colors))
+        assert (
+            len(points.shape) == 2 and points.shape[-1] == 3
+        ), "Shape of points should be (N, 3)."
+        assert colors_cast.shape in {
+            points.shape,
+            (3,),
+        }, "Shape of colors should be (N, 3) or (3,)."
+        octree = build_point_octree(
+            points.astype(onp.float32), colors_cast, points_per_node
+        )
+
+        # Send whole levels, coarsest first, while they fit in `initial_points`.
+        initial_nodes = 0
+        if len(octree.keys) > 0:
+            level_ends = onp.searchsorted(
+                octree.depths, onp.arange(octree.depths[-1] + 1), side="right"
+            )
+            num_levels = onp.count_nonzero(
+                octree.ends[level_ends - 1] <= initial_points
+            )
+            initial_nodes = int(level_ends[max(num_levels - 1, 0)])
 
         self._websock_interface.queue_message(
-            _messages.PointCloudMessage(
+            _messages.FrameMessage(
                 name=name,
-                points=points.astype(onp.float32),
-                colors=colors_cast,
-                point_size=point_size,
-                point_ball_norm={
-                    "square": float("inf"),
-                    "diamond": 1.0,
-                    "circle": 2.0,
-                    "rounded": 3.0,
-                    "sparkle": 0.6,
-                }[point_shape],
+                show_axes=False,
+                axes_length=0.5,
+                axes_radius=0.025,
+                origin_radius=0.05,
             )
         )
-        return PointCloudHandle._make(self, name, wxyz, position, visible)
+        old_handle = self._handle_from_node_name.get(name, None)
+        if isinstance(old_handle, PointCloudLodHandle):
+            old_handle._release()
+        node_handle = SceneNodeHandle._make(self, name, wxyz, position, visible)
+        handle = PointCloudLodHandle(
+            node_handle._impl,
+            _PointCloudLodState(
+                octree=octree,
+                point_size=point_size,
+                point_ball_norm=_POINT_BALL_NORM_FROM_SHAPE[point_shape],
+                precision=position_precision,
+                initial_nodes=initial_nodes,
+                max_points_per_client=max_points_per_client,
+            ),
+        )
+        self._handle_from_node_name[name] = handle
+        if self._bounds_from_name is not None:
+            for node, (center, half_size) in enumerate(
+                zip(octree.centers, octree.half_sizes)
+            ):
+                self._bounds_from_name[handle._node_name(node)] = (
+                    center,
+                    float(half_size) * onp.sqrt(3.0),
+                )
+        for node in range(initial_nodes):
+            self._websock_interface.queue_message(handle._node_message(node))
+
+        if isinstance(self._owner, ViserServer):
+            self._owner.on_client_connect(handle._track_client)
+            self._owner.on_client_disconnect(handle._untrack_client)
+        else:
+            handle._track_client(self._owner)
+        return handle
 
     def add_mesh_skinned(
         self,
@@ -786,6 +1677,7 @@ class SceneApi:
         bone_positions = onp.asarray(bone_positions)
         assert bone_wxyzs.shape == (num_bones, 4)
         assert bone_positions.shape == (num_bones, 3)
+        self._register_bounds(name, vertices)
         self._websock_interface.queue_message(
             _messages.SkinnedMeshMessage(
                 name,
@@ -882,22 +1774,30 @@ class SceneApi:
                 stacklevel=2,
             )
 
-        self._websock_interface.queue_message(
-            _messages.MeshMessage(
-                name,
-                vertices.astype(onp.float32),
-                faces.astype(onp.uint32),
-                # (255, 255, 255) => 0xffffff, etc
-                color=_encode_rgb(color),
-                vertex_colors=None,
-                wireframe=wireframe,
-                opacity=opacity,
-                flat_shading=flat_shading,
-                side=side,
-                material=material,
-            )
+        message = _messages.MeshMessage(
+            name,
+            vertices.astype(onp.float32),
+            faces.astype(onp.uint32),
+            # (255, 255, 255) => 0xffffff, etc
+            color=_encode_rgb(color),
+            vertex_colors=None,
+            wireframe=wireframe,
+            opacity=opacity,
+            flat_shading=flat_shading,
+            side=side,
+            material=material,
+        )
+        self._register_bounds(name, message.vertices)
+        self._queue_array_message(
+            message,
+            name,
+            # Vertices are streamed before faces, so partial meshes never reference
+            # missing vertices.
+            array_groups=(("vertices", "vertex_colors"), ("faces",)),
         )
-        return MeshHandle._make(self, name, wxyz, position, visible)
+        handle = MeshHandle._make(self, name, wxyz, position, visible)
+        handle._register_array("vertices", message.vertices)
+        return handle
 
     def add_mesh_trimesh(
         self,
@@ -995,11 +1895,14 @@ class SceneApi:
         ).view(onp.uint32)
         assert buffer.shape == (num_gaussians, 8)
 
-        self._websock_interface.queue_message(
+        self._register_bounds(name, centers)
+        self._queue_array_message(
             _messages.GaussianSplatsMessage(
                 name=name,
                 buffer=buffer,
-            )
+            ),
+            name,
+            array_groups=(("buffer",),),
         )
         node_handle = GaussianSplatHandle._make(self, name, wxyz, position, visible)
         return node_handle
@@ -1269,6 +2172,10 @@ class SceneApi:
 
     def reset(self) -> None:
         """Reset the scene."""
+        for handle in self._handle_from_node_name.values():
+            if isinstance(handle, PointCloudLodHandle):
+                handle._release()
+        self._transfer_part_count_from_name.clear()
         self._websock_interface.queue_message(_messages.ResetSceneMessage())
 
     def _get_client_handle(self, client_id: ClientId) -> ClientHandle:
@@ -1,18 +1,32 @@
 from __future__ import annotations
 
 import dataclasses
-from typing import TYPE_CHECKING, Callable, Generic, Literal, TypeVar
+import threading
+import time
+import traceback
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Generic,
+    Iterator,
+    Literal,
+    TypeVar,
+    cast,
+)
 
 import numpy as onp
 
 from . import _messages
+from . import transforms as tf
+from ._point_octree import PointOctree
 from .infra._infra import WebsockClientConnection, WebsockServer
 
 if TYPE_CHECKING:
     from ._gui_api import GuiApi
     from ._gui_handles import SupportsRemoveProtocol
     from ._scene_api import SceneApi
-    from ._viser import ClientHandle
+    from ._viser import CameraHandle, ClientHandle
     from .infra import ClientId
 
 
@@ -44,6 +58,15 @@ class ScenePointerEvent:
 TSceneNodeHandle = TypeVar("TSceneNodeHandle", bound="SceneNodeHandle")
 
 
+@dataclasses.dataclass
+class _SyncedArrayState:
+    """Array attribute of a scene node that's synchronized with partial updates."""
+
+    value: onp.ndarray
+    dirty_rows: onp.ndarray
+    """Rows that have changed since the last full update."""
+
+
 @dataclasses.dataclass
 class _SceneNodeHandleState:
     name: str
@@ -59,6 +82,7 @@ class _SceneNodeHandleState:
     click_cb: list[Callable[[SceneNodePointerEvent[SceneNodeHandle]], None]] | None = (
         None
     )
+    arrays: dict[str, _SyncedArrayState] = dataclasses.field(default_factory=dict)
 
 
 @dataclasses.dataclass
@@ -138,10 +162,216 @@ class SceneNodeHandle:
 
     def remove(self) -> None:
         """Remove the node from the scene."""
+        self._impl.api._forget_transfers(self._impl.name)
         self._impl.api._websock_interface.queue_message(
             _messages.RemoveSceneNodeMessage(self._impl.name)
         )
 
+    def _register_array(self, array_name: str, value: onp.ndarray) -> None:
+        """Track an array attribute that was sent when the scene node was added.
+
+        We keep a private copy: the sent array is referenced by buffered messages,
+        so it shouldn't be diffed against or mutated."""
+        self._impl.arrays[array_name] = _SyncedArrayState(
+            value.copy(), onp.zeros(value.shape[0], dtype=bool)
+        )
+
+    def _update_array(
+        self,
+        array_name: Literal["points", "colors", "vertices"],
+        value: onp.ndarray,
+    ) -> None:
+        """Update an array attribute of the scene node.
+
+        To keep the persistent message buffer consistent for new clients, each
+        partial update contains every row that has changed since the last full
+        update. Once that gets large, we send a full update instead."""
+        state = self._impl.arrays[array_name]
+        assert (
+            value.shape == state.value.shape
+        ), f"Expected {array_name} of shape {state.value.shape}, but got {value.shape}."
+        assert value.dtype == state.value.dtype
+
+        num_rows = value.shape[0]
+        changed = onp.any(
+            value.reshape((num_rows, -1)) != state.value.reshape((num_rows, -1)),
+            axis=-1,
+        )
+        if not onp.any(changed):
+            return
+        state.value = value.copy()
+        state.dirty_rows |= changed
+        if array_name != "colors":
+            self._impl.api._register_bounds(self._impl.name, value)
+
+        dirty_indices = onp.flatnonzero(state.dirty_rows)
+        row_bytes = value.nbytes // num_rows
+        range_start = int(dirty_indices[0])
+        range_end = int(dirty_indices[-1]) + 1
+        range_bytes = (range_end - range_start) * row_bytes
+        sparse_bytes = len(dirty_indices) * (row_bytes + 4)
+
+        if min(range_bytes, sparse_bytes) >= value.nbytes // 2:
+            message = _messages.SceneNodeArrayUpdateMessage(
+                self._impl.name,
+                array_name,
+                full=True,
+                start_row=0,
+                row_indices=None,
+                values=state.value,
+            )
+            state.dirty_rows[:] = False
+        elif range_bytes <= sparse_bytes:
+            message = _messages.SceneNodeArrayUpdateMessage(
+                self._impl.name,
+                array_name,
+                full=False,
+                start_row=range_start,
+                row_indices=None,
+                values=state.value[range_start:range_end],
+            )
+        else:
+            message = _messages.SceneNodeArrayUpdateMessage(
+                self._impl.name,
+                array_name,
+                full=False,
+                start_row=0,
+                row_indices=dirty_indices.astype(onp.uint32),
+                values=state.value[dirty_indices],
+            )
+        self._impl.api._websock_interface.queue_message(message)
+
+
+@dataclasses.dataclass
+class _SceneNodeBatchState:
+    names: tuple[str, ...]
+    api: SceneApi
+    handle_type: type[SceneNodeHandle]
+    wxyzs: onp.ndarray
+    positions: onp.ndarray
+    visible: onp.ndarray
+    handles: dict[int, SceneNodeHandle] = dataclasses.field(default_factory=dict)
+    """Handles for individual nodes, created when they're first indexed."""
+
+
+@dataclasses.dataclass
+class SceneNodeBatchHandle(Generic[TSceneNodeHandle]):
+    """Handle for a batch of scene nodes that were added together, for example via
+    :meth:`SceneApi.add_frames()`.
+
+    State for the batch is stored in arrays, so no per-node objects are needed.
+    Indexing returns a handle for an individual node, which is created on first
+    access and can be used to set its pose, visibility, or click callbacks."""
+
+    _impl: _SceneNodeBatchState
+
+    def _sync_from_handles(self) -> None:
+        """Copy state from handles of individual nodes, which may have been
+        assigned to."""
+        for index, handle in self._impl.handles.items():
+            self._impl.wxyzs[index] = handle._impl.wxyz
+            self._impl.positions[index] = handle._impl.position
+            self._impl.visible[index] = handle._impl.visible
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        """Names of the scene nodes in the batch."""
+        return self._impl.names
+
+    @property
+    def wxyzs(self) -> onp.ndarray:
+        """Orientations of the scene nodes, with shape (N, 4). Synchronized to clients
+        automatically when assigned; only changed nodes are sent. Can be assigned an
+        array of shape (N, 4) or (4,)."""
+        self._sync_from_handles()
+        return self._impl.wxyzs.copy()
+
+    @wxyzs.setter
+    def wxyzs(self, wxyzs: tuple[float, float, float, float] | onp.ndarray) -> None:
+        changed, wxyzs = self._changed_rows(self._impl.wxyzs, wxyzs)
+        if len(changed) > 0:
+            self._impl.api.set_poses(
+                [self._impl.names[i] for i in changed], wxyzs=wxyzs[changed]
+            )
+
+    @property
+    def positions(self) -> onp.ndarray:
+        """Positions of the scene nodes, with shape (N, 3). Synchronized to clients
+        automatically when assigned; only changed nodes are sent. Can be assigned an
+        array of shape (N, 3) or (3,)."""
+        self._sync_from_handles()
+        return self._impl.positions.copy()
+
+    @positions.setter
+    def positions(self, positions: tuple[float, float, float] | onp.ndarray) -> None:
+        changed, positions = self._changed_rows(self._impl.positions, positions)
+        if len(changed) > 0:
+            self._impl.api.set_poses(
+                [self._impl.names[i] for i in changed], positions=positions[changed]
+            )
+
+    @property
+    def visible(self) -> onp.ndarray:
+        """Visibility of the scene nodes, as a boolean array with shape (N,).
+        Synchronized to clients automatically when assigned; only changed nodes are
+        sent. Can be assigned a boolean mask of shape (N,) or a single boolean."""
+        self._sync_from_handles()
+        return self._impl.visible.copy()
+
+    @visible.setter
+    def visible(self, visible: bool | onp.ndarray) -> None:
+        changed, visible = self._changed_rows(self._impl.visible, visible)
+        if len(changed) > 0:
+            self._impl.api.set_visibility(
+                [self._impl.names[i] for i in changed], visible[changed]
+            )
+
+    def _changed_rows(
+        self, current: onp.ndarray, value: Any
+    ) -> tuple[onp.ndarray, onp.ndarray]:
+        """Broadcast a new value for one of the batch's arrays, and write it to the
+        array in place. Returns the indices of changed nodes and the new array."""
+        self._sync_from_handles()
+        value = onp.broadcast_to(onp.asarray(value, dtype=current.dtype), current.shape)
+        changed = onp.flatnonzero(
+            (value != current).reshape((current.shape[0], -1)).any(axis=-1)
+        )
+        current[changed] = value[changed]
+        return changed, value
+
+    def __len__(self) -> int:
+        return len(self._impl.names)
+
+    def __getitem__(self, index: int) -> TSceneNodeHandle:
+        index = range(len(self._impl.names))[index]
+        handle = self._impl.handles.get(index, None)
+        if handle is None:
+            impl = self._impl
+            handle = impl.handle_type(
+                _SceneNodeHandleState(
+                    impl.names[index],
+                    impl.api,
+                    wxyz=impl.wxyzs[index].copy(),
+                    position=impl.positions[index].copy(),
+                    visible=bool(impl.visible[index]),
+                )
+            )
+            impl.api._handle_from_node_name[impl.names[index]] = handle
+            impl.handles[index] = handle
+        return cast(TSceneNodeHandle, handle)
+
+    def __iter__(self) -> Iterator[TSceneNodeHandle]:
+        for index in range(len(self._impl.names)):
+            yield self[index]
+
+    def remove(self) -> None:
+        """Remove all nodes in the batch from the scene."""
+        for name in self._impl.names:
+            self._impl.api._forget_transfers(name)
+            self._impl.api._websock_interface.queue_message(
+                _messages.RemoveSceneNodeMessage(name)
+            )
+
 
 @dataclasses.dataclass(frozen=True)
 class SceneNodePointerEvent(Generic[TSceneNodeHandle]):
@@ -191,6 +421,258 @@ class CameraFrustumHandle(_ClickableSceneNodeHandle):
 class PointCloudHandle(SceneNodeHandle):
     """Handle for point clouds. Does not support click events."""
 
+    @property
+    def points(self) -> onp.ndarray:
+        """Location of points, with shape (N, 3). Synchronized to clients
+        automatically when assigned; only changed points are sent. The number of
+        points can't be changed. Returns a copy, which can be modified in place and
+        assigned back."""
+        return self._impl.arrays["points"].value.copy()
+
+    @points.setter
+    def points(self, points: onp.ndarray) -> None:
+        self._update_array("points", onp.asarray(points).astype(onp.float32))
+
+    @property
+    def colors(self) -> onp.ndarray:
+        """Colors of points, as uint8 with shape (N, 3). Synchronized to clients
+        automatically when assigned; only changed colors are sent. Can be assigned
+        an array of shape (N, 3) or (3,). Returns a copy."""
+        return self._impl.arrays["colors"].value.copy()
+
+    @colors.setter
+    def colors(self, colors: onp.ndarray | tuple[float, float, float]) -> None:
+        from ._scene_api import _colors_to_uint8
+
+        colors_cast = _colors_to_uint8(onp.asarray(colors))
+        num_points = self._impl.arrays["colors"].value.shape[0]
+        if colors_cast.shape == (3,):
+            colors_cast = onp.tile(colors_cast[None, :], reps=(num_points, 1))
+        self._update_array("colors", colors_cast)
+
+
+_LOD_REFINE_MIN_INTERVAL_SEC = 0.1
+"""Minimum time between refining a point cloud for the same client. Camera updates
+that arrive sooner are merged into a single refinement."""
+
+
+@dataclasses.dataclass
+class _PointCloudLodState:
+    octree: PointOctree | None
+    """Set to None once the node is removed, so that camera callbacks don't keep the
+    points in memory."""
+    point_size: float
+    point_ball_norm: float
+    precision: Literal["float32", "float16", "int16"]
+    initial_nodes: int
+    """Number of coarse nodes that are sent to every client. Nodes are sorted by
+    depth, so these come first."""
+    max_points_per_client: int
+    shown_nodes_from_client: dict[ClientId, set[int]] = dataclasses.field(
+        default_factory=dict
+    )
+    """Finer nodes that have been sent to each client."""
+    client_from_id: dict[ClientId, ClientHandle] = dataclasses.field(
+        default_factory=dict
+    )
+    """Clients whose cameras we're following."""
+    refining_client_ids: set[ClientId] = dataclasses.field(default_factory=set)
+    """Clients with a refinement that's scheduled or running."""
+    stale_client_ids: set[ClientId] = dataclasses.field(default_factory=set)
+    """Clients whose cameras were updated while a refinement was running."""
+    last_refine_time_from_client: dict[ClientId, float] = dataclasses.field(
+        default_factory=dict
+    )
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+
+@dataclasses.dataclass
+class PointCloudLodHandle(SceneNodeHandle):
+    """Handle for point clouds that are streamed at multiple levels of detail.
+
+    Points are organized into an octree. Its coarse levels are sent to every client
+    when the point cloud is added, and finer nodes are streamed to each client
+    based on its camera. Does not support click events."""
+
+    _impl_aux: _PointCloudLodState
+
+    def remove(self) -> None:
+        """Remove the node from the scene."""
+        self._release()
+        super().remove()
+
+    def _release(self) -> None:
+        """Stop streaming to clients, and detach all callbacks."""
+        from ._viser import ViserServer
+
+        aux = self._impl_aux
+        with aux.lock:
+            aux.octree = None
+            aux.shown_nodes_from_client.clear()
+            clients = list(aux.client_from_id.values())
+            aux.client_from_id.clear()
+        for client in clients:
+            _remove_callback(client.camera._state.camera_cb, self._on_camera_update)
+
+        server = self._impl.api._owner
+        if isinstance(server, ViserServer):
+            with server._client_lock:
+                _remove_callback(server._client_connect_cb, self._track_client)
+                _remove_callback(server._client_disconnect_cb, self._untrack_client)
+
+    def _node_name(self, node: int) -> str:
+        assert self._impl_aux.octree is not None
+        return f"{self._impl.name}/node{self._impl_aux.octree.keys[node]}"
+
+    def _node_message(self, node: int) -> _messages.PointCloudMessage:
+        from ._scene_api import _encode_points
+
+        aux = self._impl_aux
+        assert aux.octree is not None
+        start = int(aux.octree.starts[node])
+        end = int(aux.octree.ends[node])
+        points, points_bbox = _encode_points(
+            aux.octree.points[start:end], aux.precision
+        )
+        colors = aux.octree.colors
+        return _messages.PointCloudMessage(
+            name=self._node_name(node),
+            points=points,
+            colors=colors if colors.shape == (3,) else colors[start:end],
+            point_size=aux.point_size,
+            point_ball_norm=aux.point_ball_norm,
+            precision=aux.precision,
+            points_bbox=points_bbox,
+            color_palette=None,
+        )
+
+    def _track_client(self, client: ClientHandle) -> None:
+        """Stream nodes to a client whenever its camera is updated."""
+        aux = self._impl_aux
+        with aux.lock:
+            if aux.octree is None:
+                return
+            aux.client_from_id[client.client_id] = client
+            client.camera.on_update(self._on_camera_update)
+        if client.camera._state.update_timestamp != 0.0:
+            self._on_camera_update(client.camera)
+
+    def _untrack_client(self, client: ClientHandle) -> None:
+        aux = self._impl_aux
+        with aux.lock:
+            client_id = client.client_id
+            aux.shown_nodes_from_client.pop(client_id, None)
+            aux.client_from_id.pop(client_id, None)
+            aux.stale_client_ids.discard(client_id)
+            aux.last_refine_time_from_client.pop(client_id, None)
+
+    def _on_camera_update(self, camera: CameraHandle) -> None:
+        """Schedule a refinement for a client. At most one is scheduled or running
+        for each client at a time, and they're rate limited; updates in the
+        meantime are merged, since refinements read the latest camera state."""
+        aux = self._impl_aux
+        client_id = camera.client.client_id
+        with aux.lock:
+            if client_id in aux.refining_client_ids:
+                aux.stale_client_ids.add(client_id)
+                return
+            aux.refining_client_ids.add(client_id)
+        self._schedule_refine(camera.client)
+
+    def _schedule_refine(self, client: ClientHandle) -> None:
+        # Refinements run in the thread pool or on a timer, so they never block
+        # the thread that received the camera message.
+        delay = (
+            self._impl_aux.last_refine_time_from_client.get(
+                client.client_id, float("-inf")
+            )
+            + _LOD_REFINE_MIN_INTERVAL_SEC
+            - time.time()
+        )
+        if delay > 0.0:
+            timer = threading.Timer(delay, self._refine, args=(client,))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._impl.api._thread_executor.submit(self._refine, client)
+
+    def _refine(self, client: ClientHandle) -> None:
+        """Send finer nodes that are in view of a client's camera, and remove ones
+        that are no longer needed."""
+        aux = self._impl_aux
+        client_id = client.client_id
+        try:
+            self._refine_nodes(client)
+        except Exception as e:
+            traceback.print_exception(type(e), e, e.__traceback__, limit=100)
+        finally:
+            with aux.lock:
+                aux.last_refine_time_from_client[client_id] = time.time()
+                rerun = client_id in aux.stale_client_ids and aux.octree is not None
+                aux.stale_client_ids.discard(client_id)
+                if not rerun:
+                    aux.refining_client_ids.discard(client_id)
+            if rerun:
+                self._schedule_refine(client)
+
+    def _refine_nodes(self, client: ClientHandle) -> None:
+        aux = self._impl_aux
+        if self._impl.api._handle_from_node_name.get(self._impl.name) is not self:
+            # The point cloud was replaced by another node with the same name.
+            self._release()
+        octree = aux.octree
+        if octree is None:
+            return
+
+        # Cull and rank nodes in the local frame of the point cloud.
+        camera = client.camera
+        T_node_world = self._impl.api._get_T_world_node(self._impl.name).inverse()
+        camera_position = T_node_world @ camera.position
+        camera_direction = T_node_world.rotation() @ (
+            tf.SO3(camera.wxyz) @ onp.array([0.0, 0.0, 1.0])
+        )
+        tan_half_fov = onp.tan(camera.fov / 2.0) * onp.sqrt(1.0 + camera.aspect**2)
+
+        client_id = client.client_id
+        with aux.lock:
+            if client_id not in aux.client_from_id:
+                return
+            shown_nodes = aux.shown_nodes_from_client.get(client_id, set())
+        shown = onp.zeros(len(octree.keys), dtype=bool)
+        shown[: aux.initial_nodes] = True
+        shown[list(shown_nodes)] = True
+        selected = octree.select_nodes(
+            camera_position,
+            camera_direction,
+            float(tan_half_fov),
+            aux.max_points_per_client,
+            shown=shown,
+        )
+        selected = selected[selected >= aux.initial_nodes].tolist()
+
+        # Refinements for the same client don't overlap, but the client may have
+        # disconnected or the point cloud may have been removed in the meantime.
+        connection = client._websock_connection
+        with aux.lock:
+            if aux.octree is None or client_id not in aux.client_from_id:
+                return
+            for node in shown_nodes.difference(selected):
+                connection.queue_message(
+                    _messages.RemoveSceneNodeMessage(self._node_name(node))
+                )
+            for node in selected:
+                if node not in shown_nodes:
+                    connection.queue_message(self._node_message(node))
+            aux.shown_nodes_from_client[client_id] = set(selected)
+
+
+def _remove_callback(callbacks: list[Any], callback: Any) -> None:
+    """Remove a callback from a list, if it's there."""
+    try:
+        callbacks.remove(callback)
+    except ValueError:
+        pass
+
 
 @dataclasses.dataclass
 class BatchedAxesHandle(_ClickableSceneNodeHandle):
@@ -206,6 +688,18 @@ class FrameHandle(_ClickableSceneNodeHandle):
 class MeshHandle(_ClickableSceneNodeHandle):
     """Handle for mesh objects."""
 
+    @property
+    def vertices(self) -> onp.ndarray:
+        """Vertex positions of the mesh, with shape (V, 3). Synchronized to clients
+        automatically when assigned; only changed vertices are sent. The number of
+        vertices can't be changed. Returns a copy, which can be modified in place
+        and assigned back."""
+        return self._impl.arrays["vertices"].value.copy()
+
+    @vertices.setter
+    def vertices(self, vertices: onp.ndarray) -> None:
+        self._update_array("vertices", onp.asarray(vertices).astype(onp.float32))
+
 
 @dataclasses.dataclass
 class GaussianSplatHandle(_ClickableSceneNodeHandle):
@@ -293,6 +787,121 @@ class LabelHandle(SceneNodeHandle):
     """Handle for 2D label objects. Does not support click events."""
 
 
+@dataclasses.dataclass
+class _TimelineState:
+    frame_names: tuple[str, ...]
+    playing: bool
+    frame: int
+    fps: float
+    loop: bool
+    show_all: bool
+    frame_time: float
+    """Time when playback was last started from `frame`."""
+
+
+@dataclasses.dataclass
+class TimelineHandle(SceneNodeHandle):
+    """Handle for timelines, which show one frame of a sequence of scene nodes at a
+    time.
+
+    Playback runs on each client, which advances frames locally at the requested
+    rate; the server only sends play, pause, and seek commands. Frames are shown
+    only if their own visibility is also set."""
+
+    _impl_aux: _TimelineState
+
+    @property
+    def frame_names(self) -> tuple[str, ...]:
+        """Names of the scene nodes for each frame. Read-only."""
+        return self._impl_aux.frame_names
+
+    @property
+    def playing(self) -> bool:
+        """Whether the timeline is playing. Synchronized to clients automatically
+        when assigned."""
+        return self._impl_aux.playing
+
+    @playing.setter
+    def playing(self, playing: bool) -> None:
+        self._update(playing=playing)
+
+    @property
+    def frame(self) -> int:
+        """Index of the current frame. While playing, this is estimated from the
+        time that playback was started, since frames are advanced by clients.
+        Assigning seeks all clients to a frame."""
+        aux = self._impl_aux
+        num_frames = len(aux.frame_names)
+        if not aux.playing or num_frames == 0:
+            return aux.frame
+        frame = aux.frame + int((time.time() - aux.frame_time) * aux.fps)
+        return frame % num_frames if aux.loop else min(frame, num_frames - 1)
+
+    @frame.setter
+    def frame(self, frame: int) -> None:
+        self._update(frame=range(len(self._impl_aux.frame_names))[frame])
+
+    @property
+    def fps(self) -> float:
+        """Playback rate, in frames per second. Synchronized to clients
+        automatically when assigned."""
+        return self._impl_aux.fps
+
+    @fps.setter
+    def fps(self, fps: float) -> None:
+        assert fps > 0.0
+        self._update(fps=fps)
+
+    @property
+    def loop(self) -> bool:
+        """Whether playback restarts from the first frame after the last one.
+        Otherwise, playback stops at the last frame. Synchronized to clients
+        automatically when assigned."""
+        return self._impl_aux.loop
+
+    @loop.setter
+    def loop(self, loop: bool) -> None:
+        self._update(loop=loop)
+
+    @property
+    def show_all(self) -> bool:
+        """Show every frame at once, regardless of the playback state. Synchronized
+        to clients automatically when assigned."""
+        return self._impl_aux.show_all
+
+    @show_all.setter
+    def show_all(self, show_all: bool) -> None:
+        self._update(show_all=show_all)
+
+    def play(self) -> None:
+        """Start playback from the current frame."""
+        self.playing = True
+
+    def pause(self) -> None:
+        """Pause playback at the current frame."""
+        self.playing = False
+
+    def _update(self, **changes: Any) -> None:
+        """Update the playback state, and send it to clients. Playback is restarted
+        from the current frame, so changes don't cause frames to be skipped."""
+        aux = self._impl_aux
+        if "frame" not in changes:
+            changes["frame"] = self.frame
+        for k, v in changes.items():
+            setattr(aux, k, v)
+        aux.frame_time = time.time()
+        self._impl.api._websock_interface.queue_message(
+            _messages.TimelinePlaybackMessage(
+                self._impl.name,
+                playing=aux.playing,
+                frame=aux.frame,
+                fps=aux.fps,
+                loop=aux.loop,
+                show_all=aux.show_all,
+            )
+        )
+
+
 @dataclasses.dataclass
 class _TransformControlsState:
     last_updated: float
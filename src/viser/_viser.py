@@ -6,6 +6,7 @@ import mimetypes
 import threading
 import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Callable, ContextManager
 
@@ -451,6 +452,28 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
         host: Host to bind server to.
         port: Port to bind server to.
         label: Label shown at the top of the GUI panel.
+        serialization_workers: Number of worker threads used to serialize outgoing
+            messages. If 0, messages are serialized on the server's event loop
+            thread. Serialization is cheap relative to sending, since large arrays
+            aren't copied, so this is off by default. Larger values can help keep the
+            server responsive when many large messages are sent to many clients.
+        slow_client_policy: How to handle clients that can't keep up with outgoing
+            messages. See :class:`viser.infra.SlowClientPolicy`.
+        metrics_path: If set, server metrics are served in the Prometheus text format
+            at this HTTP path, for example `"/metrics"`. See :meth:`get_metrics()`.
+        max_camera_rate_hz: Maximum rate at which each client's camera callbacks
+            (and transform control callbacks) are called. Camera updates that
+            arrive faster are coalesced, so callbacks only see the latest pose. If
+            None, callbacks run as fast as they can, but stale poses are still
+            dropped while a previous callback for the same client is running.
+        incoming_dispatch_policy: How callbacks for client events (GUI updates,
+            clicks, camera updates, ...) are scheduled. See
+            :class:`viser.infra.IncomingDispatchPolicy`.
+        camera_aware_streaming: If True, scene geometry that's waiting to be sent
+            to a client is prioritized using the client's camera: nodes in view are
+            sent first, closest first, then nodes outside of the view. Newly
+            connected clients then receive the existing scene message-by-message,
+            instead of as a compressed snapshot, so that it can be reordered too.
     """
 
     # Hide deprecated arguments from docstring and type checkers.
@@ -460,8 +483,16 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
         port: int = 8080,
         label: str | None = None,
         verbose: bool = True,
+        serialization_workers: int = 0,
+        slow_client_policy: infra.SlowClientPolicy | None = None,
+        metrics_path: str | None = None,
+        max_camera_rate_hz: float | None = None,
+        incoming_dispatch_policy: infra.IncomingDispatchPolicy | None = None,
+        camera_aware_streaming: bool = False,
         **_deprecated_kwargs,
     ):
+        self._camera_aware_streaming = camera_aware_streaming
+
         # Create server.
         server = infra.WebsockServer(
             host=host,
@@ -470,6 +501,32 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
             http_server_root=Path(__file__).absolute().parent / "client" / "build",
             verbose=verbose,
             client_api_version=1,
+            # Large arrays and binary payloads are sent without copying them into
+            # the serialized message buffer.
+            zero_copy_min_bytes=64 * 1024,
+            # Large messages are sent uncompressed. Compressing them blocks the
+            # event loop for little gain, and is what dominates event loop lag when
+            # streaming point clouds or meshes.
+            compression_max_bytes=256 * 1024,
+            serialization_executor=(
+                ThreadPoolExecutor(
+                    max_workers=serialization_workers,
+                    thread_name_prefix="viser-serialization",
+                )
+                if serialization_workers > 0
+                else None
+            ),
+            compressed_snapshots=not camera_aware_streaming,
+            slow_client_policy=slow_client_policy,
+            # Size windows by bytes and send latency, so interactive updates aren't
+            # batched together with bulky geometry.
+            window_policy=infra.AdaptiveWindowPolicy(),
+            metrics_path=metrics_path,
+            max_coalesced_rate_hz=max_camera_rate_hz,
+            incoming_dispatch_policy=incoming_dispatch_policy,
+            bulk_message_rank=(
+                self._rank_bulk_message if camera_aware_streaming else None
+            ),
         )
         self._websock_server = server
 
@@ -517,7 +574,8 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
                         for cb in self._client_connect_cb:
                             cb(client)
 
-                for camera_cb in client.camera._state.camera_cb:
+                # Callbacks can be removed while we iterate.
+                for camera_cb in tuple(client.camera._state.camera_cb):
                     camera_cb(client.camera)
 
             conn.register_handler(_messages.ViewerCameraMessage, handle_camera_message)
@@ -576,6 +634,36 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
         self.gui.reset()
         self.gui.set_panel_label(label)
 
+    def _rank_bulk_message(
+        self, client_id: infra.ClientId, message: _messages.Message
+    ) -> float:
+        """Rank a bulk message for camera-aware streaming to a client."""
+        client = self._connected_clients.get(client_id, None)
+        if client is None:
+            # We haven't received a camera from this client yet.
+            return 0.0
+
+        wxyzs = None
+        positions = None
+        if isinstance(message, _messages._SceneNodeBatchMessage):
+            names = message.names
+            wxyzs = message.wxyzs
+            positions = message.positions
+        else:
+            name = getattr(message, "name", None)
+            names = (name,) if isinstance(name, str) else ()
+        if len(names) == 0:
+            # Not scene geometry. We don't defer these.
+            return float("inf")
+
+        # Messages for the client's own scene are queued on its connection.
+        scene = client.scene
+        if names[0] not in scene._handle_from_node_name and names[0] not in (
+            scene._bounds_from_name or {}
+        ):
+            scene = self.scene
+        return scene._rank_for_camera(names, client.camera, wxyzs, positions)
+
     def get_host(self) -> str:
         """Returns the host address of the Viser server.
 
@@ -674,6 +762,16 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
         with self._client_lock:
             return self._connected_clients.copy()
 
+    def get_metrics(self) -> infra.ServerMetrics:
+        """Get a snapshot of server performance metrics, like serialized bytes per
+        message type, per-client send latencies, and event loop lag. Use
+        :meth:`infra.ServerMetrics.to_prometheus` for the Prometheus text format.
+
+        Returns:
+            Metrics snapshot.
+        """
+        return self._websock_server.get_metrics()
+
     def on_client_connect(
         self, cb: Callable[[ClientHandle], None]
     ) -> Callable[[ClientHandle], None]:
@@ -77,6 +77,7 @@ export type ViewerContextContents = {
           position?: [number, number, number];
           visibility?: boolean; // Visibility state from the server.
           overrideVisibility?: boolean; // Override from the GUI.
+          timelineVisibility?: boolean; // Set by timelines for their frames.
         };
   }>;
   nodeRefFromName: React.MutableRefObject<{
@@ -107,6 +108,18 @@ export type ViewerContextContents = {
       }[];
     };
   }>;
+  // Playback state for timelines, which are advanced on the client.
+  timelineState: React.MutableRefObject<{
+    [name: string]: {
+      frameNames: string[];
+      playing: boolean;
+      fps: number;
+      loop: boolean;
+      showAll: boolean;
+      startFrame: number;
+      startTime: number; // From performance.now(), in milliseconds.
+    };
+  }>;
 };
 export const ViewerContext = React.createContext<null | ViewerContextContents>(
   null,
@@ -184,6 +197,7 @@ function ViewerRoot() {
     }),
     canvas2dRef: React.useRef(null),
     skinnedMeshState: React.useRef({}),
+    timelineState: React.useRef({}),
   };
 
   // Set dark default if specified in URL.
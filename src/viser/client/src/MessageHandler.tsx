@@ -6,7 +6,7 @@ import React, { useContext } from "react";
 import * as THREE from "three";
 import { TextureLoader } from "three";
 
-import { ViewerContext } from "./App";
+import { ViewerContext, ViewerContextContents } from "./App";
 import { SceneNode } from "./SceneTree";
 import {
   CameraFrustum,
@@ -17,9 +17,18 @@ import {
   PointCloud,
 } from "./ThreeAssets";
 import {
+  CameraFrustumsMessage,
   FileTransferPart,
   FileTransferStart,
+  FramesMessage,
   Message,
+  MeshMessage,
+  PointCloudMessage,
+  PointCloudsMessage,
+  SceneNodeArrayUpdateMessage,
+  SceneNodeTransferPart,
+  SceneNodeTransferStart,
+  SkinnedMeshMessage,
 } from "./WebsocketMessages";
 import { PivotControls } from "@react-three/drei";
 import { isTexture, makeThrottledMessageSender } from "./WebsocketFunctions";
@@ -46,6 +55,110 @@ function threeColorBufferFromUint8Buffer(colors: ArrayBuffer) {
   );
 }
 
+/** Decode an IEEE 754 half-precision float. */
+function decodeFloat16(bits: number) {
+  const sign = bits & 0x8000 ? -1 : 1;
+  const exponent = (bits >> 10) & 0x1f;
+  const fraction = bits & 0x3ff;
+  if (exponent === 0) return sign * Math.pow(2, -14) * (fraction / 1024);
+  if (exponent === 0x1f) return fraction === 0 ? sign * Infinity : NaN;
+  return sign * Math.pow(2, exponent - 15) * (1 + fraction / 1024);
+}
+
+/** Decode point cloud positions and colors to float32 xyz and uint8 rgb. Messages
+ * that are already in this canonical encoding are returned as-is. */
+function decodePointCloudMessage(message: PointCloudMessage): PointCloudMessage {
+  let points = message.points;
+  if (message.precision !== "float32") {
+    const encoded = message.points.buffer.slice(
+      message.points.byteOffset,
+      message.points.byteOffset + message.points.byteLength,
+    );
+    const positions = new Float32Array(message.points.byteLength / 2);
+    if (message.precision === "float16") {
+      const halves = new Uint16Array(encoded);
+      for (let i = 0; i < positions.length; i++)
+        positions[i] = decodeFloat16(halves[i]);
+    } else {
+      const quantized = new Int16Array(encoded);
+      const bbox = message.points_bbox!;
+      for (let i = 0; i < positions.length; i++) {
+        const axis = i % 3;
+        positions[i] =
+          bbox[axis] +
+          ((quantized[i] + 32768) / 65535) * (bbox[axis + 3] - bbox[axis]);
+      }
+    }
+    points = new Uint8Array(positions.buffer);
+  }
+
+  // The number of points comes from the positions; with streamed transfers, the
+  // color array may be longer than the positions received so far.
+  const numPoints = points.byteLength / 12;
+  let colors = message.colors;
+  if (message.color_palette !== null) {
+    const palette = message.color_palette;
+    colors = new Uint8Array(numPoints * 3);
+    for (let i = 0; i < numPoints; i++) {
+      const index = message.colors[i] * 3;
+      colors[i * 3] = palette[index];
+      colors[i * 3 + 1] = palette[index + 1];
+      colors[i * 3 + 2] = palette[index + 2];
+    }
+  } else if (message.colors.length === 3 && numPoints !== 1) {
+    // A single color for all points.
+    colors = new Uint8Array(numPoints * 3);
+    for (let i = 0; i < numPoints * 3; i++) colors[i] = message.colors[i % 3];
+  }
+
+  if (points === message.points && colors === message.colors) return message;
+  return {
+    ...message,
+    points: points,
+    colors: colors,
+    precision: "float32",
+    points_bbox: null,
+    color_palette: null,
+  };
+}
+
+/** Copy a raw float32 buffer, which may not be aligned. */
+function float32ArrayFromBytes(bytes: Uint8Array) {
+  return new Float32Array(
+    bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.byteLength),
+  );
+}
+
+/** Index of the frame that a timeline should currently show. */
+function currentTimelineFrame(
+  state: ViewerContextContents["timelineState"]["current"][string],
+) {
+  const numFrames = state.frameNames.length;
+  if (!state.playing || numFrames === 0) return state.startFrame;
+  const frame =
+    state.startFrame +
+    Math.floor(((performance.now() - state.startTime) / 1000.0) * state.fps);
+  return state.loop ? frame % numFrames : Math.min(frame, numFrames - 1);
+}
+
+/** Re-create a scene node from an updated message. Adding a scene node resets
+ * its attributes, so we keep the existing pose and visibility. */
+function replaceSceneNode(
+  viewer: ViewerContextContents,
+  name: string,
+  message: Message,
+  handleMessage: (message: Message) => void,
+) {
+  const attrs = viewer.nodeAttributesFromName.current[name];
+  handleMessage(message);
+  if (attrs !== undefined) {
+    viewer.nodeAttributesFromName.current[name] = {
+      ...attrs,
+      poseUpdateState: "waitForMakeObject",
+    };
+  }
+}
+
 /** Returns a handler for all incoming messages. */
 function useMessageHandler() {
   const viewer = useContext(ViewerContext)!;
@@ -93,9 +206,117 @@ function useMessageHandler() {
   }
 
   const fileDownloadHandler = useFileDownloadHandler();
+  const sceneNodeTransfer = useSceneNodeTransferHandler();
+
+  // Most recent messages for scene nodes with array attributes. These are
+  // needed for applying partial updates.
+  const arrayMessageFromName = React.useRef<{
+    [name: string]: PointCloudMessage | MeshMessage | SkinnedMeshMessage;
+  }>({});
+
+  /** Apply a partial update to the array attribute of a scene node. */
+  function updateSceneNodeArray(message: SceneNodeArrayUpdateMessage) {
+    const target = arrayMessageFromName.current[message.name];
+    if (target === undefined) return;
+    const array = (target as { [key: string]: any })[message.array_name] as
+      | Uint8Array
+      | undefined;
+    if (array === undefined) return;
+
+    // Points and vertices are float32 xyz; colors are uint8 rgb.
+    const rowSize = message.array_name === "colors" ? 3 : 12;
+    const values = message.values;
+    const rowIndices =
+      message.row_indices === null
+        ? null
+        : new Uint32Array(
+            message.row_indices.buffer.slice(
+              message.row_indices.byteOffset,
+              message.row_indices.byteOffset + message.row_indices.byteLength,
+            ),
+          );
+
+    // Update the stored message, so re-created scene nodes are up to date.
+    if (rowIndices === null) {
+      array.set(values, message.start_row * rowSize);
+    } else {
+      rowIndices.forEach((row, i) =>
+        array.set(
+          values.subarray(i * rowSize, (i + 1) * rowSize),
+          row * rowSize,
+        ),
+      );
+    }
+
+    // If the scene node has been mounted, we can update its geometry in place.
+    const obj = viewer.nodeRefFromName.current[message.name] as
+      | THREE.Points
+      | THREE.Mesh
+      | undefined;
+    const attribute = obj?.geometry?.getAttribute(
+      message.array_name === "colors" ? "color" : "position",
+    );
+    if (
+      obj === undefined ||
+      attribute === undefined ||
+      attribute.count !== array.byteLength / rowSize
+    ) {
+      replaceSceneNode(viewer, message.name, target, handleMessage);
+      return;
+    }
+    const rowValues =
+      message.array_name === "colors"
+        ? Float32Array.from(values, (value) => value / 255.0)
+        : new Float32Array(
+            values.buffer.slice(
+              values.byteOffset,
+              values.byteOffset + values.byteLength,
+            ),
+          );
+    const attributeArray = attribute.array as Float32Array;
+    if (rowIndices === null) {
+      attributeArray.set(rowValues, message.start_row * 3);
+    } else {
+      rowIndices.forEach((row, i) =>
+        attributeArray.set(rowValues.subarray(i * 3, (i + 1) * 3), row * 3),
+      );
+    }
+    attribute.needsUpdate = true;
+    if (message.array_name !== "colors") {
+      if (obj instanceof THREE.Mesh) obj.geometry.computeVertexNormals();
+      obj.geometry.computeBoundingSphere();
+    }
+  }
+
+  /** Add each scene node in a batch, using messages for individual nodes. Poses
+   * and visibility are set from the batch. */
+  function addSceneNodeBatch(
+    message: FramesMessage | PointCloudsMessage | CameraFrustumsMessage,
+    makeMessage: (index: number, name: string) => Message,
+  ) {
+    const wxyzs = float32ArrayFromBytes(message.wxyzs);
+    const positions = float32ArrayFromBytes(message.positions);
+    const attrs = viewer.nodeAttributesFromName.current;
+    message.names.forEach((name, i) => {
+      handleMessage(makeMessage(i, name));
+      const attr = attrs[name]!;
+      attr.wxyz = [
+        wxyzs[i * 4],
+        wxyzs[i * 4 + 1],
+        wxyzs[i * 4 + 2],
+        wxyzs[i * 4 + 3],
+      ];
+      attr.position = [
+        positions[i * 3],
+        positions[i * 3 + 1],
+        positions[i * 3 + 2],
+      ];
+      attr.visibility = message.visible;
+    });
+  }
 
   // Return message handler.
-  return (message: Message) => {
+  function handleMessage(message: Message) {
     if (isGuiConfig(message)) {
       addGui(message);
       return;
@@ -193,6 +414,19 @@ function useMessageHandler() {
         return;
       }
 
+      // Add a batch of coordinate frames.
+      case "FramesMessage": {
+        addSceneNodeBatch(message, (_, name) => ({
+          type: "FrameMessage",
+          name: name,
+          show_axes: message.show_axes,
+          axes_length: message.axes_length,
+          axes_radius: message.axes_radius,
+          origin_radius: message.origin_radius,
+        }));
+        return;
+      }
+
       // Add axes to visualize.
       case "BatchedAxesMessage": {
         addSceneNodeMakeParents(
@@ -290,21 +524,24 @@ function useMessageHandler() {
 
       // Add a point cloud.
       case "PointCloudMessage": {
+        // Partial updates are applied to the decoded message.
+        const decoded = decodePointCloudMessage(message);
+        arrayMessageFromName.current[message.name] = decoded;
         addSceneNodeMakeParents(
           new SceneNode<THREE.Points>(message.name, (ref) => (
             <PointCloud
               ref={ref}
-              pointSize={message.point_size}
-              pointBallNorm={message.point_ball_norm}
+              pointSize={decoded.point_size}
+              pointBallNorm={decoded.point_ball_norm}
               points={
                 new Float32Array(
-                  message.points.buffer.slice(
-                    message.points.byteOffset,
-                    message.points.byteOffset + message.points.byteLength,
+                  decoded.points.buffer.slice(
+                    decoded.points.byteOffset,
+                    decoded.points.byteOffset + decoded.points.byteLength,
                   ),
                 )
               }
-              colors={new Float32Array(message.colors).map(
+              colors={new Float32Array(decoded.colors).map(
                 (val) => val / 255.0,
               )}
             />
@@ -313,6 +550,29 @@ function useMessageHandler() {
         return;
       }
 
+      // Add a batch of point clouds. Points and colors are concatenated.
+      case "PointCloudsMessage": {
+        const offsets = [0];
+        new Uint32Array(
+          message.point_counts.buffer.slice(
+            message.point_counts.byteOffset,
+            message.point_counts.byteOffset + message.point_counts.byteLength,
+          ),
+        ).forEach((count) => offsets.push(offsets[offsets.length - 1] + count));
+        addSceneNodeBatch(message, (i, name) => ({
+          type: "PointCloudMessage",
+          name: name,
+          points: message.points.subarray(offsets[i] * 12, offsets[i + 1] * 12),
+          colors: message.colors.subarray(offsets[i] * 3, offsets[i + 1] * 3),
+          point_size: message.point_size,
+          point_ball_norm: message.point_ball_norm,
+          precision: "float32",
+          points_bbox: null,
+          color_palette: null,
+        }));
+        return;
+      }
+
       case "GuiModalMessage": {
         addModal(message);
         return;
@@ -326,6 +586,7 @@ function useMessageHandler() {
       // Add mesh
       case "SkinnedMeshMessage":
       case "MeshMessage": {
+        arrayMessageFromName.current[message.name] = message;
         const geometry = new THREE.BufferGeometry();
 
         const generateGradientMap = (shades: 3 | 5) => {
@@ -603,6 +864,30 @@ function useMessageHandler() {
         );
         return;
       }
+      // Add a batch of camera frustums.
+      case "CameraFrustumsMessage": {
+        const fovs = float32ArrayFromBytes(message.fovs);
+        const aspects = float32ArrayFromBytes(message.aspects);
+        const colors = message.colors;
+        addSceneNodeBatch(message, (i, name) => ({
+          type: "CameraFrustumMessage",
+          name: name,
+          fov: fovs[i],
+          aspect: aspects[i],
+          scale: message.scale,
+          color:
+            (colors[i * 3] << 16) |
+            (colors[i * 3 + 1] << 8) |
+            colors[i * 3 + 2],
+          thickness: message.thickness,
+          image_media_type: message.image_media_type,
+          image_binary:
+            message.image_media_type === null
+              ? null
+              : message.image_binaries[i],
+        }));
+        return;
+      }
       case "TransformControlsMessage": {
         const name = message.name;
         const sendDragMessage = makeThrottledMessageSender(viewer, 50);
@@ -753,6 +1038,47 @@ function useMessageHandler() {
         attr[message.name]!.visibility = message.visible;
         break;
       }
+      case "SetOrientationsMessage": {
+        const attrs = viewer.nodeAttributesFromName.current;
+        const wxyzs = float32ArrayFromBytes(message.wxyzs);
+        message.names.forEach((name, i) => {
+          if (attrs[name] === undefined) attrs[name] = {};
+          const attr = attrs[name]!;
+          attr.wxyz = [
+            wxyzs[i * 4],
+            wxyzs[i * 4 + 1],
+            wxyzs[i * 4 + 2],
+            wxyzs[i * 4 + 3],
+          ];
+          if (attr.poseUpdateState == "updated")
+            attr.poseUpdateState = "needsUpdate";
+        });
+        break;
+      }
+      case "SetPositionsMessage": {
+        const attrs = viewer.nodeAttributesFromName.current;
+        const positions = float32ArrayFromBytes(message.positions);
+        message.names.forEach((name, i) => {
+          if (attrs[name] === undefined) attrs[name] = {};
+          const attr = attrs[name]!;
+          attr.position = [
+            positions[i * 3],
+            positions[i * 3 + 1],
+            positions[i * 3 + 2],
+          ];
+          if (attr.poseUpdateState == "updated")
+            attr.poseUpdateState = "needsUpdate";
+        });
+        break;
+      }
+      case "SetSceneNodeVisibilitiesMessage": {
+        const attrs = viewer.nodeAttributesFromName.current;
+        message.names.forEach((name, i) => {
+          if (attrs[name] === undefined) attrs[name] = {};
+          attrs[name]!.visibility = message.visible[i] !== 0;
+        });
+        break;
+      }
       // Add a background image.
       case "BackgroundImageMessage": {
         const rgb_url = URL.createObjectURL(
@@ -831,6 +1157,58 @@ function useMessageHandler() {
         );
         return;
       }
+      // Add a timeline. Frames are advanced locally, in everyFrameCallback.
+      case "TimelineMessage": {
+        const state = {
+          frameNames: message.frame_names,
+          playing: false,
+          fps: 10.0,
+          loop: true,
+          showAll: false,
+          startFrame: 0,
+          startTime: performance.now(),
+        };
+        viewer.timelineState.current[message.name] = state;
+        addSceneNodeMakeParents(
+          new SceneNode<THREE.Group>(
+            message.name,
+            (ref) => <group ref={ref} />,
+            () => {
+              // Frames that outlive the timeline are no longer hidden by it.
+              const attrs = viewer.nodeAttributesFromName.current;
+              state.frameNames.forEach((frameName) => {
+                const attr = attrs[frameName];
+                if (attr !== undefined) delete attr.timelineVisibility;
+              });
+              if (viewer.timelineState.current[message.name] === state)
+                delete viewer.timelineState.current[message.name];
+            },
+            false,
+            // everyFrameCallback: show the current frame.
+            () => {
+              const frame = currentTimelineFrame(state);
+              const attrs = viewer.nodeAttributesFromName.current;
+              state.frameNames.forEach((frameName, i) => {
+                if (attrs[frameName] === undefined) attrs[frameName] = {};
+                attrs[frameName]!.timelineVisibility =
+                  state.showAll || i === frame;
+              });
+            },
+          ),
+        );
+        return;
+      }
+      case "TimelinePlaybackMessage": {
+        const state = viewer.timelineState.current[message.name];
+        if (state === undefined) return;
+        state.playing = message.playing;
+        state.fps = message.fps;
+        state.loop = message.loop;
+        state.showAll = message.show_all;
+        state.startFrame = message.frame;
+        state.startTime = performance.now();
+        return;
+      }
       case "Gui3DMessage": {
         addSceneNodeMakeParents(
           new SceneNode<THREE.Group>(
@@ -923,6 +1301,11 @@ function useMessageHandler() {
       // Remove a scene node and its children by name.
       case "RemoveSceneNodeMessage": {
         console.log("Removing scene node:", message.name);
+        sceneNodeTransfer.cancel(message.name);
+        Object.keys(arrayMessageFromName.current).forEach((name) => {
+          if (name === message.name || name.startsWith(message.name + "/"))
+            delete arrayMessageFromName.current[name];
+        });
         removeSceneNode(message.name);
         const attrs = viewer.nodeAttributesFromName.current;
         delete attrs[message.name];
@@ -937,6 +1320,8 @@ function useMessageHandler() {
       }
       // Reset the entire scene, removing all scene nodes.
       case "ResetSceneMessage": {
+        sceneNodeTransfer.cancel("");
+        arrayMessageFromName.current = {};
         resetScene();
 
         const oldBackground = viewer.sceneRef.current?.background;
@@ -1048,6 +1433,17 @@ function useMessageHandler() {
         fileDownloadHandler(message);
         return;
       }
+      // Update rows of a point cloud or mesh.
+      case "SceneNodeArrayUpdateMessage": {
+        updateSceneNodeArray(message);
+        return;
+      }
+      // Stream a scene node with large array payloads.
+      case "SceneNodeTransferStart":
+      case "SceneNodeTransferPart": {
+        sceneNodeTransfer.handle(message, handleMessage);
+        return;
+      }
       case "FileTransferPartAck": {
         updateUploadState({
           componentId: message.source_component_id!,
@@ -1061,6 +1457,124 @@ function useMessageHandler() {
         return;
       }
     }
+  }
+  return handleMessage;
+}
+
+/** Returns handlers for scene nodes that are streamed in parts. Parts are copied
+ * into preallocated buffers, and the scene node is re-created as they arrive. */
+function useSceneNodeTransferHandler() {
+  const viewer = useContext(ViewerContext)!;
+  const transferStatesRef = React.useRef<{
+    [name: string]: {
+      metadata: SceneNodeTransferStart;
+      arrays: { [arrayName: string]: Uint8Array };
+      receivedBytes: { [arrayName: string]: number };
+      totalReceivedBytes: number;
+      renderedBytes: number;
+    };
+  }>({});
+
+  function render(
+    name: string,
+    handleMessage: (message: Message) => void,
+    isDone: boolean,
+  ) {
+    const state = transferStatesRef.current[name];
+    const metadata = state.metadata;
+
+    // Arrays in the same group are rendered with the same number of rows.
+    const rowsFromGroup: { [group: number]: number } = {};
+    metadata.array_names.forEach((arrayName, i) => {
+      const rows = Math.floor(
+        state.receivedBytes[arrayName] / metadata.array_row_sizes[i],
+      );
+      const group = metadata.array_groups[i];
+      rowsFromGroup[group] = Math.min(rowsFromGroup[group] ?? rows, rows);
+    });
+    const arrays: { [arrayName: string]: Uint8Array } = {};
+    metadata.array_names.forEach((arrayName, i) => {
+      arrays[arrayName] = state.arrays[arrayName].subarray(
+        0,
+        rowsFromGroup[metadata.array_groups[i]] * metadata.array_row_sizes[i],
+      );
+    });
+
+    // The pose and visibility may have been set already, so we keep them.
+    replaceSceneNode(
+      viewer,
+      name,
+      {
+        type: metadata.message_type,
+        ...metadata.props,
+        ...arrays,
+      } as unknown as Message,
+      handleMessage,
+    );
+    state.renderedBytes = state.totalReceivedBytes;
+    if (isDone) delete transferStatesRef.current[name];
+  }
+
+  return {
+    handle: (
+      message: SceneNodeTransferStart | SceneNodeTransferPart,
+      handleMessage: (message: Message) => void,
+    ) => {
+      switch (message.type) {
+        case "SceneNodeTransferStart": {
+          const arrays: { [arrayName: string]: Uint8Array } = {};
+          const receivedBytes: { [arrayName: string]: number } = {};
+          message.array_names.forEach((arrayName, i) => {
+            arrays[arrayName] = new Uint8Array(message.array_sizes[i]);
+            receivedBytes[arrayName] = 0;
+          });
+          transferStatesRef.current[message.name] = {
+            metadata: message,
+            arrays: arrays,
+            receivedBytes: receivedBytes,
+            totalReceivedBytes: 0,
+            renderedBytes: 0,
+          };
+          if (message.part_count === 0)
+            render(message.name, handleMessage, true);
+          return;
+        }
+        case "SceneNodeTransferPart": {
+          // Ignore parts from stale transfers, and empty parts that are used to
+          // overwrite them.
+          const state = transferStatesRef.current[message.name];
+          if (
+            state === undefined ||
+            state.metadata.transfer_uuid !== message.transfer_uuid ||
+            message.array_name === ""
+          )
+            return;
+          state.arrays[message.array_name].set(message.content, message.offset);
+          state.receivedBytes[message.array_name] =
+            message.offset + message.content.length;
+          state.totalReceivedBytes += message.content.length;
+
+          // Re-create the scene node when the received data has grown
+          // substantially. This keeps the total work linear in the size of the
+          // transfer.
+          const isDone = message.part === state.metadata.part_count - 1;
+          if (isDone || state.totalReceivedBytes >= 1.5 * state.renderedBytes)
+            render(message.name, handleMessage, isDone);
+          return;
+        }
+      }
+    },
+    /** Cancel transfers for a scene node and its children. */
+    cancel: (name: string) => {
+      Object.keys(transferStatesRef.current).forEach((transferName) => {
+        if (
+          name === "" ||
+          transferName === name ||
+          transferName.startsWith(name + "/")
+        )
+          delete transferStatesRef.current[transferName];
+      });
+    },
   };
 }
 
@@ -193,7 +193,8 @@ export function SceneNodeThreeObject(props: {
       (attrs?.overrideVisibility === undefined
         ? attrs?.visibility
         : attrs.overrideVisibility) ?? true;
-    if (visibility === false) return false;
+    if (visibility === false || attrs?.timelineVisibility === false)
+      return false;
     if (props.parent === null) return true;
 
     // Check visibility of parents + ancestors.
@@ -245,7 +246,7 @@ export function SceneNodeThreeObject(props: {
         (attrs?.overrideVisibility === undefined
           ? attrs?.visibility
           : attrs.overrideVisibility) ?? true;
-      obj.visible = visibility;
+      obj.visible = visibility && (attrs.timelineVisibility ?? true);
 
       if (attrs.poseUpdateState == "needsUpdate") {
         attrs.poseUpdateState = "updated";
@@ -85,6 +85,71 @@ export interface ScenePointerEnableMessage {
   enable: boolean;
   event_type: "click" | "rect-select";
 }
+/** Base class for messages that add a batch of scene nodes at once. Each node
+ * gets its own name, and its pose and visibility are set from the batch, so no
+ * follow-up messages are needed.
+ *
+ * (automatically generated)
+ */
+export interface _SceneNodeBatchMessage {
+  type: "_SceneNodeBatchMessage";
+  names: string[];
+  wxyzs: Uint8Array;
+  positions: Uint8Array;
+  visible: boolean;
+}
+/** Batch of camera frustums. Expanded by the client into one scene node per
+ * frustum, equivalent to `CameraFrustumMessage`.
+ *
+ * (automatically generated)
+ */
+export interface CameraFrustumsMessage {
+  type: "CameraFrustumsMessage";
+  names: string[];
+  wxyzs: Uint8Array;
+  positions: Uint8Array;
+  visible: boolean;
+  fovs: Uint8Array;
+  aspects: Uint8Array;
+  scale: number;
+  colors: Uint8Array;
+  thickness: number;
+  image_media_type: "image/jpeg" | "image/png" | null;
+  image_binaries: Uint8Array[];
+}
+/** Batch of coordinate frames. Expanded by the client into one scene node per
+ * frame, equivalent to `FrameMessage`.
+ *
+ * (automatically generated)
+ */
+export interface FramesMessage {
+  type: "FramesMessage";
+  names: string[];
+  wxyzs: Uint8Array;
+  positions: Uint8Array;
+  visible: boolean;
+  show_axes: boolean;
+  axes_length: number;
+  axes_radius: number;
+  origin_radius: number;
+}
+/** Batch of point clouds. Expanded by the client into one scene node per point
+ * cloud, equivalent to `PointCloudMessage` with float32 positions.
+ *
+ * (automatically generated)
+ */
+export interface PointCloudsMessage {
+  type: "PointCloudsMessage";
+  names: string[];
+  wxyzs: Uint8Array;
+  positions: Uint8Array;
+  visible: boolean;
+  points: Uint8Array;
+  colors: Uint8Array;
+  point_counts: Uint8Array;
+  point_size: number;
+  point_ball_norm: number;
+}
 /** Variant of CameraMessage used for visualizing camera frustums.
  *
  * OpenCV convention, +Z forward.
@@ -167,6 +232,30 @@ export interface LabelMessage {
   name: string;
   text: string;
 }
+/** Add a timeline to the scene, which shows one of a sequence of scene nodes at
+ * a time. Frames are advanced by the client; see `TimelinePlaybackMessage`.
+ *
+ * (automatically generated)
+ */
+export interface TimelineMessage {
+  type: "TimelineMessage";
+  name: string;
+  frame_names: string[];
+}
+/** Play, pause, or seek a timeline. Clients start playback from `frame` when
+ * the message is received.
+ *
+ * (automatically generated)
+ */
+export interface TimelinePlaybackMessage {
+  type: "TimelinePlaybackMessage";
+  name: string;
+  playing: boolean;
+  frame: number;
+  fps: number;
+  loop: boolean;
+  show_all: boolean;
+}
 /** Add a 3D gui element to the scene.
  *
  * (automatically generated)
@@ -179,7 +268,8 @@ export interface Gui3DMessage {
 }
 /** Point cloud message.
  *
- * Positions are internally canonicalized to float32, colors to uint8.
+ * Positions are internally canonicalized to float32, colors to uint8. Both can
+ * optionally be sent in more compact encodings, which are decoded by the client.
  *
  * Float color inputs should be in the range [0,1], int color inputs should be in the
  * range [0,255].
@@ -193,6 +283,26 @@ export interface PointCloudMessage {
   colors: Uint8Array;
   point_size: number;
   point_ball_norm: number;
+  precision: "float32" | "float16" | "int16";
+  points_bbox: [number, number, number, number, number, number] | null;
+  color_palette: Uint8Array | null;
+}
+/** Update rows of an array attribute of an existing scene node: the points or
+ * colors of a point cloud, or the vertices of a mesh.
+ *
+ * Partial updates contain every row that has changed since the last full update,
+ * so each message supersedes the previous message of the same kind.
+ *
+ * (automatically generated)
+ */
+export interface SceneNodeArrayUpdateMessage {
+  type: "SceneNodeArrayUpdateMessage";
+  name: string;
+  array_name: "points" | "colors" | "vertices";
+  full: boolean;
+  start_row: number;
+  row_indices: Uint8Array | null;
+  values: Uint8Array;
 }
 /** Message for a bone of a skinned mesh.
  *
@@ -342,6 +452,49 @@ export interface SetPositionMessage {
   name: string;
   position: [number, number, number];
 }
+/** Base class for messages that update a property of many scene nodes at once.
+ *
+ * Each node is covered by the same redundancy key as the equivalent per-node
+ * message, so bulk and per-node updates supersede each other in the message
+ * buffer. Nodes that are superseded or removed are pruned from buffered
+ * messages.
+ *
+ * (automatically generated)
+ */
+export interface _SceneNodeBulkUpdateMessage {
+  type: "_SceneNodeBulkUpdateMessage";
+  names: string[];
+}
+/** Server -> client message to set the orientations of many scene nodes. Bulk
+ * version of `SetOrientationMessage`.
+ *
+ * (automatically generated)
+ */
+export interface SetOrientationsMessage {
+  type: "SetOrientationsMessage";
+  names: string[];
+  wxyzs: Uint8Array;
+}
+/** Server -> client message to set the positions of many scene nodes. Bulk
+ * version of `SetPositionMessage`.
+ *
+ * (automatically generated)
+ */
+export interface SetPositionsMessage {
+  type: "SetPositionsMessage";
+  names: string[];
+  positions: Uint8Array;
+}
+/** Set the visibility of many nodes in the scene. Bulk version of
+ * `SetSceneNodeVisibilityMessage`.
+ *
+ * (automatically generated)
+ */
+export interface SetSceneNodeVisibilitiesMessage {
+  type: "SetSceneNodeVisibilitiesMessage";
+  names: string[];
+  visible: Uint8Array;
+}
 /** Client -> server message when a transform control is updated.
  *
  * As with all other messages, transforms take the `T_parent_local` convention.
@@ -947,6 +1100,36 @@ export interface FileTransferPartAck {
   transferred_bytes: number;
   total_bytes: number;
 }
+/** Signal that an array-heavy scene node message is about to be streamed in
+ * parts. Clients render the scene node progressively as parts arrive.
+ *
+ * (automatically generated)
+ */
+export interface SceneNodeTransferStart {
+  type: "SceneNodeTransferStart";
+  name: string;
+  transfer_uuid: string;
+  message_type: string;
+  props: { [key: string]: any };
+  array_names: string[];
+  array_sizes: number[];
+  array_row_sizes: number[];
+  array_groups: number[];
+  part_count: number;
+}
+/** Part of a streamed scene node message.
+ *
+ * (automatically generated)
+ */
+export interface SceneNodeTransferPart {
+  type: "SceneNodeTransferPart";
+  name: string;
+  transfer_uuid: string;
+  part: number;
+  array_name: string;
+  offset: number;
+  content: Uint8Array;
+}
 /** Message from client->server to connect to the share URL server.
  *
  * (automatically generated)
@@ -985,14 +1168,21 @@ export type Message =
   | ViewerCameraMessage
   | ScenePointerMessage
   | ScenePointerEnableMessage
+  | _SceneNodeBatchMessage
+  | CameraFrustumsMessage
+  | FramesMessage
+  | PointCloudsMessage
   | CameraFrustumMessage
   | GlbMessage
   | FrameMessage
   | BatchedAxesMessage
   | GridMessage
   | LabelMessage
+  | TimelineMessage
+  | TimelinePlaybackMessage
   | Gui3DMessage
   | PointCloudMessage
+  | SceneNodeArrayUpdateMessage
   | MeshBoneMessage
   | MeshMessage
   | SkinnedMeshMessage
@@ -1005,6 +1195,10 @@ export type Message =
   | SetCameraFovMessage
   | SetOrientationMessage
   | SetPositionMessage
+  | _SceneNodeBulkUpdateMessage
+  | SetOrientationsMessage
+  | SetPositionsMessage
+  | SetSceneNodeVisibilitiesMessage
   | TransformControlsUpdateMessage
   | BackgroundImageMessage
   | ImageMessage
@@ -1046,10 +1240,39 @@ export type Message =
   | FileTransferStart
   | FileTransferPart
   | FileTransferPartAck
+  | SceneNodeTransferStart
+  | SceneNodeTransferPart
   | ShareUrlRequest
   | ShareUrlUpdated
   | ShareUrlDisconnect
   | SetGuiPanelLabelMessage;
+export type BulkMessage =
+  | CameraFrustumsMessage
+  | PointCloudsMessage
+  | CameraFrustumMessage
+  | GlbMessage
+  | PointCloudMessage
+  | SceneNodeArrayUpdateMessage
+  | MeshMessage
+  | SkinnedMeshMessage
+  | BackgroundImageMessage
+  | ImageMessage
+  | GaussianSplatsMessage
+  | SceneNodeTransferStart
+  | SceneNodeTransferPart;
+export type InteractiveMessage =
+  | TimelinePlaybackMessage
+  | SetCameraPositionMessage
+  | SetCameraUpDirectionMessage
+  | SetCameraLookAtMessage
+  | SetCameraFovMessage
+  | SetOrientationMessage
+  | SetPositionMessage
+  | SetOrientationsMessage
+  | SetPositionsMessage
+  | SetSceneNodeVisibilitiesMessage
+  | SetSceneNodeVisibilityMessage
+  | GuiUpdateMessage;
 export type GuiAddComponentMessage =
   | GuiAddFolderMessage
   | GuiAddMarkdownMessage
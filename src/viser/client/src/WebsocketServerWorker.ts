@@ -1,4 +1,5 @@
 import { encode, decode } from "@msgpack/msgpack";
+import { gunzipSync } from "fflate";
 import { Message } from "./WebsocketMessages";
 import AwaitLock from "await-lock";
 
@@ -68,7 +69,12 @@ function collectArrayBuffers(obj: any, buffers: Set<ArrayBuffer>) {
       // Reduce websocket backpressure.
       const messagePromise = new Promise<Message[]>((resolve) => {
         (event.data.arrayBuffer() as Promise<ArrayBuffer>).then((buffer) => {
-          resolve(decode(new Uint8Array(buffer)) as Message[]);
+          let data = new Uint8Array(buffer);
+          // When we first connect, the server may send a snapshot of the scene as
+          // gzipped message windows. These start with the gzip magic number.
+          if (data.length >= 2 && data[0] === 0x1f && data[1] === 0x8b)
+            data = gunzipSync(data);
+          resolve(decode(data) as Message[]);
         });
       });
 
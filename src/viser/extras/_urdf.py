@@ -53,16 +53,14 @@ class ViserUrdf:
 
         # Add coordinate frame for each joint.
         self._joint_frames: List[viser.SceneNodeHandle] = []
+        self._joint_frame_names: List[str] = []
         for joint in self._urdf.joint_map.values():
             assert isinstance(joint, yourdfpy.Joint)
+            name = _viser_name_from_frame(self._urdf, joint.child, self._root_node_name)
             self._joint_frames.append(
-                self._target.scene.add_frame(
-                    _viser_name_from_frame(
-                        self._urdf, joint.child, self._root_node_name
-                    ),
-                    show_axes=False,
-                )
+                self._target.scene.add_frame(name, show_axes=False)
             )
+            self._joint_frame_names.append(name)
 
         # Add the URDF's meshes/geometry to viser.
         self._meshes: List[viser.SceneNodeHandle] = []
@@ -106,14 +104,22 @@ class ViserUrdf:
     def update_cfg(self, configuration: onp.ndarray) -> None:
         """Update the joint angles of the visualized URDF."""
         self._urdf.update_cfg(configuration)
+        if len(self._joint_frame_names) == 0:
+            return
+
+        # Send all joint poses at once, instead of two messages per joint.
+        T_parent_child = onp.stack(
+            [
+                self._urdf.get_transform(joint.child, joint.parent)
+                for joint in self._urdf.joint_map.values()
+            ]
+        )
         with self._target.atomic():
-            for joint, frame_handle in zip(
-                self._urdf.joint_map.values(), self._joint_frames
-            ):
-                assert isinstance(joint, yourdfpy.Joint)
-                T_parent_child = self._urdf.get_transform(joint.child, joint.parent)
-                frame_handle.wxyz = tf.SO3.from_matrix(T_parent_child[:3, :3]).wxyz
-                frame_handle.position = T_parent_child[:3, 3] * self._scale
+            self._target.scene.set_poses(
+                self._joint_frame_names,
+                wxyzs=tf.SO3.from_matrix(T_parent_child[:, :3, :3]).wxyz,
+                positions=T_parent_child[:, :3, 3] * self._scale,
+            )
 
     def get_actuated_joint_limits(
         self,
@@ -2,20 +2,30 @@
 
 We implement abstractions for:
 - Launching a WebSocket+HTTP server on a shared port.
-- Registering callbacks for connection events and incoming messages.
+- Registering callbacks for connection events and incoming messages, with
+  configurable scheduling for handlers.
 - Asynchronous message sending, both broadcasted and to individual clients.
+- A headless Python client, for load testing and mirroring server state.
 - Defining dataclass-based message types.
 - Translating Python message types to TypeScript interfaces.
+- Reporting server metrics, optionally in the Prometheus text format.
 
 These are what `viser` runs on under-the-hood, and generally won't be useful unless
 you're building a web-based application from scratch.
 """
 
+from ._async_message_buffer import AdaptiveWindowPolicy as AdaptiveWindowPolicy
+from ._client import WebsockClient as WebsockClient
+from ._incoming_dispatch import IncomingDispatchPolicy as IncomingDispatchPolicy
 from ._infra import ClientId as ClientId
+from ._infra import SlowClientPolicy as SlowClientPolicy
 from ._infra import WebsockClientConnection as WebsockClientConnection
 from ._infra import WebsockMessageHandler as WebsockMessageHandler
 from ._infra import WebsockServer as WebsockServer
 from ._messages import Message as Message
+from ._metrics import ClientMetrics as ClientMetrics
+from ._metrics import MessageTypeMetrics as MessageTypeMetrics
+from ._metrics import ServerMetrics as ServerMetrics
 from ._typescript_interface_gen import (
     TypeScriptAnnotationOverride as TypeScriptAnnotationOverride,
 )
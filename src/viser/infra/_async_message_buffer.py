@@ -1,14 +1,117 @@
 from __future__ import annotations
 
 import asyncio
+import bisect
+import collections
 import dataclasses
 import threading
 from asyncio.events import AbstractEventLoop
-from typing import AsyncGenerator, Dict, List, Sequence
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import numpy as onp
 
 from ._messages import Message
 
 
+@dataclasses.dataclass(frozen=True)
+class AdaptiveWindowPolicy:
+    """Policy for sizing message windows by encoded bytes and observed send latency,
+    instead of by message count alone.
+
+    Windows are closed when their approximate size exceeds a per-client byte budget.
+    The budget tracks each client's measured throughput, so that a window takes
+    roughly `target_send_latency_sec` to send. Messages of at least
+    `bulk_message_bytes` (point clouds, meshes, images, ...) are always sent in a
+    window of their own, so small interactive updates are never batched together
+    with bulky geometry.
+
+    Budgets are rounded down to powers of two, which keeps window boundaries stable
+    across clients with similar throughput. Serialized windows can then still be
+    shared between them.
+    """
+
+    min_window_bytes: int = 64 * 1024
+    max_window_bytes: int = 4 * 1024 * 1024
+    bulk_message_bytes: int = 256 * 1024
+    target_send_latency_sec: float = 1.0 / 30.0
+    min_window_duration_sec: float = 1.0 / 240.0
+    max_window_duration_sec: float = 1.0 / 30.0
+    """Bounds for how long we wait to batch messages. Within these bounds, we wait
+    for about as long as recent windows took to send."""
+
+
+@dataclasses.dataclass
+class _ClientWindowState:
+    """Adaptive windowing state for a single consumer."""
+
+    byte_budget: int
+    window_duration_sec: float
+    throughput_bytes_per_sec: Optional[float] = None
+
+
+def _approximate_nbytes(message: Message) -> int:
+    """Cheap estimate of a message's serialized size."""
+    out = 32
+    for value in vars(message).values():
+        if isinstance(value, onp.ndarray):
+            out += value.nbytes
+        elif isinstance(value, (bytes, bytearray, str)):
+            out += len(value)
+        elif isinstance(value, memoryview):
+            out += value.nbytes
+        else:
+            out += 8
+    return out
+
+
+def _floor_power_of_two(value: float) -> int:
+    return 1 << max(int(value), 1).bit_length() - 1
+
+
+@dataclasses.dataclass(frozen=True)
+class MessageWindow:
+    """A window of messages, yielded by :meth:`AsyncMessageBuffer.window_generator`."""
+
+    messages: Sequence[Message]
+    first_id: int
+    last_id: int
+    """Range of message IDs covered by this window. Windows of interactive messages
+    that skip ahead of bulk messages cover an empty range (`last_id < first_id`),
+    because they don't advance the consumer's position in the buffer."""
+    shareable: bool
+    """Whether this window is identical for all clients that consume it, which lets
+    us reuse serialized outputs."""
+
+    @property
+    def cache_key(self) -> Optional[Tuple[int, int]]:
+        """Key for sharing serialized outputs, or `None` if the window can't be
+        shared."""
+        return (self.first_id, self.last_id) if self.shareable else None
+
+
+@dataclasses.dataclass
+class _SnapshotSegment:
+    """Serialized chunk of a persistent buffer, sent to newly connected clients."""
+
+    first_id: int
+    last_id: int
+    payload: Optional[bytes] = None
+    valid: bool = True
+    """Set to False when any message in the segment is culled."""
+
+
 @dataclasses.dataclass
 class AsyncMessageBuffer:
     """Async iterable for keeping a persistent buffer of messages.
@@ -23,12 +126,68 @@ class AsyncMessageBuffer:
     message_counter: int = 0
     message_from_id: Dict[int, Message] = dataclasses.field(default_factory=dict)
     id_from_redundancy_key: Dict[str, int] = dataclasses.field(default_factory=dict)
+    live_ids: List[int] = dataclasses.field(default_factory=list)
+    """Sorted IDs of buffered messages, used to skip over gaps left by culled
+    messages. Can contain IDs that have since been removed; these are compacted away
+    once they outnumber the live ones. Compaction replaces the list, so readers can
+    iterate over a reference without holding the lock."""
 
     buffer_lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
     """Lock to prevent race conditions when pushing messages from different threads."""
 
+    encoded_window_cache: Dict[Tuple[int, int], Any] = dataclasses.field(
+        default_factory=dict
+    )
+    """Serialized windows, shared between clients. Only populated for persistent
+    buffers. Entries are evicted once all consumers have advanced past them."""
+    degraded_message_cache: Dict[int, Tuple[Message, Any]] = dataclasses.field(
+        default_factory=dict
+    )
+    """Pending or finished :meth:`Message.degrade()` results, shared between slow
+    clients. Keyed by `id()` of the original message, which each entry keeps alive.
+    Only populated for persistent buffers. Entries are evicted when the original
+    message leaves the buffer."""
+    last_sent_id_from_client: Dict[int, int] = dataclasses.field(default_factory=dict)
+    consumer_progress: Dict[int, int] = dataclasses.field(default_factory=dict)
+    """Last message ID sent to each active consumer, including detached ones. Used
+    for reporting queue depths."""
+    detached_client_ids: Set[int] = dataclasses.field(default_factory=set)
+    """Clients that shouldn't share serialized windows, for example because they're
+    too slow. Detached clients don't hold back cache eviction."""
+    coalesced_client_ids: Set[int] = dataclasses.field(default_factory=set)
+    """Clients that are sent all of their pending messages in a single window, for
+    example because they're too slow to keep up with individual windows. Superseded
+    messages have already been culled from the buffer by redundancy key, so these
+    clients skip intermediate states."""
+
+    ids_from_scope: Dict[str, Set[int]] = dataclasses.field(default_factory=dict)
+    scopes_from_id: Dict[int, Tuple[str, ...]] = dataclasses.field(default_factory=dict)
+    """Index of buffered messages by `Message.persistent_scopes()`. Only populated
+    for persistent buffers."""
+    sorted_scopes: List[str] = dataclasses.field(default_factory=list)
+    """Keys of `ids_from_scope`, sorted. Descendants of a scope are contiguous, so
+    clearing a scope only visits its own subtree."""
+    transient_ids: collections.deque[int] = dataclasses.field(
+        default_factory=collections.deque
+    )
+    """IDs of buffered messages that clear a scope, in order. These are dropped once
+    every consumer has sent them."""
+
+    snapshot_segments: List[_SnapshotSegment] = dataclasses.field(default_factory=list)
+    """Serialized segments of the persistent buffer, sorted by message ID. Segments
+    are invalidated when messages inside of them become redundant, and rebuilt
+    lazily the next time a snapshot is requested."""
+    snapshot_segment_size: int = 256
+    snapshot_lock: asyncio.Lock = dataclasses.field(default_factory=asyncio.Lock)
+
     max_window_size: int = 128
     window_duration_sec: float = 1.0 / 60.0
+    window_policy: Optional[AdaptiveWindowPolicy] = None
+    """If set, windows are sized adaptively instead of using `window_duration_sec`.
+    `max_window_size` still caps the number of messages per window."""
+    window_state_from_client: Dict[int, _ClientWindowState] = dataclasses.field(
+        default_factory=dict
+    )
     done: bool = False
 
     def push(self, message: Message) -> None:
@@ -37,21 +196,55 @@ class AsyncMessageBuffer:
         assert isinstance(message, Message)
 
         # Add message to buffer.
-        redundancy_key = message.redundancy_key()
+        redundancy_keys = message.redundancy_keys()
+        scopes: Tuple[str, ...] = ()
+        cleared_scope = None
+        if self.persistent_messages:
+            scopes = message.persistent_scopes()
+            cleared_scope = message.clears_scope()
         with self.buffer_lock:
+            # Drop state that this message clears. If nobody is consuming from the
+            # buffer, the message itself isn't needed either.
+            if cleared_scope is not None:
+                self._clear_scope(cleared_scope)
+                if len(self.consumer_progress) == 0:
+                    return
+
             new_message_id = self.message_counter
             self.message_from_id[new_message_id] = message
             self.message_counter += 1
+            self.live_ids.append(new_message_id)
 
             # If an existing message with the same key already exists in our buffer, we
             # don't need the old one anymore. :-)
-            if (
-                redundancy_key is not None
-                and redundancy_key in self.id_from_redundancy_key
-            ):
-                old_message_id = self.id_from_redundancy_key.pop(redundancy_key)
-                self.message_from_id.pop(old_message_id)
-            self.id_from_redundancy_key[redundancy_key] = new_message_id
+            superseded_from_id: Dict[int, Set[str]] = {}
+            for redundancy_key in redundancy_keys:
+                old_message_id = self.id_from_redundancy_key.get(redundancy_key, None)
+                if old_message_id is not None and old_message_id != new_message_id:
+                    superseded_from_id.setdefault(old_message_id, set()).add(
+                        redundancy_key
+                    )
+                self.id_from_redundancy_key[redundancy_key] = new_message_id
+
+            # Messages with several keys are only dropped once all of them have been
+            # superseded. Until then, they're pruned.
+            for old_message_id, superseded in superseded_from_id.items():
+                old_message = self.message_from_id[old_message_id]
+                if superseded.issuperset(old_message.redundancy_keys()):
+                    self._remove_message(old_message_id)
+                else:
+                    self._replace_message(
+                        old_message_id,
+                        old_message.without_redundancy_keys(frozenset(superseded)),
+                    )
+
+            self._index_scopes(new_message_id, scopes)
+            if cleared_scope is not None:
+                self.transient_ids.append(new_message_id)
+
+            if len(self.live_ids) > 2 * len(self.message_from_id) + 1024:
+                message_from_id = self.message_from_id
+                self.live_ids = [i for i in self.live_ids if i in message_from_id]
 
         # Pulse message event to notify consumers that a new message is available.
         self.event_loop.call_soon_threadsafe(self.message_event.set)
@@ -70,50 +263,609 @@ class AsyncMessageBuffer:
         # Pulse flush event to skip any windowing delay.
         self.event_loop.call_soon_threadsafe(self.flush_event.set)
 
+    def _iter_live_ids(self, after_id: int) -> Generator[int, None, None]:
+        """Iterate over IDs of buffered messages that come after `after_id`. Cost is
+        proportional to the number of buffered messages, not the number of IDs."""
+        ids = self.live_ids
+        index = bisect.bisect_right(ids, after_id)
+        while index < len(ids):
+            message_id = ids[index]
+            index += 1
+            if message_id in self.message_from_id:
+                yield message_id
+
+    def _remove_message(self, message_id: int) -> None:
+        """Remove a message from the buffer. Should be called with `buffer_lock`
+        held."""
+        message = self.message_from_id.pop(message_id, None)
+        if message is None:
+            return
+        self._unindex_redundancy_keys(message_id, message)
+        self._unindex_scope(message_id)
+        self._invalidate_snapshot_segment(message_id)
+        self.degraded_message_cache.pop(id(message), None)
+
+    def _unindex_redundancy_keys(self, message_id: int, message: Message) -> None:
+        """Remove a message's redundancy keys from the index, unless they've been
+        taken over by newer messages. Should be called with `buffer_lock` held."""
+        for redundancy_key in message.redundancy_keys():
+            if self.id_from_redundancy_key.get(redundancy_key, None) == message_id:
+                self.id_from_redundancy_key.pop(redundancy_key)
+
+    def _index_scopes(self, message_id: int, scopes: Tuple[str, ...]) -> None:
+        """Add a message to the scope index. Should be called with `buffer_lock`
+        held."""
+        if len(scopes) == 0:
+            return
+        self.scopes_from_id[message_id] = scopes
+        for scope in scopes:
+            ids = self.ids_from_scope.get(scope, None)
+            if ids is None:
+                ids = self.ids_from_scope[scope] = set()
+                bisect.insort(self.sorted_scopes, scope)
+            ids.add(message_id)
+
+    def _unindex_scope(self, message_id: int) -> None:
+        """Remove a message from the scope index. Should be called with `buffer_lock`
+        held."""
+        for scope in self.scopes_from_id.pop(message_id, ()):
+            ids = self.ids_from_scope[scope]
+            ids.discard(message_id)
+            if len(ids) == 0:
+                self.ids_from_scope.pop(scope)
+                del self.sorted_scopes[bisect.bisect_left(self.sorted_scopes, scope)]
+
+    def _scope_subtree(self, cleared_scope: str) -> List[str]:
+        """Get indexed scopes that are `cleared_scope` or its descendants. Should be
+        called with `buffer_lock` held."""
+        if cleared_scope == "":
+            return list(self.sorted_scopes)
+        # Descendants start with `prefix`, so they sort between it and the same
+        # string with its trailing "/" incremented.
+        prefix = cleared_scope.rstrip("/") + "/"
+        start = bisect.bisect_left(self.sorted_scopes, prefix)
+        end = bisect.bisect_left(self.sorted_scopes, prefix[:-1] + chr(ord("/") + 1))
+        subtree = self.sorted_scopes[start:end]
+        if cleared_scope in self.ids_from_scope and cleared_scope != prefix:
+            subtree.append(cleared_scope)
+        return subtree
+
+    def _clear_scope(self, cleared_scope: str) -> None:
+        """Remove messages whose scopes are `cleared_scope` or its descendants. The
+        empty scope is the root of every other scope. Messages with other scopes
+        left are replaced by `Message.without_scopes()`. Should be called with
+        `buffer_lock` held."""
+        cleared_from_id: Dict[int, Set[str]] = {}
+        for scope in self._scope_subtree(cleared_scope):
+            for message_id in self.ids_from_scope[scope]:
+                cleared_from_id.setdefault(message_id, set()).add(scope)
+
+        for message_id, cleared in cleared_from_id.items():
+            scopes = self.scopes_from_id[message_id]
+            if cleared.issuperset(scopes):
+                self._remove_message(message_id)
+            else:
+                self._replace_message(
+                    message_id,
+                    self.message_from_id[message_id].without_scopes(frozenset(cleared)),
+                )
+
+    def _replace_message(self, message_id: int, pruned: Message) -> None:
+        """Replace a buffered message with a pruned version of itself, from
+        `Message.without_scopes()` or `Message.without_redundancy_keys()`. The
+        message keeps its ID, so its position in the buffer is unchanged. Should be
+        called with `buffer_lock` held."""
+        message = self.message_from_id[message_id]
+        self.message_from_id[message_id] = pruned
+        self.degraded_message_cache.pop(id(message), None)
+
+        pruned_keys = pruned.redundancy_keys()
+        for redundancy_key in set(message.redundancy_keys()).difference(pruned_keys):
+            if self.id_from_redundancy_key.get(redundancy_key, None) == message_id:
+                self.id_from_redundancy_key.pop(redundancy_key)
+        for redundancy_key in pruned_keys:
+            self.id_from_redundancy_key.setdefault(redundancy_key, message_id)
+
+        if message_id in self.scopes_from_id:
+            self._unindex_scope(message_id)
+            self._index_scopes(message_id, pruned.persistent_scopes())
+        self._invalidate_snapshot_segment(message_id)
+
+    def _drop_sent_transient_messages(self) -> None:
+        """Drop scope-clearing messages that every consumer has already sent."""
+        if len(self.transient_ids) == 0:
+            return
+        min_progress = min(
+            self.consumer_progress.values(), default=self.message_counter - 1
+        )
+        with self.buffer_lock:
+            while len(self.transient_ids) > 0 and self.transient_ids[0] <= min_progress:
+                self._remove_message(self.transient_ids.popleft())
+
+    def _invalidate_snapshot_segment(self, message_id: int) -> None:
+        """Invalidate the snapshot segment containing a message ID, if any. Should
+        be called with `buffer_lock` held."""
+        segments = self.snapshot_segments
+        if len(segments) == 0 or message_id > segments[-1].last_id:
+            return
+        index = bisect.bisect_right([s.first_id for s in segments], message_id) - 1
+        if index >= 0 and message_id <= segments[index].last_id:
+            segments[index].valid = False
+
+    async def get_snapshot(
+        self, encode: Callable[[Sequence[Message]], Awaitable[bytes]], client_id: int
+    ) -> Tuple[int, List[bytes]]:
+        """Get serialized segments that cover the current contents of a persistent
+        buffer. Segments are cached; only segments that have been invalidated or
+        that contain new messages are re-encoded.
+
+        Returns the ID of the last message covered by the snapshot, which consumers
+        should start from, and a list of serialized segments. The client is
+        registered as a consumer from that point on; callers should follow up with
+        `window_generator()`, or `remove_consumer()` if that fails.
+        """
+        assert self.persistent_messages
+
+        async with self.snapshot_lock:
+            with self.buffer_lock:
+                last_id = self.message_counter - 1
+                self.consumer_progress[client_id] = last_id
+                self.snapshot_segments = [s for s in self.snapshot_segments if s.valid]
+
+                # Group live messages that aren't covered by any valid segment.
+                # Message IDs are inserted into `message_from_id` in order.
+                segments = self.snapshot_segments
+                segment_index = 0
+                new_segments: List[Tuple[_SnapshotSegment, List[Message]]] = []
+                pending_ids: List[int] = []
+                pending_messages: List[Message] = []
+
+                def make_segment() -> None:
+                    new_segments.append(
+                        (
+                            _SnapshotSegment(pending_ids[0], pending_ids[-1]),
+                            list(pending_messages),
+                        )
+                    )
+                    pending_ids.clear()
+                    pending_messages.clear()
+
+                for message_id, message in self.message_from_id.items():
+                    while (
+                        segment_index < len(segments)
+                        and segments[segment_index].last_id < message_id
+                    ):
+                        segment_index += 1
+                        # Segments shouldn't span existing segment boundaries.
+                        if len(pending_ids) > 0:
+                            make_segment()
+                    if (
+                        segment_index < len(segments)
+                        and segments[segment_index].first_id <= message_id
+                    ):
+                        continue
+                    pending_ids.append(message_id)
+                    pending_messages.append(message)
+                    if len(pending_ids) >= self.snapshot_segment_size:
+                        make_segment()
+                if len(pending_ids) > 0:
+                    make_segment()
+
+                # Register new segments before encoding, so messages that are culled
+                # in the meantime invalidate them.
+                self.snapshot_segments = sorted(
+                    segments + [segment for segment, _ in new_segments],
+                    key=lambda s: s.first_id,
+                )
+
+            for segment, messages in new_segments:
+                segment.payload = await encode(messages)
+
+            payloads = []
+            for segment in self.snapshot_segments:
+                assert segment.payload is not None
+                payloads.append(segment.payload)
+            return last_id, payloads
+
+    def _update_progress(self, client_id: int, last_sent_id: Optional[int]) -> None:
+        """Record how far a consumer has gotten, and evict cached windows that every
+        consumer is done with. `None` removes a consumer from eviction bookkeeping."""
+        if last_sent_id is None:
+            self.last_sent_id_from_client.pop(client_id, None)
+        else:
+            self.last_sent_id_from_client[client_id] = last_sent_id
+        if len(self.last_sent_id_from_client) == 0:
+            self.encoded_window_cache.clear()
+            return
+        if len(self.encoded_window_cache) == 0:
+            return
+        min_last_sent_id = min(self.last_sent_id_from_client.values())
+        for key in [k for k in self.encoded_window_cache if k[1] <= min_last_sent_id]:
+            self.encoded_window_cache.pop(key)
+
+    def pending_message_count(self, client_id: int) -> int:
+        """Approximate number of buffered messages that haven't been sent to a
+        consumer yet. Safe to call from any thread."""
+        last_sent_id = self.consumer_progress.get(client_id, -1)
+        with self.buffer_lock:
+            return sum(
+                1 for message_id in self.message_from_id if message_id > last_sent_id
+            )
+
+    def buffered_size(self) -> Tuple[int, int]:
+        """Number and approximate total size of buffered messages. Safe to call from
+        any thread."""
+        with self.buffer_lock:
+            return len(self.message_from_id), sum(
+                _approximate_nbytes(message)
+                for message in self.message_from_id.values()
+            )
+
+    def record_send(self, client_id: int, num_bytes: int, duration_sec: float) -> None:
+        """Record how long it took to send a window to a client. Used for adaptive
+        window sizing; no-op if no window policy is set."""
+        policy = self.window_policy
+        state = self.window_state_from_client.get(client_id, None)
+        if policy is None or state is None:
+            return
+
+        # Exponential moving averages.
+        alpha = 0.25
+        state.window_duration_sec = min(
+            max(
+                (1.0 - alpha) * state.window_duration_sec + alpha * duration_sec,
+                policy.min_window_duration_sec,
+            ),
+            policy.max_window_duration_sec,
+        )
+
+        # Small windows are dominated by overhead, and don't tell us much about
+        # throughput.
+        if num_bytes < policy.min_window_bytes or duration_sec <= 0.0:
+            return
+        throughput = num_bytes / duration_sec
+        if state.throughput_bytes_per_sec is not None:
+            throughput = (
+                1.0 - alpha
+            ) * state.throughput_bytes_per_sec + alpha * throughput
+        state.throughput_bytes_per_sec = throughput
+        state.byte_budget = _floor_power_of_two(
+            min(
+                max(
+                    throughput * policy.target_send_latency_sec,
+                    policy.min_window_bytes,
+                ),
+                policy.max_window_bytes,
+            )
+        )
+
+    def remove_consumer(self, client_id: int) -> None:
+        """Stop tracking a consumer's progress."""
+        self._update_progress(client_id, None)
+        self.consumer_progress.pop(client_id, None)
+        self._drop_sent_transient_messages()
+
     async def window_generator(
-        self, client_id: int
-    ) -> AsyncGenerator[Sequence[Message], None]:
+        self,
+        client_id: int,
+        last_sent_id: int = -1,
+        rank_bulk_message: Optional[Callable[[Message], float]] = None,
+    ) -> AsyncGenerator[MessageWindow, None]:
         """Async iterator over messages. Loops infinitely, and waits when no messages
-        are available."""
+        are available.
 
-        last_sent_id = -1
-        flush_wait = asyncio.create_task(self.flush_event.wait())
-        while not self.done:
-            window: List[Message] = []
-            most_recent_message_id = self.message_counter - 1
-            while (
-                last_sent_id < most_recent_message_id
-                and len(window) < self.max_window_size
-            ):
-                last_sent_id += 1
-                if self.persistent_messages:
-                    message = self.message_from_id.get(last_sent_id, None)
+        Args:
+            client_id: ID of the consuming client.
+            last_sent_id: ID of the last message that the client already has, for
+                example from a snapshot. Iteration starts after this message.
+            rank_bulk_message: If set, bulk messages that are queued back-to-back
+                are sent in order of decreasing rank, instead of in the order they
+                were pushed. Ties keep their order. A message never skips ahead of
+                messages in its own scopes or their ancestors (see
+                :meth:`Message.persistent_scopes()`), or of unscoped messages.
+        """
+
+        self.last_sent_id_from_client[client_id] = last_sent_id
+        policy = self.window_policy
+        state = None
+        if policy is not None:
+            state = _ClientWindowState(
+                byte_budget=_floor_power_of_two(policy.max_window_bytes),
+                window_duration_sec=policy.min_window_duration_sec,
+            )
+            self.window_state_from_client[client_id] = state
+
+        # Interactive messages can skip ahead of bulk ones, and ranked bulk messages
+        # can skip ahead of each other. We keep track of the messages that were sent
+        # early, and how far ahead we've already looked for interactive ones.
+        sent_ahead_ids: Set[int] = set()
+        scanned_up_to = last_sent_id
+
+        # Scopes of scanned messages that haven't been sent yet, and that interactive
+        # messages in the same scopes or their descendants can't skip ahead of. For
+        # example, a node's pose can't be sent before the message that creates it.
+        held_scopes_from_id: Dict[int, Tuple[str, ...]] = {}
+        held_scope_counts: Dict[str, int] = {}
+
+        def hold_scopes(message_id: int, scopes: Tuple[str, ...]) -> None:
+            held_scopes_from_id[message_id] = scopes
+            for scope in scopes:
+                held_scope_counts[scope] = held_scope_counts.get(scope, 0) + 1
+
+        def release_scopes(message_id: int) -> None:
+            for scope in held_scopes_from_id.pop(message_id, ()):
+                count = held_scope_counts[scope] - 1
+                if count == 0:
+                    held_scope_counts.pop(scope)
                 else:
-                    # If we're not persisting messages, remove them from the buffer.
-                    with self.buffer_lock:
-                        message = self.message_from_id.pop(last_sent_id, None)
-                        if message is not None:
-                            redundancy_key = message.redundancy_key()
-                            self.id_from_redundancy_key.pop(redundancy_key, None)
+                    held_scope_counts[scope] = count
+
+        def is_held(scopes: Tuple[str, ...]) -> bool:
+            # Scopes are paths. The empty scope is the root of all of them, but
+            # isn't a scene node, so it doesn't hold anything back.
+            return len(held_scope_counts) > 0 and any(
+                prefix != "" and prefix in held_scope_counts
+                for parts in (scope.split("/") for scope in scopes)
+                for prefix in ("/".join(parts[:i]) for i in range(1, len(parts) + 1))
+            )
 
-                if message is not None and message.excluded_self_client != client_id:
-                    window.append(message)
+        def take_priority_messages(start_id: int, end_id: int) -> List[Message]:
+            """Take interactive messages that are queued behind the bulk message at
+            `start_id`. We stop at the first message that's neither, to preserve the
+            relative order of interactive messages and everything they might depend
+            on. Interactive messages also stay behind bulk messages in the same
+            scopes or their ancestors (see :meth:`Message.persistent_scopes()`)."""
+            nonlocal scanned_up_to
 
-            if len(window) > 0:
-                # Yield a window!
-                yield window
+            # Messages that have been sent in order don't hold their scopes anymore.
+            # IDs are inserted in order.
+            while len(held_scopes_from_id) > 0:
+                held_id = next(iter(held_scopes_from_id))
+                if held_id > last_sent_id:
+                    break
+                release_scopes(held_id)
+
+            out: List[Message] = []
+            for message_id in self._iter_live_ids(max(start_id, scanned_up_to + 1) - 1):
+                if message_id > end_id:
+                    scanned_up_to = end_id
+                    break
+                message = self.message_from_id.get(message_id, None)
+                if message is not None:
+                    priority = message.priority()
+                    if priority == "default":
+                        break
+                    scopes = message.persistent_scopes()
+                    if priority == "bulk" or is_held(scopes):
+                        # Later interactive messages in the same scopes stay behind
+                        # this one, so their relative order is preserved.
+                        hold_scopes(message_id, scopes)
+                    elif priority == "interactive":
+                        if not self.persistent_messages:
+                            with self.buffer_lock:
+                                message = self.message_from_id.pop(message_id, None)
+                                if message is not None:
+                                    self._unindex_redundancy_keys(message_id, message)
+                        if message is not None:
+                            sent_ahead_ids.add(message_id)
+                            if message.excluded_self_client != client_id:
+                                out.append(message)
+                scanned_up_to = message_id
+                if len(out) >= self.max_window_size:
+                    break
             else:
-                # Wait for a new message to come in.
-                await self.message_event.wait()
-                self.message_event.clear()
-
-            # Add a delay if either (a) we failed to yield or (b) there's currently no messages to send.
-            most_recent_message_id = self.message_counter - 1
-            if len(window) == 0 or most_recent_message_id == last_sent_id:
-                done, pending = await asyncio.wait(
-                    [flush_wait], timeout=self.window_duration_sec
+                scanned_up_to = max(scanned_up_to, end_id)
+            return out
+
+        def take_ranked_bulk_message(start_id: int, end_id: int) -> Optional[Message]:
+            """Take the highest-ranked bulk message from the run that starts at
+            `start_id`, unless it's already the first one that hasn't been sent."""
+            assert rank_bulk_message is not None
+            seen_scopes: Set[str] = set()
+            first_id: Optional[int] = None
+            best_id: Optional[int] = None
+            best_rank = float("-inf")
+            num_candidates = 0
+            for message_id in self._iter_live_ids(start_id - 1):
+                if message_id > end_id or num_candidates >= self.max_window_size:
+                    break
+                message = self.message_from_id.get(message_id, None)
+                if message is None or message_id in sent_ahead_ids:
+                    continue
+                priority = message.priority()
+                scopes = message.persistent_scopes()
+                if priority == "interactive":
+                    # Interactive messages that weren't sent ahead are waiting for
+                    # bulk messages in their scopes.
+                    seen_scopes.update(scopes)
+                    continue
+                if priority != "bulk" or len(scopes) == 0:
+                    break
+
+                # Scopes are paths, and the empty scope is the root of all of them.
+                if all(
+                    seen_scopes.isdisjoint(
+                        "/".join(parts[:i]) for i in range(1, len(parts) + 1)
+                    )
+                    for parts in (scope.split("/") for scope in scopes)
+                ):
+                    num_candidates += 1
+                    rank = (
+                        float("-inf")
+                        if message.excluded_self_client == client_id
+                        else rank_bulk_message(message)
+                    )
+                    if best_id is None or rank > best_rank:
+                        best_id = message_id
+                        best_rank = rank
+                    if first_id is None:
+                        first_id = message_id
+                seen_scopes.update(scopes)
+
+            if best_id is None or best_id == first_id:
+                return None
+            release_scopes(best_id)
+            message = self.message_from_id.get(best_id, None)
+            if not self.persistent_messages:
+                with self.buffer_lock:
+                    message = self.message_from_id.pop(best_id, None)
+                    if message is not None:
+                        self._unindex_redundancy_keys(best_id, message)
+            if message is not None:
+                sent_ahead_ids.add(best_id)
+            return message
+
+        flush_wait = asyncio.create_task(self.flush_event.wait())
+        try:
+            while not self.done:
+                # Resuming from a yield means the previous window has been sent.
+                detached = client_id in self.detached_client_ids
+                coalesced = client_id in self.coalesced_client_ids
+                self._update_progress(client_id, None if detached else last_sent_id)
+                self.consumer_progress[client_id] = last_sent_id
+                self._drop_sent_transient_messages()
+
+                most_recent_message_id = self.message_counter - 1
+
+                # Before each bulk message, send any interactive messages that are
+                # queued behind it. These windows are specific to this client.
+                next_id = next(self._iter_live_ids(last_sent_id), None)
+                next_message = (
+                    None if next_id is None else self.message_from_id.get(next_id, None)
                 )
-                del pending
-                if flush_wait in done and not self.done:
-                    self.flush_event.clear()
-                    flush_wait = asyncio.create_task(self.flush_event.wait())
+                if (
+                    not coalesced
+                    and next_message is not None
+                    and next_message.priority() == "bulk"
+                ):
+                    assert next_id is not None
+                    priority_window = take_priority_messages(
+                        next_id, most_recent_message_id
+                    )
+                    if len(priority_window) > 0:
+                        yield MessageWindow(
+                            priority_window,
+                            last_sent_id + 1,
+                            last_sent_id,
+                            shareable=False,
+                        )
+                        continue
+
+                    # Then, the bulk message that ranks highest for this client.
+                    ranked_message = (
+                        None
+                        if rank_bulk_message is None
+                        else take_ranked_bulk_message(next_id, most_recent_message_id)
+                    )
+                    if ranked_message is not None:
+                        yield MessageWindow(
+                            [ranked_message],
+                            last_sent_id + 1,
+                            last_sent_id,
+                            shareable=False,
+                        )
+                        continue
+
+                window: List[Message] = []
+                window_bytes = 0
+                first_id = last_sent_id + 1
+                shareable = self.persistent_messages and not detached and not coalesced
+                while last_sent_id < most_recent_message_id and (
+                    coalesced or len(window) < self.max_window_size
+                ):
+                    if last_sent_id + 1 in sent_ahead_ids:
+                        # Already sent.
+                        last_sent_id += 1
+                        sent_ahead_ids.remove(last_sent_id)
+                        shareable = False
+                        continue
+
+                    message = self.message_from_id.get(last_sent_id + 1, None)
+                    if message is None:
+                        # Skip over culled messages, without visiting each ID.
+                        next_id = next(self._iter_live_ids(last_sent_id), None)
+                        skip_to = (
+                            most_recent_message_id
+                            if next_id is None
+                            else min(next_id - 1, most_recent_message_id)
+                        )
+                        skipped_ahead_ids = [i for i in sent_ahead_ids if i <= skip_to]
+                        if len(skipped_ahead_ids) > 0:
+                            sent_ahead_ids.difference_update(skipped_ahead_ids)
+                            shareable = False
+                        last_sent_id = max(last_sent_id + 1, skip_to)
+                        continue
+
+                    if coalesced:
+                        bulk = False
+                    elif message.priority() == "bulk":
+                        # Bulk messages are sent in their own window, which gives
+                        # interactive messages a chance to skip ahead of them.
+                        if len(window) > 0:
+                            break
+                        bulk = True
+                    else:
+                        bulk = False
+
+                    nbytes = 0
+                    if (
+                        state is not None
+                        and not coalesced
+                        and message is not None
+                        and message.excluded_self_client != client_id
+                    ):
+                        assert policy is not None
+                        nbytes = _approximate_nbytes(message)
+
+                        # Bulky messages are sent in their own window.
+                        if len(window) > 0 and (
+                            nbytes >= policy.bulk_message_bytes
+                            or window_bytes + nbytes > state.byte_budget
+                        ):
+                            break
+                        bulk = bulk or nbytes >= policy.bulk_message_bytes
+
+                    last_sent_id += 1
+                    if not self.persistent_messages:
+                        # If we're not persisting messages, remove them from the buffer.
+                        with self.buffer_lock:
+                            message = self.message_from_id.pop(last_sent_id, None)
+                            if message is not None:
+                                self._unindex_redundancy_keys(last_sent_id, message)
+
+                    if message is None:
+                        continue
+                    if message.excluded_self_client is not None:
+                        # Window contents differ between clients.
+                        shareable = False
+                    if message.excluded_self_client != client_id:
+                        window.append(message)
+                        window_bytes += nbytes
+                        if bulk:
+                            break
+
+                if len(window) > 0:
+                    # Yield a window!
+                    yield MessageWindow(window, first_id, last_sent_id, shareable)
+                else:
+                    # Wait for a new message to come in.
+                    await self.message_event.wait()
+                    self.message_event.clear()
+
+                # Add a delay if either (a) we failed to yield or (b) there's currently no messages to send.
+                most_recent_message_id = self.message_counter - 1
+                if len(window) == 0 or most_recent_message_id == last_sent_id:
+                    done, pending = await asyncio.wait(
+                        [flush_wait],
+                        timeout=self.window_duration_sec
+                        if state is None
+                        else state.window_duration_sec,
+                    )
+                    del pending
+                    if flush_wait in done and not self.done:
+                        self.flush_event.clear()
+                        flush_wait = asyncio.create_task(self.flush_event.wait())
+        finally:
+            self.remove_consumer(client_id)
+            if state is not None:
+                self.window_state_from_client.pop(client_id, None)
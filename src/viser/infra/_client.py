@@ -0,0 +1,220 @@
+"""Headless Python client for :class:`WebsockServer`. Useful for load testing, and
+for mirroring the state of a server into another process."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar, Union
+
+import msgspec
+import numpy as onp
+import websockets.client
+import websockets.exceptions
+from typing_extensions import get_args, get_origin
+
+from ._async_message_buffer import AsyncMessageBuffer
+from ._infra import WebsockMessageHandler
+from ._messages import Message, _lists_to_tuple, get_type_hints_cached
+
+TMessage = TypeVar("TMessage", bound=Message)
+
+
+def _array_dtype(annotation: Any) -> Optional[onp.dtype]:
+    """Get the dtype of an array annotation like `NDArray[onp.uint8]`, or its
+    `Optional` variant. Returns None for non-array annotations."""
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return None
+        annotation = args[0]
+    if get_origin(annotation) is not onp.ndarray:
+        return None
+    dtype_args = get_args(get_args(annotation)[1])
+    if len(dtype_args) == 0 or dtype_args[0] is Any:
+        return onp.dtype(onp.uint8)
+    return onp.dtype(dtype_args[0])
+
+
+def _message_from_mapping(
+    message_class: type[Message], mapping: Dict[str, Any]
+) -> Message:
+    """Convert a decoded outgoing message back into a Python Message object.
+
+    Arrays are restored as flat arrays of their annotated dtype, or of bytes for
+    arrays annotated with `Any`; their original shapes aren't part of the wire
+    format. For this reason, `__post_init__()` validation is skipped."""
+    message_type = message_class._subclass_from_type_string()[mapping.pop("type")]
+    hints = get_type_hints_cached(message_type)
+    kwargs = message_type._from_serializable_dict(
+        {k: _lists_to_tuple(v) for k, v in mapping.items() if k in hints}
+    )
+    for k, v in kwargs.items():
+        if isinstance(v, bytes):
+            dtype = _array_dtype(hints[k])
+            if dtype is not None:
+                kwargs[k] = onp.frombuffer(v, dtype=dtype)
+    message = object.__new__(message_type)
+    message.__dict__.update(kwargs)
+    return message
+
+
+class WebsockClient:
+    """**Experimental.**
+
+    Headless asyncio client for a :class:`WebsockServer`.
+
+    Incoming windows are decoded into Python messages using the `message_class`
+    registry. By default, the client also maintains a mirror of the server's state:
+    the latest message for each redundancy key, in the order that a newly connected
+    client would receive them. Like the server's persistent buffer, messages that
+    clear a scope (see :meth:`Message.clears_scope()`) prune the mirror. Replaying
+    the mirror into another server reproduces the scene; see :meth:`replay()`.
+
+    Example:
+
+    .. code-block:: python
+
+        async with WebsockClient("ws://localhost:8080", _messages.Message) as client:
+            await client.send(_messages.ViewerCameraMessage(...))
+            await client.wait_for_idle(0.5)
+            print(len(client.mirrored_messages))
+
+    Args:
+        url: Websocket URL of the server.
+        message_class: Base class for message types.
+        mirror: Whether to maintain a mirror of the server's state. Can be disabled
+            to reduce overhead, for example when simulating many clients.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        message_class: type[Message] = Message,
+        mirror: bool = True,
+    ) -> None:
+        self._url = url
+        self._message_class = message_class
+        self._mirror_enabled = mirror
+        self._mirror: Optional[AsyncMessageBuffer] = None
+        self._handlers: Dict[
+            type[Message], List[Callable[[Any], Union[None, Awaitable[None]]]]
+        ] = {}
+        self._websocket: Optional[websockets.client.WebSocketClientProtocol] = None
+        self._receive_task: Optional[asyncio.Task[None]] = None
+        self._last_receive_time = 0.0
+
+        self.windows_received = 0
+        """Number of websocket messages received. Each contains a window of one or
+        more messages, or a compressed snapshot."""
+        self.messages_received = 0
+        self.bytes_received = 0
+        """Received bytes, before decompressing snapshots."""
+
+    async def connect(self) -> None:
+        """Connect to the server, and start receiving messages."""
+        assert self._websocket is None, "Already connected."
+        if self._mirror_enabled:
+            # The server sends its full state on connect, so we start from scratch.
+            # Nothing consumes from the mirror; it's only used for its indexing.
+            self._mirror = AsyncMessageBuffer(
+                asyncio.get_running_loop(), persistent_messages=True
+            )
+        self._websocket = await websockets.client.connect(self._url, max_size=None)
+        self._last_receive_time = time.perf_counter()
+        self._receive_task = asyncio.create_task(self._receive_loop())
+
+    async def close(self) -> None:
+        """Disconnect from the server."""
+        if self._receive_task is not None:
+            self._receive_task.cancel()
+            self._receive_task = None
+        if self._websocket is not None:
+            await self._websocket.close()
+            self._websocket = None
+
+    async def __aenter__(self) -> WebsockClient:
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    def register_handler(
+        self,
+        message_cls: type[TMessage],
+        callback: Callable[[TMessage], Union[None, Awaitable[None]]],
+    ) -> None:
+        """Register a handler for a particular message type. Handlers run on the
+        client's event loop, and can be synchronous or coroutine functions."""
+        self._handlers.setdefault(message_cls, []).append(callback)  # type: ignore
+
+    async def send(self, message: Message) -> None:
+        """Send a message to the server."""
+        assert self._websocket is not None, "Not connected."
+        await self._websocket.send(
+            msgspec.msgpack.encode(message.as_serializable_dict())
+        )
+
+    async def wait_for_idle(self, idle_sec: float, timeout_sec: float = 60.0) -> None:
+        """Wait until no messages have been received for `idle_sec` seconds."""
+        start_time = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            remaining = self._last_receive_time + idle_sec - now
+            if remaining <= 0.0:
+                return
+            if now - start_time > timeout_sec:
+                raise TimeoutError("Client didn't become idle.")
+            await asyncio.sleep(remaining)
+
+    @property
+    def mirrored_messages(self) -> List[Message]:
+        """Messages needed to reproduce the server's state, in order."""
+        assert self._mirror_enabled, "Mirroring is disabled."
+        if self._mirror is None:
+            return []
+        with self._mirror.buffer_lock:
+            return list(self._mirror.message_from_id.values())
+
+    def replay(self, handler: WebsockMessageHandler) -> None:
+        """Queue mirrored messages on another server or client connection. This
+        replicates the mirrored scene; messages are sent atomically."""
+        with handler.atomic():
+            for message in self.mirrored_messages:
+                handler.queue_message(message)
+
+    def _decode(self, payload: bytes) -> List[Message]:
+        # Snapshots sent to new clients are gzipped.
+        if payload[:2] == b"\x1f\x8b":
+            payload = gzip.decompress(payload)
+        decoded = msgspec.msgpack.decode(payload)
+
+        # Servers with `client_api_version=0` send individual messages.
+        mappings = [decoded] if isinstance(decoded, dict) else decoded
+        return [
+            _message_from_mapping(self._message_class, mapping) for mapping in mappings
+        ]
+
+    async def _receive_loop(self) -> None:
+        assert self._websocket is not None
+        try:
+            async for payload in self._websocket:
+                assert isinstance(payload, bytes)
+                self._last_receive_time = time.perf_counter()
+                self.windows_received += 1
+                self.bytes_received += len(payload)
+                for message in self._decode(payload):
+                    await self._handle_message(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def _handle_message(self, message: Message) -> None:
+        self.messages_received += 1
+        if self._mirror is not None:
+            self._mirror.push(message)
+        for callback in self._handlers.get(type(message), []):
+            out = callback(message)
+            if out is not None:
+                await out
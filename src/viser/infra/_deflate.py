@@ -0,0 +1,78 @@
+"""Per-message deflate for outgoing websocket messages, with a way to skip it.
+
+Deflate runs synchronously on the event loop thread when frames are written. For
+large binary payloads like point clouds, which compress poorly, it can block the
+event loop for hundreds of milliseconds. RFC 7692 lets senders choose whether to
+compress each message; uncompressed messages don't touch the compression context.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+from typing import Any, Generator, List, Sequence, Tuple
+
+from websockets.extensions.base import Extension
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+from websockets.frames import CTRL_OPCODES, OP_CONT, Frame
+
+_skip_compression: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "viser_skip_compression", default=False
+)
+
+
+@contextlib.contextmanager
+def uncompressed() -> Generator[None, None, None]:
+    """Send messages without compression while in this context. Frames are encoded
+    synchronously by `websocket.send()`, in the sending task's context, so this
+    doesn't affect sends from other tasks."""
+    token = _skip_compression.set(True)
+    try:
+        yield
+    finally:
+        _skip_compression.reset(token)
+
+
+class _SkippablePerMessageDeflate(Extension):
+    """Wraps a negotiated per-message deflate extension. Messages sent from an
+    :func:`uncompressed()` context are passed through."""
+
+    def __init__(self, extension: Extension) -> None:
+        self.name = extension.name
+        self._extension = extension
+        self._compress_message = True
+
+    def decode(self, frame: Frame, *args: Any, **kwargs: Any) -> Frame:
+        return self._extension.decode(frame, *args, **kwargs)
+
+    def encode(self, frame: Frame) -> Frame:
+        # Frames of a fragmented message are written back-to-back, so we only need
+        # to decide when a message starts.
+        if frame.opcode not in CTRL_OPCODES and frame.opcode is not OP_CONT:
+            self._compress_message = not _skip_compression.get()
+        if not self._compress_message and frame.opcode not in CTRL_OPCODES:
+            return frame
+        return self._extension.encode(frame)
+
+
+class SkippableDeflateFactory(ServerPerMessageDeflateFactory):
+    """Server-side per-message deflate, which can be skipped for individual
+    messages via :func:`uncompressed()`. Defaults match the `websockets` library's
+    `compression="deflate"` setting."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            server_max_window_bits=12,
+            client_max_window_bits=12,
+            compress_settings={"memLevel": 5},
+        )
+
+    def process_request_params(
+        self,
+        params: Sequence[Tuple[str, str | None]],
+        accepted_extensions: Sequence[Extension],
+    ) -> Tuple[List[Tuple[str, str | None]], Extension]:
+        response_params, extension = super().process_request_params(
+            params, accepted_extensions
+        )
+        return response_params, _SkippablePerMessageDeflate(extension)
@@ -0,0 +1,287 @@
+"""Scheduling for handlers of incoming messages."""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import inspect
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from typing_extensions import Literal
+
+from ._messages import Message
+
+IncomingHandler = Callable[[Any, Message], Any]
+
+
+@dataclasses.dataclass(frozen=True)
+class IncomingDispatchPolicy:
+    """Policy for scheduling handlers of incoming messages.
+
+    Synchronous handlers run in a thread pool shared by all clients. Handlers
+    defined with `async def` are awaited directly on the server's event loop, and
+    should avoid blocking calls.
+
+    Modes:
+
+    - `"pool"`: each incoming message is dispatched as soon as it's received. A
+      client's messages can be handled concurrently and out of order.
+    - `"serial"`: each client's messages are handled one at a time, in the order
+      they were received. Clients are still handled concurrently, so a slow handler
+      only delays messages from its own client. Handlers must not block waiting
+      for another message from the same client; for example, calling
+      `get_render()` from a GUI callback will deadlock.
+
+    Args:
+        mode: Dispatch mode; see above.
+        max_workers: Number of threads in the shared pool.
+        max_concurrent_calls_per_handler: If set, limits how many calls to each
+            registered handler can run at once, across all clients. Closures of the
+            same function count as one handler. Messages for a busy handler wait
+            without occupying a thread, so slow handlers can't starve the pool.
+        max_pending_messages_per_client: If set, limits how many messages from each
+            client can be waiting for or running handlers. When the limit is
+            reached, the server stops reading from that client's connection until
+            handlers catch up. Coalesced messages (see
+            :meth:`Message.coalesce_incoming()`) don't count towards the limit.
+    """
+
+    mode: Literal["pool", "serial"] = "pool"
+    max_workers: int = 32
+    max_concurrent_calls_per_handler: int | None = None
+    max_pending_messages_per_client: int | None = None
+
+
+class _CoalescingDispatcher:
+    """Dispatches a client's coalesced incoming messages.
+
+    At most one handler job is in flight for each redundancy key. Messages that
+    arrive while a job is running, or while the key is rate limited, replace each
+    other; when the key is free again, only the latest one is dispatched. Methods
+    should be called from the event loop thread."""
+
+    def __init__(
+        self,
+        event_loop: asyncio.AbstractEventLoop,
+        submit: Callable[[Message], asyncio.Future[None] | None],
+        min_interval_sec: float,
+    ) -> None:
+        self._event_loop = event_loop
+        self._submit = submit
+        self._min_interval_sec = min_interval_sec
+        self._latest_from_key: Dict[str, Message] = {}
+        self._busy_keys: set[str] = set()
+        self._last_dispatch_time_from_key: Dict[str, float] = {}
+
+    def push(self, message: Message) -> None:
+        key = message.redundancy_key()
+        self._latest_from_key[key] = message
+        if key not in self._busy_keys:
+            self._busy_keys.add(key)
+            self._schedule(key)
+
+    def _schedule(self, key: str) -> None:
+        delay = (
+            self._last_dispatch_time_from_key.get(key, float("-inf"))
+            + self._min_interval_sec
+            - time.perf_counter()
+        )
+        if delay > 0.0:
+            self._event_loop.call_later(delay, self._dispatch, key)
+        else:
+            self._dispatch(key)
+
+    def _dispatch(self, key: str) -> None:
+        message = self._latest_from_key.pop(key)
+        self._last_dispatch_time_from_key[key] = time.perf_counter()
+        future = self._submit(message)
+        assert future is not None
+        future.add_done_callback(lambda _: self._on_done(key))
+
+    def _on_done(self, key: str) -> None:
+        if key in self._latest_from_key:
+            self._schedule(key)
+        else:
+            self._busy_keys.discard(key)
+
+
+class IncomingDispatcher:
+    """Runs handlers for incoming messages from a single client. Methods should be
+    called from the event loop thread.
+
+    Args:
+        event_loop: The server's event loop.
+        client_id: ID of the client, which is passed to handlers.
+        get_handlers: Returns the handlers to call for a message, in order.
+        policy: Scheduling policy.
+        thread_executor: Pool for synchronous handlers.
+        handler_semaphores: Per-handler concurrency limits, shared across clients.
+            Populated lazily, and keyed by :func:`_handler_key()`.
+        coalesced_min_interval_sec: Minimum time between handling coalesced
+            messages with the same redundancy key.
+    """
+
+    def __init__(
+        self,
+        event_loop: asyncio.AbstractEventLoop,
+        client_id: Any,
+        get_handlers: Callable[[Message], List[IncomingHandler]],
+        policy: IncomingDispatchPolicy,
+        thread_executor: ThreadPoolExecutor,
+        handler_semaphores: Dict[Any, asyncio.Semaphore],
+        coalesced_min_interval_sec: float,
+    ) -> None:
+        self._client_id = client_id
+        self._get_handlers = get_handlers
+        self._policy = policy
+        self._thread_executor = thread_executor
+        self._handler_semaphores = handler_semaphores
+        self._event_loop = event_loop
+        self._closed = False
+        self._pending_semaphore = (
+            None
+            if policy.max_pending_messages_per_client is None
+            else asyncio.Semaphore(policy.max_pending_messages_per_client)
+        )
+        self._coalescer = _CoalescingDispatcher(
+            self._event_loop, self._submit, coalesced_min_interval_sec
+        )
+        self._serial_queue: asyncio.Queue[
+            tuple[Message, asyncio.Future[None]] | None
+        ] = asyncio.Queue()
+        self._serial_task = (
+            self._event_loop.create_task(self._serial_worker())
+            if policy.mode == "serial"
+            else None
+        )
+
+    async def dispatch(self, message: Message) -> None:
+        """Schedule handlers for a message. Waits if the client has too many pending
+        messages."""
+        if message.coalesce_incoming():
+            self._coalescer.push(message)
+            return
+
+        if self._pending_semaphore is None:
+            self._submit(message, track=False)
+            return
+
+        await self._pending_semaphore.acquire()
+        future = self._submit(message)
+        assert future is not None
+        future.add_done_callback(
+            lambda _: self._pending_semaphore.release()  # type: ignore
+        )
+
+    def close(self) -> None:
+        """Stop the serial worker after messages that have already been received are
+        handled. Messages that are submitted afterwards, like coalesced messages
+        that were waiting for their rate limit, are dropped."""
+        self._closed = True
+        if self._serial_task is not None:
+            self._serial_queue.put_nowait(None)
+            self._serial_task = None
+
+    def _submit(
+        self, message: Message, track: bool = True
+    ) -> asyncio.Future[None] | None:
+        """Schedule handlers for a message. If `track` is True, returns a future
+        that's done when they've finished."""
+        if self._closed:
+            if not track:
+                return None
+            future: asyncio.Future[None] = self._event_loop.create_future()
+            future.set_result(None)
+            return future
+
+        if self._policy.mode == "serial":
+            future = self._event_loop.create_future()
+            self._serial_queue.put_nowait((message, future))
+            return future
+
+        handlers = self._get_handlers(message)
+        if self._is_fast_path(handlers):
+            # Common case: a single thread pool job, without a task on the event loop.
+            job = self._thread_executor.submit(
+                self._call_sync_handlers, handlers, message
+            )
+            return asyncio.wrap_future(job, loop=self._event_loop) if track else None
+        return self._event_loop.create_task(self._run_handlers(handlers, message))
+
+    async def _serial_worker(self) -> None:
+        while True:
+            item = await self._serial_queue.get()
+            if item is None:
+                break
+            message, future = item
+            handlers = self._get_handlers(message)
+            if self._is_fast_path(handlers):
+                await self._event_loop.run_in_executor(
+                    self._thread_executor, self._call_sync_handlers, handlers, message
+                )
+            else:
+                await self._run_handlers(handlers, message)
+            future.set_result(None)
+
+        # Unblock anything that's waiting for dropped messages.
+        while not self._serial_queue.empty():
+            item = self._serial_queue.get_nowait()
+            if item is not None:
+                item[1].set_result(None)
+
+    def _is_fast_path(self, handlers: List[IncomingHandler]) -> bool:
+        """Whether handlers can all be called from one thread pool job."""
+        return self._policy.max_concurrent_calls_per_handler is None and not any(
+            inspect.iscoroutinefunction(handler) for handler in handlers
+        )
+
+    def _call_sync_handlers(
+        self, handlers: List[IncomingHandler], message: Message
+    ) -> None:
+        for handler in handlers:
+            try:
+                handler(self._client_id, message)
+            except Exception as e:
+                traceback.print_exception(type(e), e, e.__traceback__, limit=100)
+
+    async def _run_handlers(
+        self, handlers: List[IncomingHandler], message: Message
+    ) -> None:
+        for handler in handlers:
+            semaphore = self._semaphore_for(handler)
+            if semaphore is not None:
+                await semaphore.acquire()
+            try:
+                if inspect.iscoroutinefunction(handler):
+                    await handler(self._client_id, message)
+                else:
+                    await self._event_loop.run_in_executor(
+                        self._thread_executor, handler, self._client_id, message
+                    )
+            except Exception as e:
+                traceback.print_exception(type(e), e, e.__traceback__, limit=100)
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+
+    def _semaphore_for(self, handler: IncomingHandler) -> asyncio.Semaphore | None:
+        limit = self._policy.max_concurrent_calls_per_handler
+        if limit is None:
+            return None
+        key = _handler_key(handler)
+        semaphore = self._handler_semaphores.get(key, None)
+        if semaphore is None:
+            semaphore = self._handler_semaphores[key] = asyncio.Semaphore(limit)
+        return semaphore
+
+
+def _handler_key(handler: IncomingHandler) -> Any:
+    """Key for a handler's concurrency limit. Handlers are often closures that are
+    registered once per client, so we key by their code instead of the handler
+    object: calls from all clients share a limit, and semaphores don't keep
+    closures of disconnected clients alive."""
+    func = getattr(handler, "__func__", handler)
+    return getattr(func, "__code__", handler)
@@ -2,17 +2,18 @@ from __future__ import annotations
 
 import abc
 import asyncio
+import collections
 import contextlib
 import dataclasses
 import gzip
 import http
 import mimetypes
-import queue
 import threading
+import time
 from asyncio.events import AbstractEventLoop
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Callable, Generator, NewType, TypeVar
+from typing import Any, Awaitable, Callable, Generator, NewType, Sequence, TypeVar
 
 import msgspec
 import rich
@@ -20,11 +21,15 @@ import websockets.connection
 import websockets.datastructures
 import websockets.exceptions
 import websockets.server
-from typing_extensions import Literal, assert_never, override
+from typing_extensions import Literal, override
 from websockets.legacy.server import WebSocketServerProtocol
 
-from ._async_message_buffer import AsyncMessageBuffer
+from ._async_message_buffer import AdaptiveWindowPolicy, AsyncMessageBuffer
+from ._deflate import SkippableDeflateFactory, uncompressed
+from ._incoming_dispatch import IncomingDispatcher, IncomingDispatchPolicy
 from ._messages import Message
+from ._metrics import MetricsRecorder, ServerMetrics
+from ._serialization import Fragment, encode_snapshot_segment, encode_window
 
 
 @dataclasses.dataclass
@@ -33,6 +38,50 @@ class _ClientHandleState:
     # message_buffer: asyncio.Queue
     message_buffer: AsyncMessageBuffer
     event_loop: AbstractEventLoop
+    bytes_in_flight: int = 0
+    """Serialized bytes that have been handed to the websocket, but not yet written
+    to the socket. Shared by all producers for a client."""
+
+
+@dataclasses.dataclass(frozen=True)
+class SlowClientPolicy:
+    """Policy for clients that can't keep up with outgoing messages, for example
+    because they're connected over a slow tunnel.
+
+    A client is considered slow when the bytes that have been serialized for it but
+    not yet written to its socket exceed `max_bytes_in_flight`, or when it falls more
+    than `max_message_lag` message IDs behind the broadcast buffer.
+
+    Actions for slow clients:
+
+    - `"wait"`: do nothing. The client's producers wait for its socket.
+    - `"coalesce"`: send the client everything that's pending as a single window,
+      once its previous window has been written. Until then, messages wait in the
+      message buffers, where superseded messages are culled by redundancy key; the
+      client skips intermediate states and jumps straight to the latest one. The
+      client also stops sharing serialized windows, and doesn't keep cached windows
+      alive for others.
+    - `"degrade"`: same as `"coalesce"`, but messages are also sent at reduced
+      quality via :meth:`Message.degrade()`.
+    - `"disconnect"`: close the connection. Clients that reconnect start again from
+      a fresh copy of the persistent state.
+    """
+
+    action: Literal["wait", "coalesce", "degrade", "disconnect"] = "coalesce"
+    max_bytes_in_flight: int = 16 * 1024 * 1024
+    max_message_lag: int = 4096
+
+
+@dataclasses.dataclass(frozen=True)
+class _ProducerConfig:
+    """Options for how message producers serialize and send outgoing messages."""
+
+    client_api_version: Literal[0, 1]
+    zero_copy_min_bytes: int | None
+    serialization_executor: Executor | None
+    slow_client_policy: SlowClientPolicy
+    metrics: MetricsRecorder
+    compression_max_bytes: int | None
 
 
 ClientId = NewType("ClientId", int)
@@ -95,7 +144,7 @@ class WebsockMessageHandler:
             type[Message], list[Callable[[ClientId, Message], None]]
         ] = {}
         self._atomic_lock = threading.Lock()
-        self._queued_messages: queue.Queue = queue.Queue()
+        self._queued_messages: collections.deque[Message] = collections.deque()
         self._locked_thread_id = -1
 
         # Set to None if not recording.
@@ -113,7 +162,9 @@ class WebsockMessageHandler:
         message_cls: type[TMessage],
         callback: Callable[[ClientId, TMessage], Any],
     ) -> None:
-        """Register a handler for a particular message type."""
+        """Register a handler for a particular message type. Handlers defined with
+        `async def` are awaited on the server's event loop; others run in a thread
+        pool. See :class:`IncomingDispatchPolicy`."""
         if message_cls not in self._incoming_handlers:
             self._incoming_handlers[message_cls] = []
         self._incoming_handlers[message_cls].append(callback)  # type: ignore
@@ -132,11 +183,12 @@ class WebsockMessageHandler:
         else:
             self._incoming_handlers[message_cls].remove(callback)  # type: ignore
 
-    def _handle_incoming_message(self, client_id: ClientId, message: Message) -> None:
-        """Handle incoming messages."""
-        if type(message) in self._incoming_handlers:
-            for cb in self._incoming_handlers[type(message)]:
-                cb(client_id, message)
+    def _get_incoming_handlers(
+        self, message: Message
+    ) -> list[Callable[[ClientId, Message], Any]]:
+        """Get a copy of the handlers registered for a message's type. Handlers can
+        unregister themselves while they run."""
+        return list(self._incoming_handlers.get(type(message), []))
 
     @abc.abstractmethod
     def unsafe_send_message(self, message: Message) -> None: ...
@@ -146,20 +198,38 @@ class WebsockMessageHandler:
         if self._record_handle is not None:
             self._record_handle._insert_message(message)
 
-        got_lock = self._atomic_lock.acquire(blocking=False)
-        if got_lock:
+        # Messages sent from inside of our own atomic() block can be sent directly.
+        if self._locked_thread_id == threading.get_ident():
             self.unsafe_send_message(message)
-            self._atomic_lock.release()
-        else:
-            # Send when lock is acquirable, while retaining message order.
-            # This could be optimized!
-            self._queued_messages.put(message)
+            return
 
-            def try_again() -> None:
-                with self._atomic_lock:
-                    self.unsafe_send_message(self._queued_messages.get())
+        # Otherwise, we put messages in a FIFO queue. The queue is drained by
+        # whichever thread can acquire the atomic lock; if it's held, the holder will
+        # drain the queue when it's done. This retains message order without
+        # blocking the caller.
+        self._queued_messages.append(message)
+        self._drain_queued_messages()
+
+    def _drain_queued_messages(self) -> None:
+        """Send queued messages, if the atomic lock is available."""
+        # Re-check the queue after releasing the lock: messages might have been
+        # appended by threads that failed to acquire the lock while we held it.
+        while len(self._queued_messages) > 0 and self._atomic_lock.acquire(
+            blocking=False
+        ):
+            try:
+                self._send_queued_messages()
+            finally:
+                self._atomic_lock.release()
 
-            self._thread_executor.submit(try_again)
+    def _send_queued_messages(self) -> None:
+        """Send all queued messages. Should be called with the atomic lock held."""
+        while True:
+            try:
+                message = self._queued_messages.popleft()
+            except IndexError:
+                break
+            self.unsafe_send_message(message)
 
     @contextlib.contextmanager
     def atomic(self) -> Generator[None, None, None]:
@@ -182,11 +252,19 @@ class WebsockMessageHandler:
             self._locked_thread_id = thread_id
             got_lock = True
 
-        yield
+            # Messages that were queued before we got the lock should be sent before
+            # any messages from this block.
+            self._send_queued_messages()
+
+        try:
+            yield
+        finally:
+            if got_lock:
+                self._locked_thread_id = -1
+                self._atomic_lock.release()
 
-        if got_lock:
-            self._atomic_lock.release()
-            self._locked_thread_id = -1
+                # Send messages that other threads queued while we held the lock.
+                self._drain_queued_messages()
 
 
 class WebsockClientConnection(WebsockMessageHandler):
@@ -228,6 +306,50 @@ class WebsockServer(WebsockMessageHandler):
         verbose: Toggle for print messages.
         client_api_version: Flag for backwards compatibility. 0 sends individual
             messages. 1 sends windowed messages.
+        zero_copy_min_bytes: If set, binary message fields (arrays, bytes) of at
+            least this many bytes are sent as separate websocket frame fragments that
+            reference the original memory, instead of being copied into one
+            serialized buffer. Clients receive the reassembled message, which is
+            byte-identical to the default encoding.
+        serialization_executor: Optional executor for encoding outgoing message
+            windows. When set, serialization runs off of the event loop thread, which
+            then only handles I/O. Windows from the same buffer are still sent in
+            order. Zero-copy fragments are disabled for process pools, because
+            buffers need to be copied between processes anyway.
+        compressed_snapshots: If True, newly connected clients receive the contents
+            of the persistent broadcast buffer as a few gzipped frames, instead of
+            replaying it window-by-window. Compressed segments are cached and reused
+            across connections; they are only rebuilt when messages in them become
+            redundant. Requires `client_api_version=1`, and a client that can
+            decompress gzipped frames.
+        slow_client_policy: How to handle clients that can't keep up with outgoing
+            messages. By default, producers for slow clients simply wait.
+        window_policy: If set, outgoing messages are batched into windows sized by
+            approximate bytes and each client's observed send latency, instead of a
+            fixed message count and duration. Bulky messages are sent in windows of
+            their own.
+        metrics_path: If set, server metrics are served in the Prometheus text
+            format at this HTTP path, for example `"/metrics"`. Metrics are always
+            available from Python via :meth:`get_metrics()`.
+        max_coalesced_rate_hz: Maximum rate at which handlers are called for
+            incoming messages that can be coalesced (see
+            :meth:`Message.coalesce_incoming()`), per client and redundancy key.
+            Stale messages that arrive in between are dropped; the latest one is
+            always handled. If None, handlers are called as soon as the previous
+            call for the same key has returned.
+        incoming_dispatch_policy: How handlers for incoming messages are scheduled:
+            thread pool size, per-client ordering, and concurrency and queue limits.
+            By default, messages are handled in a 32-thread pool without ordering
+            guarantees.
+        bulk_message_rank: If set, called with a client ID and a queued bulk
+            message to rank it for that client. Bulk messages that are queued
+            back-to-back are sent to each client in order of decreasing rank, so
+            the most important ones arrive first. Called from the event loop
+            thread, so it should be fast. Doesn't apply to compressed snapshots.
+        compression_max_bytes: If set, outgoing websocket messages larger than this
+            are sent without per-message deflate compression. Deflate runs on the
+            event loop thread when messages are written, and is slow for large
+            binary payloads like point clouds, which also compress poorly.
     """
 
     def __init__(
@@ -238,8 +360,27 @@ class WebsockServer(WebsockMessageHandler):
         http_server_root: Path | None = None,
         verbose: bool = True,
         client_api_version: Literal[0, 1] = 0,
+        zero_copy_min_bytes: int | None = None,
+        serialization_executor: Executor | None = None,
+        compressed_snapshots: bool = False,
+        slow_client_policy: SlowClientPolicy | None = None,
+        window_policy: AdaptiveWindowPolicy | None = None,
+        metrics_path: str | None = None,
+        max_coalesced_rate_hz: float | None = None,
+        incoming_dispatch_policy: IncomingDispatchPolicy | None = None,
+        bulk_message_rank: Callable[[ClientId, Message], float] | None = None,
+        compression_max_bytes: int | None = None,
     ):
-        super().__init__(thread_executor=ThreadPoolExecutor(max_workers=32))
+        if incoming_dispatch_policy is None:
+            incoming_dispatch_policy = IncomingDispatchPolicy()
+        super().__init__(
+            thread_executor=ThreadPoolExecutor(
+                max_workers=incoming_dispatch_policy.max_workers,
+                thread_name_prefix="viser-handler",
+            )
+        )
+        self._incoming_dispatch_policy = incoming_dispatch_policy
+        self._handler_semaphores: dict[Any, asyncio.Semaphore] = {}
 
         # Track connected clients.
         self._client_connect_cb: list[Callable[[WebsockClientConnection], None]] = []
@@ -251,6 +392,33 @@ class WebsockServer(WebsockMessageHandler):
         self._http_server_root = http_server_root
         self._verbose = verbose
         self._client_api_version: Literal[0, 1] = client_api_version
+        self._serialization_executor = serialization_executor
+        assert not compressed_snapshots or client_api_version == 1
+        self._compressed_snapshots = compressed_snapshots
+        self._window_policy = window_policy
+        self._bulk_message_rank = bulk_message_rank
+        self._metrics = MetricsRecorder()
+        self._metrics_path = metrics_path
+        self._coalesced_min_interval_sec = (
+            0.0 if max_coalesced_rate_hz is None else 1.0 / max_coalesced_rate_hz
+        )
+        self._producer_config = _ProducerConfig(
+            client_api_version=client_api_version,
+            zero_copy_min_bytes=(
+                # Memoryviews can't be sent between processes.
+                None
+                if isinstance(serialization_executor, ProcessPoolExecutor)
+                else zero_copy_min_bytes
+            ),
+            serialization_executor=serialization_executor,
+            slow_client_policy=(
+                SlowClientPolicy(action="wait")
+                if slow_client_policy is None
+                else slow_client_policy
+            ),
+            metrics=self._metrics,
+            compression_max_bytes=compression_max_bytes,
+        )
         self._shutdown_event = threading.Event()
         self._ws_server: websockets.WebSocketServer | None = None
 
@@ -279,6 +447,8 @@ class WebsockServer(WebsockMessageHandler):
         self._ws_server.close()
         self._ws_server = None
         self._thread_executor.shutdown(wait=True)
+        if self._serialization_executor is not None:
+            self._serialization_executor.shutdown(wait=True)
 
     def on_client_connect(self, cb: Callable[[WebsockClientConnection], Any]) -> None:
         """Attach a callback to run for newly connected clients."""
@@ -310,6 +480,30 @@ class WebsockServer(WebsockMessageHandler):
         messages will immediately be sent. (by default they are windowed)"""
         self._client_state_from_id[client_id].message_buffer.flush()
 
+    def get_metrics(self) -> ServerMetrics:
+        """Get a snapshot of server metrics: serialized bytes and message counts per
+        message type, serialization time, queue depths, window sizes, per-client
+        send latencies, persistent buffer size, and event loop lag."""
+        broadcast_buffer = self._broadcast_buffer
+        persistent_messages, persistent_bytes = broadcast_buffer.buffered_size()
+        client_gauges: dict[int, tuple[int, int, int | None]] = {}
+        for client_id, client_state in list(self._client_state_from_id.items()):
+            window_state = broadcast_buffer.window_state_from_client.get(
+                client_id, None
+            )
+            client_gauges[client_id] = (
+                broadcast_buffer.pending_message_count(client_id)
+                + client_state.message_buffer.pending_message_count(client_id),
+                client_state.bytes_in_flight,
+                None if window_state is None else window_state.byte_budget,
+            )
+        return self._metrics.snapshot(
+            client_gauges=client_gauges,
+            queued_messages=len(self._queued_messages),
+            persistent_messages=persistent_messages,
+            persistent_bytes=persistent_bytes,
+        )
+
     def _background_worker(self, ready_sem: threading.Semaphore) -> None:
         host = self._host
         port = self._port
@@ -320,7 +514,7 @@ class WebsockServer(WebsockMessageHandler):
         event_loop = asyncio.new_event_loop()
         asyncio.set_event_loop(event_loop)
         self._broadcast_buffer = AsyncMessageBuffer(
-            event_loop, persistent_messages=True
+            event_loop, persistent_messages=True, window_policy=self._window_policy
         )
 
         count_lock = asyncio.Lock()
@@ -347,7 +541,11 @@ class WebsockServer(WebsockMessageHandler):
                 )
 
             client_state = _ClientHandleState(
-                AsyncMessageBuffer(event_loop, persistent_messages=False),
+                AsyncMessageBuffer(
+                    event_loop,
+                    persistent_messages=False,
+                    window_policy=self._window_policy,
+                ),
                 event_loop,
             )
             client_connection = WebsockClientConnection(
@@ -355,46 +553,65 @@ class WebsockServer(WebsockMessageHandler):
             )
             self._client_state_from_id[client_id] = client_state
 
-            def handle_incoming(message: Message) -> None:
-                self._thread_executor.submit(
-                    error_print_wrapper(
-                        lambda: self._handle_incoming_message(client_id, message)
-                    )
-                )
-                self._thread_executor.submit(
-                    error_print_wrapper(
-                        lambda: client_connection._handle_incoming_message(
-                            client_id, message
-                        )
-                    )
-                )
+            # Server-wide handlers run before handlers for this client.
+            incoming_dispatcher = IncomingDispatcher(
+                event_loop,
+                client_id,
+                lambda message: self._get_incoming_handlers(message)
+                + client_connection._get_incoming_handlers(message),
+                self._incoming_dispatch_policy,
+                self._thread_executor,
+                self._handler_semaphores,
+                self._coalesced_min_interval_sec,
+            )
 
             # New connection callbacks.
             for cb in self._client_connect_cb:
                 cb(client_connection)
 
+            bulk_message_rank = self._bulk_message_rank
+            rank_bulk_message = (
+                None
+                if bulk_message_rank is None
+                else lambda message: bulk_message_rank(client_id, message)
+            )
+
             try:
                 # For each client: infinite loop over producers (which send messages)
                 # and consumers (which receive messages).
-                await asyncio.gather(
+                broadcast_producer = asyncio.ensure_future(
                     _message_producer(
                         websocket,
-                        client_state.message_buffer,
+                        self._broadcast_buffer,
                         client_id,
-                        self._client_api_version,
-                    ),
+                        client_state,
+                        self._producer_config,
+                        send_snapshot=self._compressed_snapshots,
+                        rank_bulk_message=rank_bulk_message,
+                    )
+                )
+                await asyncio.gather(
                     _message_producer(
                         websocket,
-                        self._broadcast_buffer,
+                        client_state.message_buffer,
                         client_id,
-                        self._client_api_version,
+                        client_state,
+                        self._producer_config,
+                        rank_bulk_message=rank_bulk_message,
+                    ),
+                    broadcast_producer,
+                    _message_consumer(
+                        websocket, incoming_dispatcher.dispatch, message_class
                     ),
-                    _message_consumer(websocket, handle_incoming, message_class),
                 )
             except (
                 websockets.exceptions.ConnectionClosedOK,
                 websockets.exceptions.ConnectionClosedError,
             ):
+                # Stop consuming from the shared broadcast buffer. This unregisters
+                # the client, so cached windows aren't kept around for it.
+                broadcast_producer.cancel()
+
                 # We use a sentinel value to signal that the client producer thread
                 # should exit.
                 #
@@ -402,6 +619,7 @@ class WebsockServer(WebsockMessageHandler):
                 # queue get() tasks, which suppresses a "Task was destroyed but it is
                 # pending" error.
                 client_state.message_buffer.set_done()
+                incoming_dispatcher.close()
 
                 # Disconnection callbacks.
                 for cb in self._client_disconnect_cb:
@@ -409,6 +627,7 @@ class WebsockServer(WebsockMessageHandler):
 
                 # Cleanup.
                 self._client_state_from_id.pop(client_id)
+                self._metrics.remove_client(client_id)
                 total_connections -= 1
                 if self._verbose:
                     rich.print(
@@ -429,12 +648,23 @@ class WebsockServer(WebsockMessageHandler):
             if request_headers.get("Upgrade") == "websocket":
                 return None
 
+            if (
+                self._metrics_path is not None
+                and path.partition("?")[0] == self._metrics_path
+            ):
+                return (
+                    http.HTTPStatus.OK,
+                    {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+                    self.get_metrics().to_prometheus().encode("utf-8"),
+                )
+
             # Strip out search params, get relative path.
             path = path.partition("?")[0]
             relpath = str(Path(path).relative_to("/"))
             if relpath == ".":
                 relpath = "index.html"
-            assert http_server_root is not None
+            if http_server_root is None:
+                return (http.HTTPStatus.NOT_FOUND, {}, b"404")  # type: ignore
 
             source_path = http_server_root / relpath
             if not source_path.exists():
@@ -472,8 +702,16 @@ class WebsockServer(WebsockMessageHandler):
                     port,
                     # Compression can be turned off to reduce client-side CPU usage.
                     # compression=None,
+                    extensions=(
+                        [SkippableDeflateFactory()]
+                        if self._producer_config.compression_max_bytes is not None
+                        else None
+                    ),
                     process_request=(
-                        viser_http_server if http_server_root is not None else None
+                        viser_http_server
+                        if http_server_root is not None
+                        or self._metrics_path is not None
+                        else None
                     ),
                 )
                 self._ws_server = serve_future.ws_server
@@ -489,6 +727,7 @@ class WebsockServer(WebsockMessageHandler):
         self._port = port
 
         ready_sem.release()
+        event_loop.create_task(self._metrics.monitor_event_loop_lag())
         event_loop.run_forever()
 
         # This will run only when the event loop ends, which happens when the
@@ -500,38 +739,219 @@ async def _message_producer(
     websocket: WebSocketServerProtocol,
     buffer: AsyncMessageBuffer,
     client_id: int,
-    client_api_version: Literal[0, 1],
+    client_state: _ClientHandleState,
+    config: _ProducerConfig,
+    send_snapshot: bool = False,
+    rank_bulk_message: Callable[[Message], float] | None = None,
 ) -> None:
-    """Infinite loop to broadcast windows of messages from a buffer."""
-    window_generator = buffer.window_generator(client_id)
-    while not buffer.done:
-        outgoing = await window_generator.__anext__()
-        if client_api_version == 1:
-            serialized = msgspec.msgpack.encode(
-                tuple(message.as_serializable_dict() for message in outgoing)
+    """Infinite loop to broadcast windows of messages from a buffer. If
+    `send_snapshot` is set, we start by sending a compressed snapshot of the buffer's
+    current contents. `rank_bulk_message` is passed to
+    :meth:`AsyncMessageBuffer.window_generator()`."""
+    event_loop = asyncio.get_running_loop()
+    executor = config.serialization_executor
+    policy = config.slow_client_policy
+
+    async def encode(outgoing: Sequence[Message]) -> list[list[Fragment]]:
+        if executor is None:
+            encoded, message_nbytes, duration_sec = _encode_window_timed(
+                outgoing, config.client_api_version, config.zero_copy_min_bytes
             )
-            assert isinstance(serialized, bytes)
-            await websocket.send(serialized)
-        elif client_api_version == 0:
-            for msg in outgoing:
-                serialized = msgspec.msgpack.encode(msg.as_serializable_dict())
-                assert isinstance(serialized, bytes)
-                await websocket.send(serialized)
         else:
-            assert_never(client_api_version)
+            encoded, message_nbytes, duration_sec = await event_loop.run_in_executor(
+                executor,
+                _encode_window_timed,
+                outgoing,
+                config.client_api_version,
+                config.zero_copy_min_bytes,
+            )
+        config.metrics.record_encode(outgoing, message_nbytes, duration_sec)
+        return encoded
+
+    async def degrade(outgoing: Sequence[Message]) -> list[Message]:
+        # Degrading can be expensive, for example when images are re-encoded, so
+        # it's kept off of the event loop. Results for buffered messages are shared
+        # between slow clients.
+        futures: list[asyncio.Future[Message]] = []
+        for message in outgoing:
+            if type(message).degrade is Message.degrade:
+                future = event_loop.create_future()
+                future.set_result(message)
+                futures.append(future)
+                continue
+            with buffer.buffer_lock:
+                entry = buffer.degraded_message_cache.get(id(message), None)
+                if entry is not None and entry[0] is message:
+                    future = entry[1]
+                else:
+                    future = event_loop.run_in_executor(executor, message.degrade)
+                    if buffer.persistent_messages:
+                        buffer.degraded_message_cache[id(message)] = (message, future)
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def send(payload: Fragment | list[Fragment]) -> None:
+        # Track bytes that are waiting on the socket.
+        num_bytes = (
+            len(payload)
+            if isinstance(payload, (bytes, bytearray))
+            else sum(memoryview(fragment).nbytes for fragment in payload)
+        )
+        client_state.bytes_in_flight += num_bytes
+        try:
+            if (
+                config.compression_max_bytes is not None
+                and num_bytes > config.compression_max_bytes
+            ):
+                with uncompressed():
+                    await websocket.send(payload)
+            else:
+                await websocket.send(payload)
+        finally:
+            client_state.bytes_in_flight -= num_bytes
+
+    def get_bytes_in_flight() -> int:
+        transport = websocket.transport
+        return client_state.bytes_in_flight + (
+            0 if transport is None else transport.get_write_buffer_size()
+        )
+
+    last_sent_id = -1
+
+    def is_slow() -> bool:
+        return policy.action != "wait" and (
+            get_bytes_in_flight() > policy.max_bytes_in_flight
+            or buffer.message_counter - 1 - last_sent_id > policy.max_message_lag
+        )
+
+    async def monitor_slow_client() -> None:
+        """Check for slow clients while producers are blocked on sends."""
+        while True:
+            await asyncio.sleep(0.1)
+            if not is_slow():
+                continue
+            if policy.action == "disconnect":
+                await websocket.close(
+                    code=1013, reason="Client can't keep up with outgoing messages."
+                )
+                return
+            buffer.coalesced_client_ids.add(client_id)
+            if client_id not in buffer.detached_client_ids:
+                buffer.detached_client_ids.add(client_id)
+                buffer._update_progress(client_id, None)
+
+    if send_snapshot:
+
+        async def encode_snapshot(outgoing: Sequence[Message]) -> bytes:
+            start_time = time.perf_counter()
+            if executor is None:
+                segment = encode_snapshot_segment(outgoing)
+            else:
+                segment = await event_loop.run_in_executor(
+                    executor, encode_snapshot_segment, outgoing
+                )
+            config.metrics.record_serialization_time(time.perf_counter() - start_time)
+            return segment
+
+        last_sent_id, segments = await buffer.get_snapshot(encode_snapshot, client_id)
+        try:
+            for segment in segments:
+                send_start = time.perf_counter()
+                await send(segment)
+                config.metrics.record_send(
+                    client_id, len(segment), time.perf_counter() - send_start
+                )
+        except BaseException:
+            buffer.remove_consumer(client_id)
+            raise
+
+    monitor_task = (
+        asyncio.ensure_future(monitor_slow_client())
+        if policy.action != "wait"
+        else None
+    )
+    window_generator = buffer.window_generator(
+        client_id, last_sent_id, rank_bulk_message
+    )
+    try:
+        while not buffer.done:
+            window = await window_generator.__anext__()
+
+            # Clients that have caught up get regular windows, and can share
+            # serialized windows again.
+            slow = is_slow()
+            if slow:
+                buffer.coalesced_client_ids.add(client_id)
+            else:
+                buffer.coalesced_client_ids.discard(client_id)
+                buffer.detached_client_ids.discard(client_id)
+                if len(buffer.coalesced_client_ids) == 0:
+                    buffer.degraded_message_cache.clear()
+
+            messages = window.messages
+            if slow and policy.action == "degrade":
+                messages = await degrade(messages)
+                encoded = await encode(messages)
+            elif window.cache_key is None:
+                encoded = await encode(messages)
+            else:
+                # Windows covering the same message IDs are shared between clients,
+                # so we only need to serialize them once. We cache tasks instead of
+                # results to avoid redundant work for concurrent consumers.
+                encode_task = buffer.encoded_window_cache.get(window.cache_key, None)
+                if encode_task is None:
+                    encode_task = asyncio.ensure_future(encode(messages))
+                    buffer.encoded_window_cache[window.cache_key] = encode_task
+                encoded = await encode_task
+
+            # We wait for each window to be sent before fetching the next one, which
+            # preserves message order within this buffer.
+            send_start = time.perf_counter()
+            num_bytes = 0
+            for fragments in encoded:
+                # Multiple fragments are sent as a single fragmented websocket message.
+                num_bytes += sum(memoryview(fragment).nbytes for fragment in fragments)
+                await send(fragments[0] if len(fragments) == 1 else fragments)
+            send_duration = time.perf_counter() - send_start
+            buffer.record_send(client_id, num_bytes, send_duration)
+            config.metrics.record_send(client_id, num_bytes, send_duration)
+            last_sent_id = window.last_id
+    finally:
+        if monitor_task is not None:
+            monitor_task.cancel()
+        buffer.coalesced_client_ids.discard(client_id)
+        buffer.detached_client_ids.discard(client_id)
+        await window_generator.aclose()
+
+
+def _encode_window_timed(
+    messages: Sequence[Message],
+    client_api_version: Literal[0, 1],
+    zero_copy_min_bytes: int | None,
+) -> tuple[list[list[Fragment]], list[int], float]:
+    """Serialize a window of messages. Also returns the encoded size of each message,
+    and the time spent serializing. Runs in serialization executors, so it should be
+    picklable."""
+    start_time = time.perf_counter()
+    message_nbytes: list[int] = []
+    encoded = encode_window(
+        messages, client_api_version, zero_copy_min_bytes, message_nbytes
+    )
+    return encoded, message_nbytes, time.perf_counter() - start_time
 
 
 async def _message_consumer(
     websocket: WebSocketServerProtocol,
-    handle_message: Callable[[Message], None],
+    dispatch_message: Callable[[Message], Awaitable[None]],
     message_class: type[Message],
 ) -> None:
-    """Infinite loop waiting for and then handling incoming messages."""
+    """Infinite loop waiting for and then dispatching incoming messages. Dispatching
+    can wait, which applies backpressure to the client."""
     while True:
         raw = await websocket.recv()
         assert isinstance(raw, bytes)
         message = message_class.deserialize(raw)
-        handle_message(message)
+        await dispatch_message(message)
 
 
 def error_print_wrapper(inner: Callable[[], Any]) -> Callable[[], None]:
@@ -4,13 +4,27 @@
 from __future__ import annotations
 
 import abc
+import dataclasses
 import functools
 import warnings
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type, TypeVar, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 import msgspec
 import numpy as onp
-from typing_extensions import get_args, get_origin, get_type_hints
+from typing_extensions import Literal, get_args, get_origin, get_type_hints
 
 if TYPE_CHECKING:
     from ._infra import ClientId
@@ -102,6 +116,154 @@ def get_type_hints_cached(cls: Type[Any]) -> Dict[str, Any]:
     return get_type_hints(cls)  # type: ignore
 
 
+_PASSTHROUGH_TYPES = (str, bool, bytes, type(None))
+
+
+def _is_passthrough(annotation: Any) -> bool:
+    """Returns True if values with a given annotation never need to be converted
+    before serialization."""
+    if annotation in _PASSTHROUGH_TYPES:
+        return True
+    origin = get_origin(annotation)
+    if origin is Literal:
+        return all(isinstance(arg, _PASSTHROUGH_TYPES) for arg in get_args(annotation))
+    if origin is Union or origin is tuple:
+        return all(arg is ... or _is_passthrough(arg) for arg in get_args(annotation))
+    return False
+
+
+def _make_field_serializer(annotation: Any) -> Callable[[Any], Any] | None:
+    """Specialize `_prepare_for_serialization()` for a field annotation. Returns None
+    if field values can be serialized as-is."""
+    if _is_passthrough(annotation):
+        return None
+    if annotation is float:
+        return float
+    if annotation is int:
+        return int
+
+    def fallback(value: Any) -> Any:
+        return _prepare_for_serialization(value, annotation)
+
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is onp.ndarray or (
+        # Optional arrays.
+        origin is Union
+        and len(args) == 2
+        and args[1] is type(None)
+        and get_origin(args[0]) is onp.ndarray
+    ):
+
+        def serialize_array(value: Any) -> Any:
+            if type(value) is not onp.ndarray:
+                return fallback(value)  # None, or an unexpected type.
+            return value.data if value.data.c_contiguous else value.copy().data
+
+        return serialize_array
+
+    if origin is tuple and len(args) > 0 and all(arg in (float, ...) for arg in args):
+        # Fixed or variable-length tuples of floats: positions, orientations, etc.
+        length = None if args[-1] is ... else len(args)
+
+        def serialize_float_tuple(value: Any) -> Any:
+            if type(value) is not tuple or (
+                length is not None and len(value) != length
+            ):
+                return fallback(value)
+            return tuple([float(x) for x in value])
+
+        return serialize_float_tuple
+
+    return fallback
+
+
+def _compile_serializer(cls: Type[Message]) -> Callable[[Message], Dict[str, Any]]:
+    """Generate a function that converts messages of a given dataclass type into
+    serializable dictionaries. Equivalent to the reflective
+    `Message._as_serializable_dict_reflective()`, but without per-call type hint
+    lookups or annotation dispatch."""
+    hints = get_type_hints_cached(cls)
+    namespace: Dict[str, Any] = {}
+    items = []
+    for i, field in enumerate(dataclasses.fields(cls)):
+        serializer = _make_field_serializer(hints[field.name])
+        if serializer is None:
+            items.append(f"{field.name!r}: message.{field.name}")
+        else:
+            namespace[f"_serialize_{i}"] = serializer
+            items.append(f"{field.name!r}: _serialize_{i}(message.{field.name})")
+    items.append(f"'type': {cls.__name__!r}")
+    source = "def serialize(message):\n    return {" + ", ".join(items) + "}\n"
+    exec(source, namespace)
+    return namespace["serialize"]
+
+
+def _lists_to_tuple(obj: Any) -> Any:
+    """msgpack deserializes to lists by default, but all of our annotations use
+    tuples."""
+    if isinstance(obj, list):
+        return tuple(_lists_to_tuple(x) for x in obj)
+    elif isinstance(obj, dict):
+        return {k: _lists_to_tuple(v) for k, v in obj.items()}
+    else:
+        return obj
+
+
+def _decode_annotation(annotation: Any) -> Any:
+    """Annotation to use when decoding a field. Binary payloads are decoded as
+    memoryviews, which reference the received buffer instead of copying it."""
+    if annotation is bytes:
+        return memoryview
+    if get_origin(annotation) is Union:
+        return Union[tuple(_decode_annotation(arg) for arg in get_args(annotation))]  # type: ignore
+    return annotation
+
+
+def _contains_any(annotation: Any) -> bool:
+    """Returns True if an annotation contains `Any`. Arrays in `Any` values are
+    decoded as lists, and need to be converted to tuples."""
+    return annotation is Any or any(_contains_any(arg) for arg in get_args(annotation))
+
+
+def _make_decode_struct(
+    cls: Type[Message],
+) -> Tuple[type, Callable[[Any], Message]]:
+    """Generate a msgspec struct that mirrors a message dataclass, tagged with the
+    message type name. Returns the struct type and a function for converting
+    decoded structs to messages."""
+    hints = get_type_hints_cached(cls)
+    struct_fields = []
+    for field in dataclasses.fields(cls):
+        annotation = _decode_annotation(hints[field.name])
+        if field.default is not dataclasses.MISSING:
+            struct_fields.append((field.name, annotation, field.default))
+        elif field.default_factory is not dataclasses.MISSING:
+            struct_fields.append(
+                (
+                    field.name,
+                    annotation,
+                    msgspec.field(default_factory=field.default_factory),
+                )
+            )
+        else:
+            struct_fields.append((field.name, annotation))
+    struct = msgspec.defstruct(
+        "_Decoded" + cls.__name__, struct_fields, tag_field="type", tag=cls.__name__
+    )
+
+    field_names = tuple(field.name for field in dataclasses.fields(cls))
+    any_field_names = tuple(name for name in field_names if _contains_any(hints[name]))
+
+    def to_message(decoded: Any) -> Message:
+        kwargs = {name: getattr(decoded, name) for name in field_names}
+        for name in any_field_names:
+            kwargs[name] = _lists_to_tuple(kwargs[name])
+        return cls(**kwargs)
+
+    return struct, to_message
+
+
 class Message(abc.ABC):
     """Base message type for server/client communication."""
 
@@ -110,7 +272,21 @@ class Message(abc.ABC):
     send synchronization information to other clients."""
 
     def as_serializable_dict(self) -> Dict[str, Any]:
-        """Convert a Python Message object into bytes."""
+        """Convert a Python Message object into a dictionary that can be serialized
+        with msgpack."""
+        return type(self)._serializer()(self)
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _serializer(cls) -> Callable[[Message], Dict[str, Any]]:
+        """Serialization function for this message type, built on first use."""
+        if dataclasses.is_dataclass(cls):
+            return _compile_serializer(cls)
+        return cls._as_serializable_dict_reflective
+
+    def _as_serializable_dict_reflective(self) -> Dict[str, Any]:
+        """Convert a Python Message object into a serializable dictionary, using
+        type hints that are looked up at runtime."""
         message_type = type(self)
         hints = get_type_hints_cached(message_type)
         out = {
@@ -132,20 +308,44 @@ class Message(abc.ABC):
 
     @classmethod
     def deserialize(cls, message: bytes) -> Message:
-        """Convert bytes into a Python Message object."""
-        mapping = msgspec.msgpack.decode(message)
-
-        # msgpack deserializes to lists by default, but all of our annotations use
-        # tuples.
-        def lists_to_tuple(obj: Any) -> Any:
-            if isinstance(obj, list):
-                return tuple(lists_to_tuple(x) for x in obj)
-            elif isinstance(obj, dict):
-                return {k: lists_to_tuple(v) for k, v in obj.items()}
-            else:
-                return obj
-
-        mapping = lists_to_tuple(mapping)
+        """Convert bytes into a Python Message object.
+
+        Messages are decoded directly into typed structures using a schema generated
+        from message annotations; binary fields are returned as memoryviews into
+        `message`. Messages that don't match the schema are decoded using the slower,
+        more lenient reflective path."""
+        decoder, message_from_struct = cls._typed_decoder()
+        try:
+            decoded = decoder.decode(message)
+        except msgspec.ValidationError:
+            return cls._deserialize_reflective(message)
+        return message_from_struct[type(decoded)](decoded)
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _typed_decoder(
+        cls,
+    ) -> Tuple[msgspec.msgpack.Decoder, Dict[type, Callable[[Any], Message]]]:
+        """Build a decoder for a tagged union over all message types, and functions
+        for converting decoded structs to messages."""
+        structs = []
+        message_from_struct: Dict[type, Callable[[Any], Message]] = {}
+        for message_type in cls._subclass_from_type_string().values():
+            if not dataclasses.is_dataclass(message_type):
+                continue
+            struct, to_message = _make_decode_struct(message_type)
+            structs.append(struct)
+            message_from_struct[struct] = to_message
+        return (
+            msgspec.msgpack.Decoder(Union[tuple(structs)]),  # type: ignore
+            message_from_struct,
+        )
+
+    @classmethod
+    def _deserialize_reflective(cls, message: bytes) -> Message:
+        """Convert bytes into a Python Message object, using type hints that are
+        looked up at runtime."""
+        mapping = _lists_to_tuple(msgspec.msgpack.decode(message))
         message_type = cls._subclass_from_type_string()[cast(str, mapping.pop("type"))]
         message_kwargs = message_type._from_serializable_dict(mapping)
         return message_type(**message_kwargs)
@@ -169,6 +369,64 @@ class Message(abc.ABC):
 
         return _get_subclasses(cls)
 
+    @classmethod
+    def priority(cls) -> Literal["interactive", "default", "bulk"]:
+        """Priority class of this message type, used for ordering outgoing messages.
+
+        Interactive messages (GUI updates, camera commands, ...) can skip ahead of
+        queued bulk messages (point clouds, meshes, ...), but are never reordered
+        relative to default messages."""
+        return "default"
+
+    @classmethod
+    def coalesce_incoming(cls) -> bool:
+        """Whether incoming messages of this type only matter for their latest value.
+
+        If True, messages from a client that arrive while a handler for the same
+        redundancy key is still running (or rate limited) replace each other, and
+        only the latest one is handled. Should only be set for state updates, like
+        camera poses, where stale values can be safely dropped."""
+        return False
+
+    def persistent_scope(self) -> Optional[str]:
+        """Scope of the state that this message describes, as a `/`-separated path;
+        for example, the name of a scene node. Messages with a scope are dropped from
+        persistent buffers when a message that clears the scope is pushed. See
+        :meth:`clears_scope()`. By default, messages aren't scoped."""
+        return None
+
+    def persistent_scopes(self) -> Tuple[str, ...]:
+        """Scopes of the state that this message describes. Messages that describe
+        several independent pieces of state, like a batch of scene nodes, can have
+        more than one; see :meth:`without_scopes()`. Defaults to the single scope
+        from :meth:`persistent_scope()`."""
+        scope = self.persistent_scope()
+        return () if scope is None else (scope,)
+
+    def without_scopes(self, scopes: FrozenSet[str]) -> Message:
+        """Returns a version of this message that no longer describes the state in
+        `scopes`, which is a strict subset of :meth:`persistent_scopes()`. Used to
+        prune buffered messages when only some of their scopes are cleared. Must be
+        implemented by messages with more than one scope."""
+        raise NotImplementedError(
+            f"{type(self).__name__} has multiple scopes, but doesn't implement"
+            " without_scopes()."
+        )
+
+    def clears_scope(self) -> Optional[str]:
+        """If set, pushing this message to a persistent buffer drops buffered messages
+        whose scope is this path or one of its descendants. The empty string clears
+        every scope. The message itself is only kept until it has been sent to every
+        connected client; clients that connect later never see the state that it
+        clears."""
+        return None
+
+    def degrade(self) -> Message:
+        """Returns a version of this message that's cheaper to send, for example with
+        fewer points or a lower-resolution image. Used for clients that can't keep up
+        with outgoing messages. By default, messages are returned unchanged."""
+        return self
+
     @abc.abstractmethod
     def redundancy_key(self) -> str:
         """Returns a unique key for this message, used for detecting redundant
@@ -177,3 +435,20 @@ class Message(abc.ABC):
         For example: if we send 1000 "set value" messages for the same GUI element, we
         should only keep the latest message.
         """
+
+    def redundancy_keys(self) -> Tuple[str, ...]:
+        """Redundancy keys for messages that update several independent pieces of
+        state at once, like the poses of many scene nodes. A buffered message is
+        dropped once newer messages have taken over all of its keys; if only some
+        have been taken over, it's replaced by :meth:`without_redundancy_keys()`.
+        Defaults to the single key from :meth:`redundancy_key()`."""
+        return (self.redundancy_key(),)
+
+    def without_redundancy_keys(self, keys: FrozenSet[str]) -> Message:
+        """Returns a version of this message without the state for `keys`, which is
+        a strict subset of :meth:`redundancy_keys()`. Must be implemented by messages
+        with more than one redundancy key."""
+        raise NotImplementedError(
+            f"{type(self).__name__} has multiple redundancy keys, but doesn't"
+            " implement without_redundancy_keys()."
+        )
@@ -0,0 +1,331 @@
+"""Counters and gauges for monitoring websocket server performance."""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+
+from ._messages import Message
+
+
+@dataclasses.dataclass(frozen=True)
+class MessageTypeMetrics:
+    """Serialization metrics for a single message type."""
+
+    messages_encoded: int
+    """Number of messages of this type that were serialized. Windows that are shared
+    between clients are only serialized, and counted, once."""
+    bytes_encoded: int
+    """Total serialized size of messages of this type."""
+
+
+@dataclasses.dataclass(frozen=True)
+class ClientMetrics:
+    """Send metrics for a single connected client."""
+
+    windows_sent: int
+    bytes_sent: int
+    send_seconds_total: float
+    """Total time spent waiting for windows to be written to the client's socket."""
+    max_send_seconds: float
+    """Longest time spent sending a single window."""
+    queue_depth: int
+    """Messages that are waiting to be sent to this client, from both the broadcast
+    buffer and the client's own buffer."""
+    bytes_in_flight: int
+    """Serialized bytes that haven't been written to the client's socket yet."""
+    window_byte_budget: int | None
+    """Current byte budget for this client's windows. Only set for servers with an
+    adaptive window policy."""
+
+
+@dataclasses.dataclass(frozen=True)
+class ServerMetrics:
+    """Snapshot of websocket server metrics. Counters are totals since the server was
+    started; other fields are values at the time of the snapshot."""
+
+    message_types: Dict[str, MessageTypeMetrics]
+    clients: Dict[int, ClientMetrics]
+    windows_encoded: int
+    window_messages_total: int
+    window_bytes_total: int
+    """Number, combined message count, and combined size of serialized windows. The
+    mean window size is `window_bytes_total / windows_encoded`."""
+    serialization_seconds_total: float
+    """Time spent serializing windows and snapshots."""
+    queued_messages: int
+    """Messages waiting for another thread's `atomic()` block to finish."""
+    persistent_messages: int
+    persistent_bytes: int
+    """Number and approximate size of messages in the persistent broadcast buffer,
+    which is replayed for new clients."""
+    event_loop_lag_seconds: float
+    max_event_loop_lag_seconds: float
+    """Most recent and largest observed delay for the server's event loop to run a
+    scheduled callback. High values mean that the event loop is overloaded."""
+
+    def to_prometheus(self) -> str:
+        """Format metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def metric(
+            name: str,
+            kind: str,
+            help: str,
+            samples: Sequence[Tuple[Dict[str, str], float]],
+        ) -> None:
+            lines.append(f"# HELP viser_{name} {help}")
+            lines.append(f"# TYPE viser_{name} {kind}")
+            for labels, value in samples:
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(
+                    f"viser_{name}{{{label_str}}} {value}"
+                    if label_str
+                    else f"viser_{name} {value}"
+                )
+
+        types = sorted(self.message_types.items())
+        metric(
+            "encoded_messages_total",
+            "counter",
+            "Serialized messages, by message type.",
+            [({"message_type": k}, v.messages_encoded) for k, v in types],
+        )
+        metric(
+            "encoded_bytes_total",
+            "counter",
+            "Serialized bytes, by message type.",
+            [({"message_type": k}, v.bytes_encoded) for k, v in types],
+        )
+        metric(
+            "encoded_windows_total",
+            "counter",
+            "Serialized message windows.",
+            [({}, self.windows_encoded)],
+        )
+        metric(
+            "window_messages_total",
+            "counter",
+            "Messages in serialized windows.",
+            [({}, self.window_messages_total)],
+        )
+        metric(
+            "window_bytes_total",
+            "counter",
+            "Bytes in serialized windows.",
+            [({}, self.window_bytes_total)],
+        )
+        metric(
+            "serialization_seconds_total",
+            "counter",
+            "Time spent serializing outgoing messages.",
+            [({}, self.serialization_seconds_total)],
+        )
+        metric(
+            "queued_messages",
+            "gauge",
+            "Messages waiting for an atomic() block to finish.",
+            [({}, self.queued_messages)],
+        )
+        metric(
+            "persistent_messages",
+            "gauge",
+            "Messages in the persistent broadcast buffer.",
+            [({}, self.persistent_messages)],
+        )
+        metric(
+            "persistent_bytes",
+            "gauge",
+            "Approximate size of the persistent broadcast buffer.",
+            [({}, self.persistent_bytes)],
+        )
+        metric(
+            "event_loop_lag_seconds",
+            "gauge",
+            "Most recent event loop scheduling delay.",
+            [({}, self.event_loop_lag_seconds)],
+        )
+        metric(
+            "event_loop_lag_seconds_max",
+            "gauge",
+            "Largest event loop scheduling delay.",
+            [({}, self.max_event_loop_lag_seconds)],
+        )
+
+        clients = sorted(self.clients.items())
+        metric(
+            "client_sent_windows_total",
+            "counter",
+            "Windows sent to each client.",
+            [({"client_id": str(k)}, v.windows_sent) for k, v in clients],
+        )
+        metric(
+            "client_sent_bytes_total",
+            "counter",
+            "Bytes sent to each client.",
+            [({"client_id": str(k)}, v.bytes_sent) for k, v in clients],
+        )
+        metric(
+            "client_send_seconds_total",
+            "counter",
+            "Time spent sending windows to each client.",
+            [({"client_id": str(k)}, v.send_seconds_total) for k, v in clients],
+        )
+        metric(
+            "client_send_seconds_max",
+            "gauge",
+            "Longest time spent sending a window to each client.",
+            [({"client_id": str(k)}, v.max_send_seconds) for k, v in clients],
+        )
+        metric(
+            "client_queue_depth",
+            "gauge",
+            "Messages waiting to be sent to each client.",
+            [({"client_id": str(k)}, v.queue_depth) for k, v in clients],
+        )
+        metric(
+            "client_bytes_in_flight",
+            "gauge",
+            "Serialized bytes not yet written to each client's socket.",
+            [({"client_id": str(k)}, v.bytes_in_flight) for k, v in clients],
+        )
+        metric(
+            "client_window_byte_budget",
+            "gauge",
+            "Adaptive window byte budget for each client.",
+            [
+                ({"client_id": str(k)}, v.window_byte_budget)
+                for k, v in clients
+                if v.window_byte_budget is not None
+            ],
+        )
+        return "\n".join(lines) + "\n"
+
+
+@dataclasses.dataclass
+class _ClientSendStats:
+    windows_sent: int = 0
+    bytes_sent: int = 0
+    send_seconds_total: float = 0.0
+    max_send_seconds: float = 0.0
+
+
+class MetricsRecorder:
+    """Accumulates counters for :class:`ServerMetrics`. Methods can be called from
+    any thread."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._message_counts: Dict[str, int] = {}
+        self._message_bytes: Dict[str, int] = {}
+        self._windows_encoded = 0
+        self._window_messages_total = 0
+        self._window_bytes_total = 0
+        self._serialization_seconds_total = 0.0
+        self._client_stats: Dict[int, _ClientSendStats] = {}
+        self._event_loop_lag_seconds = 0.0
+        self._max_event_loop_lag_seconds = 0.0
+
+    def record_encode(
+        self,
+        messages: Sequence[Message],
+        message_nbytes: Sequence[int],
+        duration_sec: float,
+    ) -> None:
+        """Record a serialized window, and the encoded size of each message in it."""
+        with self._lock:
+            for message, nbytes in zip(messages, message_nbytes):
+                message_type = type(message).__name__
+                self._message_counts[message_type] = (
+                    self._message_counts.get(message_type, 0) + 1
+                )
+                self._message_bytes[message_type] = (
+                    self._message_bytes.get(message_type, 0) + nbytes
+                )
+            self._windows_encoded += 1
+            self._window_messages_total += len(messages)
+            self._window_bytes_total += sum(message_nbytes)
+            self._serialization_seconds_total += duration_sec
+
+    def record_serialization_time(self, duration_sec: float) -> None:
+        """Record time spent serializing outside of regular windows."""
+        with self._lock:
+            self._serialization_seconds_total += duration_sec
+
+    def record_send(self, client_id: int, num_bytes: int, duration_sec: float) -> None:
+        """Record a window that was sent to a client."""
+        with self._lock:
+            stats = self._client_stats.get(client_id, None)
+            if stats is None:
+                stats = self._client_stats[client_id] = _ClientSendStats()
+            stats.windows_sent += 1
+            stats.bytes_sent += num_bytes
+            stats.send_seconds_total += duration_sec
+            stats.max_send_seconds = max(stats.max_send_seconds, duration_sec)
+
+    def remove_client(self, client_id: int) -> None:
+        with self._lock:
+            self._client_stats.pop(client_id, None)
+
+    async def monitor_event_loop_lag(self, interval_sec: float = 0.1) -> None:
+        """Measure how late the event loop wakes up from sleeps. Runs forever."""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval_sec)
+            lag = max(time.perf_counter() - start - interval_sec, 0.0)
+            with self._lock:
+                self._event_loop_lag_seconds = lag
+                self._max_event_loop_lag_seconds = max(
+                    self._max_event_loop_lag_seconds, lag
+                )
+
+    def snapshot(
+        self,
+        client_gauges: Dict[int, Tuple[int, int, int | None]],
+        queued_messages: int,
+        persistent_messages: int,
+        persistent_bytes: int,
+    ) -> ServerMetrics:
+        """Combine recorded counters with gauges that are read from the server.
+        `client_gauges` maps client IDs to (queue depth, bytes in flight, window byte
+        budget) tuples."""
+        with self._lock:
+            return ServerMetrics(
+                message_types={
+                    k: MessageTypeMetrics(
+                        messages_encoded=v, bytes_encoded=self._message_bytes[k]
+                    )
+                    for k, v in self._message_counts.items()
+                },
+                clients={
+                    client_id: ClientMetrics(
+                        windows_sent=stats.windows_sent,
+                        bytes_sent=stats.bytes_sent,
+                        send_seconds_total=stats.send_seconds_total,
+                        max_send_seconds=stats.max_send_seconds,
+                        queue_depth=queue_depth,
+                        bytes_in_flight=bytes_in_flight,
+                        window_byte_budget=window_byte_budget,
+                    )
+                    for client_id, (
+                        queue_depth,
+                        bytes_in_flight,
+                        window_byte_budget,
+                    ) in client_gauges.items()
+                    for stats in (
+                        self._client_stats.get(client_id, _ClientSendStats()),
+                    )
+                },
+                windows_encoded=self._windows_encoded,
+                window_messages_total=self._window_messages_total,
+                window_bytes_total=self._window_bytes_total,
+                serialization_seconds_total=self._serialization_seconds_total,
+                queued_messages=queued_messages,
+                persistent_messages=persistent_messages,
+                persistent_bytes=persistent_bytes,
+                event_loop_lag_seconds=self._event_loop_lag_seconds,
+                max_event_loop_lag_seconds=self._max_event_loop_lag_seconds,
+            )
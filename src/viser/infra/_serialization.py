@@ -0,0 +1,229 @@
+"""Helpers for serializing windows of outgoing messages into websocket payloads."""
+
+from __future__ import annotations
+
+import gzip
+import os
+import struct
+from typing import Any, Dict, List, Sequence, Union
+
+import msgspec
+from typing_extensions import Literal, assert_never
+
+from ._messages import Message
+
+Fragment = Union[bytes, bytearray, memoryview]
+"""A single websocket frame fragment. Lists of fragments are sent as one
+fragmented websocket message, which clients receive reassembled."""
+
+_PLACEHOLDER_PREFIX_LEN = 12
+_PLACEHOLDER_LEN = _PLACEHOLDER_PREFIX_LEN + 4
+_BIN8_PLACEHOLDER_HEADER = bytes((0xC4, _PLACEHOLDER_LEN))
+
+
+def _msgpack_bin_header(length: int) -> bytes:
+    """Header for a msgpack `bin` object of a given length."""
+    if length < 2**8:
+        return struct.pack(">BB", 0xC4, length)
+    elif length < 2**16:
+        return struct.pack(">BH", 0xC5, length)
+    else:
+        return struct.pack(">BI", 0xC6, length)
+
+
+def _extract_buffers(
+    mapping: Dict[str, Any],
+    prefix: bytes,
+    buffers: List[memoryview],
+    min_bytes: int,
+) -> None:
+    """Replace large binary fields in a serializable dict with placeholder tokens.
+    The original buffers are appended to `buffers`, in placeholder order."""
+    for k, v in mapping.items():
+        if isinstance(v, (bytes, bytearray, memoryview)) and len(v) > 0:
+            view = memoryview(v)
+            if view.nbytes < min_bytes:
+                continue
+            # Multi-dimensional / typed views (eg from `ndarray.data`) need to be
+            # flattened to bytes. Views are C-contiguous after serialization.
+            if view.format != "B" or view.ndim != 1:
+                view = view.cast("B")
+            mapping[k] = prefix + struct.pack(">I", len(buffers))
+            buffers.append(view)
+
+
+def _msgpack_array_header(length: int) -> bytes:
+    """Header for a msgpack `array` object of a given length."""
+    if length < 16:
+        return struct.pack(">B", 0x90 | length)
+    elif length < 2**16:
+        return struct.pack(">BH", 0xDC, length)
+    else:
+        return struct.pack(">BI", 0xDD, length)
+
+
+def _spliced_nbytes(encoded_nbytes: int, buffers: Sequence[memoryview]) -> int:
+    """Size of an encoded payload after its placeholder tokens are replaced with the
+    original buffers."""
+    return encoded_nbytes + sum(
+        len(_msgpack_bin_header(buffer.nbytes))
+        + buffer.nbytes
+        - len(_BIN8_PLACEHOLDER_HEADER)
+        - _PLACEHOLDER_LEN
+        for buffer in buffers
+    )
+
+
+def _encode_with_buffers(
+    payload: Any, prefix: bytes, buffers: List[memoryview]
+) -> List[Fragment]:
+    """Encode a payload that contains placeholder tokens, and splice the original
+    buffers back in as separate fragments. The concatenation of the returned
+    fragments is byte-identical to directly msgpack-encoding the original payload."""
+    return _splice_buffers(msgspec.msgpack.encode(payload), prefix, buffers)
+
+
+def _splice_buffers(
+    encoded: bytes, prefix: bytes, buffers: List[memoryview]
+) -> List[Fragment]:
+    """Split an encoded payload at its placeholder tokens, and insert the original
+    buffers as separate fragments."""
+    if len(buffers) == 0:
+        return [encoded]
+
+    encoded_view = memoryview(encoded)
+    needle = _BIN8_PLACEHOLDER_HEADER + prefix
+    fragments: List[Fragment] = []
+    start = 0
+    while True:
+        index = encoded.find(needle, start)
+        if index == -1:
+            break
+        (buffer_index,) = struct.unpack_from(">I", encoded, index + len(needle))
+        buffer = buffers[buffer_index]
+        fragments.append(
+            encoded_view[start:index].tobytes() + _msgpack_bin_header(buffer.nbytes)
+        )
+        fragments.append(buffer)
+        start = index + len(_BIN8_PLACEHOLDER_HEADER) + _PLACEHOLDER_LEN
+    if start < len(encoded):
+        fragments.append(encoded_view[start:])
+    return fragments
+
+
+def encode_window(
+    messages: Sequence[Message],
+    client_api_version: Literal[0, 1],
+    zero_copy_min_bytes: int | None = None,
+    message_nbytes: List[int] | None = None,
+) -> List[List[Fragment]]:
+    """Serialize a window of messages.
+
+    Args:
+        messages: Messages to serialize.
+        client_api_version: 0 produces one websocket message per input message. 1
+            produces a single websocket message for the whole window.
+        zero_copy_min_bytes: If set, binary fields (arrays, bytes) at least this large
+            are never copied into the serialized buffer. They are instead returned as
+            separate fragments that reference the original memory.
+        message_nbytes: If set, the encoded size of each message is appended to this
+            list. Used for reporting metrics.
+
+    Returns:
+        List of websocket messages, each of which is a list of fragments.
+    """
+    if zero_copy_min_bytes is None:
+        if client_api_version == 1:
+            if message_nbytes is None:
+                return [
+                    [
+                        msgspec.msgpack.encode(
+                            tuple(
+                                message.as_serializable_dict() for message in messages
+                            )
+                        )
+                    ]
+                ]
+
+            # Encode messages one at a time into the same buffer, so we can measure
+            # each of them without an extra copy.
+            encoder = msgspec.msgpack.Encoder()
+            out = bytearray(_msgpack_array_header(len(messages)))
+            for message in messages:
+                start = len(out)
+                encoder.encode_into(message.as_serializable_dict(), out, -1)
+                message_nbytes.append(len(out) - start)
+            return [[out]]
+        elif client_api_version == 0:
+            out_v0 = [
+                [msgspec.msgpack.encode(message.as_serializable_dict())]
+                for message in messages
+            ]
+            if message_nbytes is not None:
+                message_nbytes.extend(len(fragments[0]) for fragments in out_v0)
+            return out_v0
+        else:
+            assert_never(client_api_version)
+
+    # Random prefix for placeholder tokens. Collisions with real payload bytes are
+    # vanishingly unlikely; placeholders also include a bin8 header.
+    prefix = os.urandom(_PLACEHOLDER_PREFIX_LEN)
+    if client_api_version == 1:
+        buffers: List[memoryview] = []
+        buffer_counts: List[int] = []
+        payload = []
+        for message in messages:
+            mapping = message.as_serializable_dict()
+            num_buffers = len(buffers)
+            _extract_buffers(mapping, prefix, buffers, zero_copy_min_bytes)
+            buffer_counts.append(len(buffers) - num_buffers)
+            payload.append(mapping)
+        if message_nbytes is None:
+            return [_encode_with_buffers(tuple(payload), prefix, buffers)]
+
+        # Encoding each message separately is cheap here: large buffers have already
+        # been replaced by placeholders.
+        encoded_mappings = [msgspec.msgpack.encode(mapping) for mapping in payload]
+        buffer_start = 0
+        for encoded, num_buffers in zip(encoded_mappings, buffer_counts):
+            message_nbytes.append(
+                _spliced_nbytes(
+                    len(encoded), buffers[buffer_start : buffer_start + num_buffers]
+                )
+            )
+            buffer_start += num_buffers
+        return [
+            _splice_buffers(
+                _msgpack_array_header(len(messages)) + b"".join(encoded_mappings),
+                prefix,
+                buffers,
+            )
+        ]
+    elif client_api_version == 0:
+        out = []
+        for message in messages:
+            buffers = []
+            mapping = message.as_serializable_dict()
+            _extract_buffers(mapping, prefix, buffers, zero_copy_min_bytes)
+            fragments = _encode_with_buffers(mapping, prefix, buffers)
+            if message_nbytes is not None:
+                message_nbytes.append(
+                    sum(memoryview(fragment).nbytes for fragment in fragments)
+                )
+            out.append(fragments)
+        return out
+    else:
+        assert_never(client_api_version)
+
+
+def encode_snapshot_segment(messages: Sequence[Message]) -> bytes:
+    """Serialize and gzip a window of messages, for sending to newly connected
+    clients. Clients can distinguish these from regular windows using the gzip magic
+    number, which is never a valid start for a serialized window."""
+    return gzip.compress(
+        msgspec.msgpack.encode(
+            tuple(message.as_serializable_dict() for message in messages)
+        ),
+        compresslevel=6,
+        mtime=0,
+    )
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from typing import Iterator
+
+import pytest
+
+import viser
+
+
+@pytest.fixture
+def server() -> Iterator[viser.ViserServer]:
+    server = viser.ViserServer(host="127.0.0.1", port=8100, verbose=False)
+    yield server
+    server.stop()
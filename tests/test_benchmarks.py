@@ -0,0 +1,41 @@
+"""Smoke tests for the benchmark workloads, with small problem sizes."""
+
+from __future__ import annotations
+
+import importlib
+import json
+from pathlib import Path
+
+import pytest
+
+_BENCHMARKS_DIR = Path(__file__).absolute().parent.parent / "benchmarks"
+
+
+@pytest.fixture(autouse=True)
+def _benchmarks_on_path(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.syspath_prepend(str(_BENCHMARKS_DIR))
+
+
+def test_message_serialization(capsys: pytest.CaptureFixture[str]) -> None:
+    importlib.import_module("message_serialization").main(
+        num_messages=100, trials=1, json_output=True
+    )
+    result = json.loads(capsys.readouterr().out)
+    for rates in result["messages_per_sec"].values():
+        assert set(rates) == {"reflective", "compiled", "keying", "buffer_push"}
+        assert all(rate > 0.0 for rate in rates.values())
+
+
+def test_gui_slider_storm(capsys: pytest.CaptureFixture[str]) -> None:
+    importlib.import_module("gui_slider_storm").main(
+        num_sliders=5,
+        num_server_steps=10,
+        num_client_bursts=5,
+        updates_per_burst=5,
+        num_clients=2,
+        port=8105,
+        json_output=True,
+    )
+    result = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert result["benchmark"] == "gui_slider_storm"
+    assert result["messages_received_per_sec"] > 0.0
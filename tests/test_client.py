@@ -0,0 +1,62 @@
+"""Round trips through the headless `WebsockClient`."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import List, Set
+
+import viser
+from viser import _messages, infra
+from viser.infra import Message
+
+
+def _scoped_names(messages: List[Message]) -> Set[str]:
+    return {scope for message in messages for scope in message.persistent_scopes()}
+
+
+def test_mirror_drops_cleared_scopes(server: viser.ViserServer) -> None:
+    frame = server.scene.add_frame("/a")
+    server.scene.add_frame("/a/b")
+    server.scene.add_frame("/c")
+
+    async def main() -> None:
+        url = f"ws://127.0.0.1:{server.get_port()}"
+        async with infra.WebsockClient(url, _messages.Message) as client:
+            await client.wait_for_idle(0.5)
+            assert {"/a", "/a/b", "/c"} <= _scoped_names(client.mirrored_messages)
+
+            # Removed scene nodes shouldn't be replayed, and neither should the
+            # message that removes them.
+            frame.remove()
+            await asyncio.sleep(0.5)
+            await client.wait_for_idle(0.5)
+            mirrored = client.mirrored_messages
+            assert "/c" in _scoped_names(mirrored)
+            assert not {"/a", "/a/b"} & _scoped_names(mirrored)
+            assert not any(
+                isinstance(message, _messages.RemoveSceneNodeMessage)
+                for message in mirrored
+            )
+
+            # Replaying the mirror reproduces the scene on another server.
+            other = viser.ViserServer(host="127.0.0.1", port=8101, verbose=False)
+            try:
+                client.replay(other._websock_server)
+                buffer = other._websock_server._broadcast_buffer
+                with buffer.buffer_lock:
+                    replayed = list(buffer.message_from_id.values())
+                assert "/c" in _scoped_names(replayed)
+                assert not {"/a", "/a/b"} & _scoped_names(replayed)
+            finally:
+                other.stop()
+
+            server.scene.reset()
+            await asyncio.sleep(0.5)
+            await client.wait_for_idle(0.5)
+            mirrored = client.mirrored_messages
+            assert not {"/a", "/a/b", "/c"} & _scoped_names(mirrored)
+            assert not any(
+                isinstance(message, _messages.ResetSceneMessage) for message in mirrored
+            )
+
+    asyncio.run(main())
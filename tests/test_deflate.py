@@ -0,0 +1,49 @@
+"""Tests for skipping per-message deflate on large outgoing messages."""
+
+from __future__ import annotations
+
+import asyncio
+
+import numpy as onp
+from websockets.frames import OP_BINARY, OP_CONT, Frame
+
+import viser
+from viser import _messages, infra
+from viser.infra._deflate import SkippableDeflateFactory, uncompressed
+
+
+def test_uncompressed_messages_skip_deflate() -> None:
+    _, extension = SkippableDeflateFactory().process_request_params([], [])
+    data = bytes(1000)
+
+    compressed = extension.encode(Frame(OP_BINARY, data))
+    assert compressed.rsv1 and len(compressed.data) < len(data)
+
+    # Every fragment of an uncompressed message is passed through.
+    with uncompressed():
+        first = extension.encode(Frame(OP_BINARY, data, fin=False))
+    last = extension.encode(Frame(OP_CONT, data))
+    assert not first.rsv1 and first.data == data
+    assert last.data == data
+
+    # Later messages are compressed again.
+    assert extension.encode(Frame(OP_BINARY, data)).rsv1
+
+
+def test_large_messages_round_trip(server: viser.ViserServer) -> None:
+    points = onp.random.uniform(size=(100_000, 3)).astype(onp.float32)
+    server.scene.add_point_cloud("/a", points=points, colors=(255, 0, 0))
+
+    async def main() -> None:
+        url = f"ws://127.0.0.1:{server.get_port()}"
+        async with infra.WebsockClient(url, _messages.Message) as client:
+            await asyncio.sleep(0.5)
+            await client.wait_for_idle(0.5)
+            (message,) = [
+                message
+                for message in client.mirrored_messages
+                if isinstance(message, _messages.PointCloudMessage)
+            ]
+            assert message.points.tobytes() == points.tobytes()
+
+    asyncio.run(main())
@@ -0,0 +1,258 @@
+"""Tests for scheduling handlers of incoming messages."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List
+
+from viser import _messages
+from viser.infra import IncomingDispatchPolicy, Message
+from viser.infra._incoming_dispatch import IncomingDispatcher, IncomingHandler
+
+
+def _camera(fov: float) -> _messages.ViewerCameraMessage:
+    return _messages.ViewerCameraMessage(
+        wxyz=(1.0, 0.0, 0.0, 0.0),
+        position=(0.0, 0.0, 0.0),
+        fov=fov,
+        aspect=1.0,
+        look_at=(0.0, 0.0, 1.0),
+        up_direction=(0.0, 0.0, 1.0),
+    )
+
+
+def _run(
+    handlers: List[IncomingHandler],
+    dispatch: Callable[[IncomingDispatcher], Awaitable[None]],
+    policy: IncomingDispatchPolicy = IncomingDispatchPolicy(),
+    coalesced_min_interval_sec: float = 0.0,
+) -> None:
+    """Dispatch messages to handlers, then wait for them to finish."""
+    executor = ThreadPoolExecutor(max_workers=policy.max_workers)
+
+    async def main() -> None:
+        dispatcher = IncomingDispatcher(
+            asyncio.get_running_loop(),
+            client_id=0,
+            get_handlers=lambda message: handlers,
+            policy=policy,
+            thread_executor=executor,
+            handler_semaphores={},
+            coalesced_min_interval_sec=coalesced_min_interval_sec,
+        )
+        await dispatch(dispatcher)
+        await asyncio.sleep(0.5)
+        dispatcher.close()
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown(wait=True)
+
+
+def test_coalesced_messages_only_handle_the_latest() -> None:
+    handled: List[float] = []
+
+    def handler(client_id: int, message: Message) -> None:
+        handled.append(message.fov)  # type: ignore
+        time.sleep(0.05)
+
+    async def dispatch(dispatcher: IncomingDispatcher) -> None:
+        for i in range(100):
+            await dispatcher.dispatch(_camera(float(i)))
+
+    _run([handler], dispatch)
+
+    # Messages that arrive while the handler is busy replace each other.
+    assert handled == [0.0, 99.0]
+
+
+def test_coalesced_messages_are_rate_limited() -> None:
+    handled: List[float] = []
+
+    async def dispatch(dispatcher: IncomingDispatcher) -> None:
+        for i in range(30):
+            await dispatcher.dispatch(_camera(float(i)))
+            await asyncio.sleep(0.01)
+
+    _run(
+        [lambda client_id, message: handled.append(message.fov)],  # type: ignore
+        dispatch,
+        coalesced_min_interval_sec=0.1,
+    )
+
+    # The final pose is always delivered.
+    assert 2 <= len(handled) <= 6
+    assert handled == sorted(handled)
+    assert handled[-1] == 29.0
+
+
+def _update(value: int) -> _messages.GuiUpdateMessage:
+    return _messages.GuiUpdateMessage("gui", {"value": value})
+
+
+def test_serial_mode_handles_messages_in_order() -> None:
+    handled: List[int] = []
+
+    def handler(client_id: int, message: Message) -> None:
+        time.sleep(random.uniform(0.0, 0.002))
+        handled.append(message.updates["value"])  # type: ignore
+
+    async def dispatch(dispatcher: IncomingDispatcher) -> None:
+        for i in range(50):
+            await dispatcher.dispatch(_update(i))
+
+    _run([handler], dispatch, IncomingDispatchPolicy(mode="serial"))
+    assert handled == list(range(50))
+
+
+def test_concurrent_calls_per_handler_are_limited() -> None:
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def handler(client_id: int, message: Message) -> None:
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+
+    async def dispatch(dispatcher: IncomingDispatcher) -> None:
+        for i in range(20):
+            await dispatcher.dispatch(_update(i))
+
+    _run(
+        [handler], dispatch, IncomingDispatchPolicy(max_concurrent_calls_per_handler=2)
+    )
+    assert max_running == 2
+
+
+def test_pending_messages_per_client_are_limited() -> None:
+    release = threading.Event()
+    handled: List[int] = []
+
+    def handler(client_id: int, message: Message) -> None:
+        release.wait()
+        handled.append(message.updates["value"])  # type: ignore
+
+    async def dispatch(dispatcher: IncomingDispatcher) -> None:
+        await dispatcher.dispatch(_update(0))
+        await dispatcher.dispatch(_update(1))
+
+        # The third message waits until a handler finishes.
+        third = asyncio.ensure_future(dispatcher.dispatch(_update(2)))
+        await asyncio.sleep(0.1)
+        assert not third.done()
+        release.set()
+        await asyncio.wait_for(third, timeout=5.0)
+
+    _run([handler], dispatch, IncomingDispatchPolicy(max_pending_messages_per_client=2))
+    assert sorted(handled) == [0, 1, 2]
+
+
+def test_async_handlers_run_on_the_event_loop() -> None:
+    thread_ids: List[int] = []
+
+    async def handler(client_id: int, message: Message) -> None:
+        thread_ids.append(threading.get_ident())
+
+    async def dispatch(dispatcher: IncomingDispatcher) -> None:
+        await dispatcher.dispatch(_update(0))
+        await asyncio.sleep(0.1)
+        assert thread_ids == [threading.get_ident()]
+
+    _run([handler], dispatch)
+
+
+def test_handler_limits_are_shared_by_per_client_closures() -> None:
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def make_handler() -> IncomingHandler:
+        # Servers register closures like this one for each client.
+        def handler(client_id: int, message: Message) -> None:
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+
+        return handler
+
+    policy = IncomingDispatchPolicy(max_concurrent_calls_per_handler=2)
+    handler_semaphores: Dict[Any, asyncio.Semaphore] = {}
+    executor = ThreadPoolExecutor(max_workers=policy.max_workers)
+
+    async def main() -> None:
+        dispatchers = []
+        for client_id in range(4):
+            handlers = [make_handler()]
+            dispatchers.append(
+                IncomingDispatcher(
+                    asyncio.get_running_loop(),
+                    client_id=client_id,
+                    get_handlers=lambda message, handlers=handlers: handlers,
+                    policy=policy,
+                    thread_executor=executor,
+                    handler_semaphores=handler_semaphores,
+                    coalesced_min_interval_sec=0.0,
+                )
+            )
+        for i in range(10):
+            for dispatcher in dispatchers:
+                await dispatcher.dispatch(_update(i))
+        await asyncio.sleep(0.5)
+        for dispatcher in dispatchers:
+            dispatcher.close()
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown(wait=True)
+
+    # One limit for all clients, which doesn't reference any client's closure.
+    assert max_running == 2
+    assert len(handler_semaphores) == 1
+
+
+def test_closed_serial_dispatchers_drop_late_coalesced_messages() -> None:
+    handled: List[float] = []
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    async def main() -> None:
+        dispatcher = IncomingDispatcher(
+            asyncio.get_running_loop(),
+            client_id=0,
+            get_handlers=lambda message: [
+                lambda client_id, message: handled.append(message.fov)  # type: ignore
+            ],
+            policy=IncomingDispatchPolicy(mode="serial"),
+            thread_executor=executor,
+            handler_semaphores={},
+            coalesced_min_interval_sec=0.2,
+        )
+        await dispatcher.dispatch(_camera(0.0))
+        await asyncio.sleep(0.05)
+
+        # The second message is rate limited, and only submitted after the client
+        # disconnects. It's dropped, and the coalescer is freed up.
+        await dispatcher.dispatch(_camera(1.0))
+        dispatcher.close()
+        await asyncio.sleep(0.5)
+        assert dispatcher._coalescer._busy_keys == set()
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown(wait=True)
+    assert handled == [0.0]
@@ -0,0 +1,443 @@
+"""Tests for message ordering and culling in `AsyncMessageBuffer`."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import time
+from typing import Callable, List, Optional, Sequence
+
+import msgspec
+import numpy as onp
+
+from viser import _messages
+from viser.infra import Message
+from viser.infra._async_message_buffer import (
+    AdaptiveWindowPolicy,
+    AsyncMessageBuffer,
+    MessageWindow,
+)
+from viser.infra._serialization import encode_snapshot_segment
+
+
+def _point_cloud(name: str) -> _messages.PointCloudMessage:
+    return _messages.PointCloudMessage(
+        name,
+        points=onp.zeros((4, 3), dtype=onp.float32),
+        colors=onp.zeros(3, dtype=onp.uint8),
+        point_size=0.1,
+        point_ball_norm=2.0,
+        precision="float32",
+        points_bbox=None,
+        color_palette=None,
+    )
+
+
+def _point_clouds(names: Sequence[str]) -> _messages.PointCloudsMessage:
+    num_nodes = len(names)
+    return _messages.PointCloudsMessage(
+        names=tuple(names),
+        wxyzs=onp.tile(
+            onp.array([1.0, 0.0, 0.0, 0.0], dtype=onp.float32), (num_nodes, 1)
+        ),
+        positions=onp.zeros((num_nodes, 3), dtype=onp.float32),
+        visible=True,
+        points=onp.zeros((num_nodes, 3), dtype=onp.float32),
+        colors=onp.zeros((num_nodes, 3), dtype=onp.uint8),
+        point_counts=onp.ones(num_nodes, dtype=onp.uint32),
+        point_size=0.1,
+        point_ball_norm=2.0,
+    )
+
+
+def _drain(
+    messages: Sequence[Message],
+    persistent_messages: bool = True,
+    rank_bulk_message: Optional[Callable[[Message], float]] = None,
+    coalesced: bool = False,
+    window_policy: Optional[AdaptiveWindowPolicy] = None,
+) -> List[MessageWindow]:
+    """Push messages to a buffer, then read windows until all of them are sent."""
+
+    async def main() -> List[MessageWindow]:
+        buffer = AsyncMessageBuffer(
+            asyncio.get_running_loop(),
+            persistent_messages=persistent_messages,
+            window_policy=window_policy,
+        )
+        if coalesced:
+            buffer.coalesced_client_ids.add(0)
+        for message in messages:
+            buffer.push(message)
+        num_messages = len(buffer.message_from_id)
+
+        windows: List[MessageWindow] = []
+        generator = buffer.window_generator(0, rank_bulk_message=rank_bulk_message)
+        while sum(len(window.messages) for window in windows) < num_messages:
+            windows.append(await asyncio.wait_for(generator.__anext__(), timeout=5.0))
+        buffer.set_done()
+        await generator.aclose()
+        return windows
+
+    return asyncio.run(main())
+
+
+def _sent_order(windows: Sequence[MessageWindow]) -> List[Message]:
+    return [message for window in windows for message in window.messages]
+
+
+def test_interactive_messages_skip_ahead_of_bulk_messages() -> None:
+    messages = [
+        _point_cloud("/a"),
+        _point_cloud("/b"),
+        _messages.SetCameraFovMessage(1.0),
+        _messages.SetPositionMessage("/c", (1.0, 2.0, 3.0)),
+    ]
+    order = _sent_order(_drain(messages))
+    assert order == [messages[2], messages[3], messages[0], messages[1]]
+
+
+def test_node_updates_stay_behind_node_messages() -> None:
+    # Poses and visibility must arrive after the message that creates the node,
+    # which resets them on the client.
+    for persistent_messages in (True, False):
+        messages = [
+            _point_cloud("/a"),
+            _point_cloud("/b"),
+            _messages.SetOrientationMessage("/b", (1.0, 0.0, 0.0, 0.0)),
+            _messages.SetPositionMessage("/b", (1.0, 2.0, 3.0)),
+            _messages.SetSceneNodeVisibilityMessage("/b", False),
+            _messages.SetPositionMessage("/c", (1.0, 2.0, 3.0)),
+        ]
+        order = _sent_order(_drain(messages, persistent_messages))
+        assert order == [messages[5]] + messages[:5]
+
+
+def test_node_updates_stay_behind_ancestor_node_messages() -> None:
+    messages = [
+        _point_cloud("/a"),
+        _point_cloud("/b"),
+        _messages.SetPositionMessage("/b/child", (1.0, 2.0, 3.0)),
+        _messages.SetPositionMessage("/bb", (1.0, 2.0, 3.0)),
+    ]
+    order = _sent_order(_drain(messages))
+    assert order == [messages[3], messages[0], messages[1], messages[2]]
+
+
+def test_bulk_node_updates_stay_behind_batch_node_messages() -> None:
+    messages = [
+        _point_cloud("/a"),
+        _point_clouds(["/b", "/c"]),
+        _messages.SetPositionsMessage(
+            ("/c", "/d"), onp.zeros((2, 3), dtype=onp.float32)
+        ),
+        _messages.SetSceneNodeVisibilitiesMessage(("/e",), onp.zeros(1, dtype=bool)),
+        _messages.TimelinePlaybackMessage(
+            "/b", playing=True, frame=0, fps=10.0, loop=True, show_all=False
+        ),
+    ]
+    order = _sent_order(_drain(messages))
+    assert order == [messages[3], messages[0], messages[1], messages[2], messages[4]]
+
+
+def test_held_node_updates_keep_their_order() -> None:
+    # Once an update is held back, later updates for any of the same nodes can't
+    # overtake it.
+    messages = [
+        _point_cloud("/a"),
+        _point_cloud("/b"),
+        _messages.SetPositionsMessage(
+            ("/b", "/c"), onp.zeros((2, 3), dtype=onp.float32)
+        ),
+        _messages.SetOrientationMessage("/c", (1.0, 0.0, 0.0, 0.0)),
+    ]
+    order = _sent_order(_drain(messages))
+    assert order == messages
+
+
+def test_ranked_bulk_messages_keep_node_updates_in_order() -> None:
+    rank_from_name = {"/a": 0.0, "/b": 1.0, "/c": 2.0}
+    messages = [
+        _point_cloud("/a"),
+        _point_cloud("/b"),
+        _messages.SetPositionMessage("/b", (1.0, 2.0, 3.0)),
+        _point_cloud("/c"),
+    ]
+    order = _sent_order(
+        _drain(
+            messages,
+            rank_bulk_message=lambda message: rank_from_name[message.name],  # type: ignore
+        )
+    )
+    assert order == [messages[3], messages[1], messages[0], messages[2]]
+
+
+def test_coalesced_clients_get_one_window() -> None:
+    positions = [
+        _messages.SetPositionMessage("/b", (float(i), 0.0, 0.0)) for i in range(3)
+    ]
+    messages = [
+        _point_cloud("/a"),
+        positions[0],
+        _point_cloud("/b"),
+        positions[1],
+        _messages.SetCameraFovMessage(1.0),
+        positions[2],
+    ]
+    windows = _drain(messages, coalesced=True)
+
+    # Superseded positions are culled, and the rest keep their original order.
+    assert len(windows) == 1
+    assert windows[0].cache_key is None
+    assert list(windows[0].messages) == [
+        messages[0],
+        messages[2],
+        messages[4],
+        positions[2],
+    ]
+
+
+def test_windows_are_shared_between_consumers() -> None:
+    async def main() -> None:
+        buffer = AsyncMessageBuffer(
+            asyncio.get_running_loop(), persistent_messages=True
+        )
+        for i in range(3):
+            buffer.push(_messages.SetPositionMessage(f"/{i}", (0.0, 0.0, 0.0)))
+        generators = [buffer.window_generator(client_id) for client_id in (0, 1)]
+        windows = [
+            await asyncio.wait_for(generator.__anext__(), timeout=5.0)
+            for generator in generators
+        ]
+
+        # Both consumers read the same window, so it only needs to be encoded once.
+        assert windows[0].cache_key == windows[1].cache_key == (0, 2)
+        assert list(windows[0].messages) == list(windows[1].messages)
+
+        # Cached windows are evicted once every attached consumer is past them.
+        buffer.encoded_window_cache[(0, 2)] = "encoded"
+        buffer._update_progress(0, 2)
+        buffer._update_progress(1, -1)
+        assert (0, 2) in buffer.encoded_window_cache
+        buffer.detached_client_ids.add(1)
+        buffer._update_progress(1, None)
+        assert (0, 2) not in buffer.encoded_window_cache
+
+        buffer.set_done()
+        for generator in generators:
+            await generator.aclose()
+
+    asyncio.run(main())
+
+
+def test_windows_from_non_persistent_buffers_are_not_shared() -> None:
+    windows = _drain(
+        [_messages.SetCameraFovMessage(1.0), _messages.SetCameraFovMessage(2.0)],
+        persistent_messages=False,
+    )
+    assert all(window.cache_key is None for window in windows)
+
+
+def test_snapshot_segments_are_cached() -> None:
+    encoded: List[List[Message]] = []
+
+    async def encode(messages: Sequence[Message]) -> bytes:
+        encoded.append(list(messages))
+        return encode_snapshot_segment(messages)
+
+    def decode(segments: List[bytes]) -> List[str]:
+        return [
+            mapping["name"]
+            for segment in segments
+            for mapping in msgspec.msgpack.decode(gzip.decompress(segment))
+        ]
+
+    async def main() -> None:
+        buffer = AsyncMessageBuffer(
+            asyncio.get_running_loop(),
+            persistent_messages=True,
+            snapshot_segment_size=2,
+        )
+        for name in ("/a", "/b", "/c", "/d"):
+            buffer.push(_messages.SetPositionMessage(name, (0.0, 0.0, 0.0)))
+
+        last_id, segments = await buffer.get_snapshot(encode, client_id=0)
+        assert last_id == 3
+        assert decode(segments) == ["/a", "/b", "/c", "/d"]
+        assert len(encoded) == 2
+
+        # Unchanged segments are reused by the next client.
+        assert (await buffer.get_snapshot(encode, client_id=1))[1] == segments
+        assert len(encoded) == 2
+
+        # Superseding a message only re-encodes the segment that contained it.
+        buffer.push(_messages.SetPositionMessage("/a", (1.0, 0.0, 0.0)))
+        last_id, segments = await buffer.get_snapshot(encode, client_id=2)
+        assert last_id == 4
+        assert decode(segments) == ["/b", "/c", "/d", "/a"]
+        assert [[m.name for m in messages] for messages in encoded[2:]] == [  # type: ignore
+            ["/b"],
+            ["/a"],
+        ]
+
+    asyncio.run(main())
+
+
+def test_adaptive_windows_are_sized_by_bytes() -> None:
+    small = [_messages.RunJavascriptMessage("x" * 300) for _ in range(8)]
+    large = _messages.RunJavascriptMessage("x" * 3000)
+    windows = _drain(
+        small[:4] + [large] + small[4:],
+        window_policy=AdaptiveWindowPolicy(
+            min_window_bytes=256, max_window_bytes=1024, bulk_message_bytes=2048
+        ),
+    )
+
+    # Windows are closed at the byte budget, and bulky messages get their own.
+    assert [list(window.messages) for window in windows] == [
+        small[0:3],
+        small[3:4],
+        [large],
+        small[4:7],
+        small[7:8],
+    ]
+
+
+def test_adaptive_window_budgets_track_throughput() -> None:
+    async def main() -> None:
+        buffer = AsyncMessageBuffer(
+            asyncio.get_running_loop(),
+            persistent_messages=True,
+            window_policy=AdaptiveWindowPolicy(),
+        )
+        buffer.push(_messages.SetCameraFovMessage(1.0))
+        generator = buffer.window_generator(0)
+        await asyncio.wait_for(generator.__anext__(), timeout=5.0)
+
+        # 10 MB/s, for a target latency of 1/30 seconds. Budgets are rounded down
+        # to powers of two, so similar clients can share windows.
+        buffer.record_send(0, num_bytes=1_000_000, duration_sec=0.1)
+        assert buffer.window_state_from_client[0].byte_budget == 2**18
+
+        # Small windows don't tell us much about throughput.
+        buffer.record_send(0, num_bytes=100, duration_sec=1.0)
+        assert buffer.window_state_from_client[0].byte_budget == 2**18
+
+        buffer.set_done()
+        await generator.aclose()
+
+    asyncio.run(main())
+
+
+def test_removed_scene_nodes_are_pruned() -> None:
+    async def main() -> None:
+        buffer = AsyncMessageBuffer(
+            asyncio.get_running_loop(), persistent_messages=True
+        )
+        for message in (
+            _point_cloud("/a"),
+            _point_cloud("/a/b"),
+            _point_cloud("/ab"),
+            _point_clouds(["/a/c", "/d"]),
+            _messages.SetCameraFovMessage(1.0),
+        ):
+            buffer.push(message)
+
+        # Without consumers, the removal itself isn't kept either. Batches that
+        # are partially removed are pruned.
+        buffer.push(_messages.RemoveSceneNodeMessage("/a"))
+        remaining = list(buffer.message_from_id.values())
+        assert [m.persistent_scopes() for m in remaining] == [
+            ("/ab",),
+            ("/d",),
+            (),
+        ]
+        assert remaining[1].names == ("/d",)  # type: ignore
+
+        # Resets clear every scope, and are kept until consumers have sent them.
+        generator = buffer.window_generator(0)
+        await asyncio.wait_for(generator.__anext__(), timeout=5.0)
+        buffer.push(_messages.ResetSceneMessage())
+        assert [type(m) for m in buffer.message_from_id.values()] == [
+            _messages.SetCameraFovMessage,
+            _messages.ResetSceneMessage,
+        ]
+        await asyncio.wait_for(generator.__anext__(), timeout=5.0)
+        buffer.remove_consumer(0)
+        assert [type(m) for m in buffer.message_from_id.values()] == [
+            _messages.SetCameraFovMessage
+        ]
+
+        buffer.set_done()
+        await generator.aclose()
+
+    asyncio.run(main())
+
+
+def test_cleared_scopes_only_visit_their_subtree() -> None:
+    async def main() -> None:
+        buffer = AsyncMessageBuffer(
+            asyncio.get_running_loop(), persistent_messages=True
+        )
+        for name in ("/a", "/a/b", "/a/b/c", "/a-b", "/a0", "/ab", "/b"):
+            buffer.push(_point_cloud(name))
+        assert sorted(buffer._scope_subtree("/a")) == ["/a", "/a/b", "/a/b/c"]
+        assert sorted(buffer._scope_subtree("/a/")) == ["/a/b", "/a/b/c"]
+        assert buffer._scope_subtree("/c") == []
+        assert len(buffer._scope_subtree("")) == 7
+
+        buffer.push(_messages.RemoveSceneNodeMessage("/a"))
+        assert buffer.sorted_scopes == ["/a-b", "/a0", "/ab", "/b"]
+
+    asyncio.run(main())
+
+
+def test_removing_scene_nodes_scales_linearly() -> None:
+    async def seconds_per_removal(num_nodes: int) -> float:
+        buffer = AsyncMessageBuffer(
+            asyncio.get_running_loop(), persistent_messages=True
+        )
+        for i in range(num_nodes):
+            buffer.push(_messages.FrameMessage(f"/frame_{i}", True, 0.5, 0.025, 0.05))
+        start = time.perf_counter()
+        for i in range(num_nodes):
+            buffer.push(_messages.RemoveSceneNodeMessage(f"/frame_{i}"))
+        assert len(buffer.message_from_id) == 0
+        return (time.perf_counter() - start) / num_nodes
+
+    # Clearing a scope used to scan every indexed scope, which made removing N
+    # nodes quadratic.
+    small = asyncio.run(seconds_per_removal(1_000))
+    large = asyncio.run(seconds_per_removal(16_000))
+    assert large < 4.0 * small
+
+
+def test_replay_skips_culled_message_ids() -> None:
+    num_nodes = 10
+    messages = [
+        _messages.SetPositionMessage(f"/{i % num_nodes}", (float(i), 0.0, 0.0))
+        for i in range(10_000)
+    ]
+
+    async def main() -> None:
+        buffer = AsyncMessageBuffer(
+            asyncio.get_running_loop(), persistent_messages=True
+        )
+        for message in messages:
+            buffer.push(message)
+
+        # IDs of culled messages are compacted away.
+        assert len(buffer.live_ids) <= 2 * num_nodes + 1024 + 1
+        live_ids = list(buffer._iter_live_ids(-1))
+        assert live_ids == list(range(10_000 - num_nodes, 10_000))
+        assert list(buffer._iter_live_ids(9_995)) == live_ids[-4:]
+
+        generator = buffer.window_generator(0)
+        window = await asyncio.wait_for(generator.__anext__(), timeout=5.0)
+        assert list(window.messages) == messages[-num_nodes:]
+        assert window.last_id == 9_999
+
+        buffer.set_done()
+        await generator.aclose()
+
+    asyncio.run(main())
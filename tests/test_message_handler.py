@@ -0,0 +1,81 @@
+"""Tests for queueing outgoing messages from multiple threads."""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from viser import _messages
+from viser.infra import Message, WebsockMessageHandler
+
+
+class _RecordingHandler(WebsockMessageHandler):
+    def __init__(self) -> None:
+        super().__init__(ThreadPoolExecutor(max_workers=1))
+        self.sent: List[Message] = []
+
+    def unsafe_send_message(self, message: Message) -> None:
+        self.sent.append(message)
+
+
+def _position(name: str, x: float) -> _messages.SetPositionMessage:
+    return _messages.SetPositionMessage(name, (x, 0.0, 0.0))
+
+
+def test_messages_queued_during_atomic_blocks_keep_their_order() -> None:
+    handler = _RecordingHandler()
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold_lock() -> None:
+        with handler.atomic():
+            handler.queue_message(_position("/atomic", 0.0))
+            entered.set()
+            release.wait()
+            handler.queue_message(_position("/atomic", 1.0))
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    entered.wait()
+
+    # Queueing doesn't block while another thread holds the lock.
+    queued = [_position("/queued", float(i)) for i in range(3)]
+    for message in queued:
+        handler.queue_message(message)
+    assert len(handler.sent) == 1
+
+    release.set()
+    thread.join()
+    assert [message.name for message in handler.sent] == ["/atomic"] * 2 + [  # type: ignore
+        "/queued"
+    ] * 3
+    assert handler.sent[2:] == queued
+
+
+def test_messages_from_many_threads_keep_per_thread_order() -> None:
+    handler = _RecordingHandler()
+    num_threads = 8
+    num_messages = 500
+
+    def produce(thread_index: int) -> None:
+        for i in range(num_messages):
+            if i % 50 == 0:
+                with handler.atomic():
+                    handler.queue_message(_position(f"/{thread_index}", float(i)))
+            else:
+                handler.queue_message(_position(f"/{thread_index}", float(i)))
+
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for thread_index in range(num_threads):
+        sent = [
+            message.position[0]  # type: ignore
+            for message in handler.sent
+            if message.name == f"/{thread_index}"  # type: ignore
+        ]
+        assert sent == [float(i) for i in range(num_messages)]
@@ -0,0 +1,66 @@
+"""Tests for decoding incoming messages."""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+import msgspec
+
+from viser import _messages
+
+
+def _encode(mapping: Dict[str, Any]) -> bytes:
+    return msgspec.msgpack.encode(mapping)
+
+
+def test_typed_decoding_matches_reflective_decoding() -> None:
+    camera = _messages.ViewerCameraMessage(
+        wxyz=(1.0, 0.0, 0.0, 0.0),
+        position=(1.0, 2.0, 3.0),
+        fov=1.0,
+        aspect=1.5,
+        look_at=(0.0, 0.0, 0.0),
+        up_direction=(0.0, 0.0, 1.0),
+    )
+    update = _messages.GuiUpdateMessage("slider", {"value": (1.0, (2, 3))})
+    for message in (camera, update):
+        payload = _encode(message.as_serializable_dict())
+        decoded = _messages.Message.deserialize(payload)
+        assert decoded == message
+        assert decoded == _messages.Message._deserialize_reflective(payload)
+
+    # Clients can send whole numbers as integers.
+    mapping = camera.as_serializable_dict()
+    mapping["fov"] = 1
+    decoded = _messages.Message.deserialize(_encode(mapping))
+    assert isinstance(decoded, _messages.ViewerCameraMessage)
+    assert decoded.fov == 1.0 and isinstance(decoded.fov, float)
+
+
+def test_binary_fields_are_decoded_without_copies() -> None:
+    content = bytes(range(256)) * 16
+    payload = _encode(
+        _messages.FileTransferPart(
+            source_component_id=None,
+            transfer_uuid="uuid",
+            part=0,
+            content=content,
+        ).as_serializable_dict()
+    )
+    decoded = _messages.Message.deserialize(payload)
+    assert isinstance(decoded, _messages.FileTransferPart)
+    assert isinstance(decoded.content, memoryview)
+    assert decoded.content.obj is payload
+    assert bytes(decoded.content) == content
+
+
+def test_invalid_messages_fall_back_to_reflective_decoding() -> None:
+    # A GUI update with a number where a string is expected.
+    mapping = _messages.GuiUpdateMessage(
+        "slider", {"value": 1.0}
+    ).as_serializable_dict()
+    mapping["id"] = 5
+    payload = _encode(mapping)
+    decoded = _messages.Message.deserialize(payload)
+    assert decoded == _messages.Message._deserialize_reflective(payload)
+    assert decoded.id == 5  # type: ignore
@@ -0,0 +1,434 @@
+"""Tests for the messages that the scene API queues."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Callable, List
+
+import numpy as onp
+import pytest
+
+import viser
+import viser._scene_api
+from viser import _messages, infra
+from viser.infra import Message
+
+
+def _buffered_messages(server: viser.ViserServer) -> List[Message]:
+    buffer = server._websock_server._broadcast_buffer
+    with buffer.buffer_lock:
+        return list(buffer.message_from_id.values())
+
+
+def _add_point_cloud(
+    server: viser.ViserServer, num_points: int
+) -> viser.PointCloudHandle:
+    return server.scene.add_point_cloud(
+        "/a",
+        points=onp.random.uniform(size=(num_points, 3)).astype(onp.float32),
+        colors=(255, 0, 0),
+    )
+
+
+def test_streamed_scene_nodes_replace_each_other(
+    server: viser.ViserServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(viser._scene_api, "_CHUNKED_TRANSFER_MIN_BYTES", 1000)
+    monkeypatch.setattr(viser._scene_api, "_CHUNKED_TRANSFER_PART_BYTES", 1000)
+
+    # Small, then streamed in parts.
+    _add_point_cloud(server, 10)
+    _add_point_cloud(server, 500)
+    messages = _buffered_messages(server)
+    assert not any(isinstance(m, _messages.PointCloudMessage) for m in messages)
+    starts = [m for m in messages if isinstance(m, _messages.SceneNodeTransferStart)]
+    assert len(starts) == 1
+    parts = [m for m in messages if isinstance(m, _messages.SceneNodeTransferPart)]
+    assert len(parts) == starts[0].part_count > 1
+
+    # Streamed with fewer parts. Leftover parts are overwritten with empty ones.
+    _add_point_cloud(server, 10)
+    messages = _buffered_messages(server)
+    starts = [m for m in messages if isinstance(m, _messages.SceneNodeTransferStart)]
+    assert len(starts) == 1
+    parts = [m for m in messages if isinstance(m, _messages.SceneNodeTransferPart)]
+    assert all(
+        part.transfer_uuid == starts[0].transfer_uuid or part.content.size == 0
+        for part in parts
+    )
+
+    # Once the scene node is removed, it's no longer streamed.
+    _add_point_cloud(server, 10).remove()
+    _add_point_cloud(server, 10)
+    messages = _buffered_messages(server)
+    assert [type(m) for m in messages if m.persistent_scopes() == ("/a",)] == [
+        _messages.PointCloudMessage,
+        _messages.SetOrientationMessage,
+        _messages.SetPositionMessage,
+        _messages.SetSceneNodeVisibilityMessage,
+    ]
+
+
+def test_bulk_pose_updates_are_atomic(
+    server: viser.ViserServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    websock_server = server._websock_server
+    queue_message = websock_server.queue_message
+    in_atomic_block: List[bool] = []
+
+    def record_queue_message(message: Message) -> None:
+        in_atomic_block.append(
+            websock_server._locked_thread_id == threading.get_ident()
+        )
+        queue_message(message)
+
+    monkeypatch.setattr(websock_server, "queue_message", record_queue_message)
+    server.scene.set_poses(
+        ["/a", "/b"], wxyzs=(1.0, 0.0, 0.0, 0.0), positions=onp.zeros((2, 3))
+    )
+    assert in_atomic_block == [True, True]
+
+
+def test_bulk_updates_keep_world_axes_across_resets(server: viser.ViserServer) -> None:
+    server.scene.set_poses(
+        ["/a", "/WorldAxes"], wxyzs=(1.0, 0.0, 0.0, 0.0), positions=onp.ones((2, 3))
+    )
+    server.scene.set_visibility(["/WorldAxes", "/a"], True)
+    server.scene.reset()
+    scopes_from_type = {
+        type(m): m.persistent_scopes() for m in _buffered_messages(server)
+    }
+    assert scopes_from_type[_messages.SetPositionMessage] == ()
+    assert scopes_from_type[_messages.SetOrientationMessage] == ()
+    assert scopes_from_type[_messages.SetSceneNodeVisibilityMessage] == ()
+    assert _messages.SetPositionsMessage not in scopes_from_type
+    assert _messages.SetSceneNodeVisibilitiesMessage not in scopes_from_type
+    assert onp.all(server.scene.world_axes.position == 1.0)
+    assert server.scene.world_axes.visible
+
+
+def _connect_client(server: viser.ViserServer, run: Callable[[], None]) -> None:
+    """Connect a headless client, then call `run()` while it's connected."""
+
+    async def main() -> None:
+        async with infra.WebsockClient(
+            f"ws://127.0.0.1:{server.get_port()}", _messages.Message
+        ) as client:
+            await client.send(
+                _messages.ViewerCameraMessage(
+                    wxyz=(1.0, 0.0, 0.0, 0.0),
+                    position=(0.0, 0.0, -5.0),
+                    fov=1.0,
+                    aspect=1.0,
+                    look_at=(0.0, 0.0, 0.0),
+                    up_direction=(0.0, -1.0, 0.0),
+                )
+            )
+            for _ in range(100):
+                if len(server.get_clients()) > 0:
+                    break
+                await asyncio.sleep(0.05)
+            await asyncio.get_running_loop().run_in_executor(None, run)
+
+    asyncio.run(main())
+
+
+def test_point_cloud_lod_releases_callbacks(server: viser.ViserServer) -> None:
+    def run() -> None:
+        (client,) = server.get_clients().values()
+        num_connect_cb = len(server._client_connect_cb)
+        num_camera_cb = len(client.camera._state.camera_cb)
+        handle = server.scene.add_point_cloud_lod(
+            "/lod",
+            onp.random.uniform(size=(10_000, 3)).astype(onp.float32),
+            colors=(255, 0, 0),
+            points_per_node=100,
+            initial_points=1000,
+        )
+        assert len(server._client_connect_cb) == num_connect_cb + 1
+        assert len(client.camera._state.camera_cb) == num_camera_cb + 1
+
+        handle.remove()
+        assert len(server._client_connect_cb) == num_connect_cb
+        assert len(server._client_disconnect_cb) == num_connect_cb
+        assert len(client.camera._state.camera_cb) == num_camera_cb
+
+    _connect_client(server, run)
+
+
+def test_point_cloud_lod_merges_camera_updates(
+    server: viser.ViserServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def run() -> None:
+        (client,) = server.get_clients().values()
+        handle = server.scene.add_point_cloud_lod(
+            "/lod",
+            onp.random.uniform(size=(10_000, 3)).astype(onp.float32),
+            colors=(255, 0, 0),
+            points_per_node=100,
+            initial_points=1000,
+        )
+        time.sleep(0.5)
+        assert len(handle._impl_aux.refining_client_ids) == 0
+
+        refine_nodes = handle._refine_nodes
+        num_refines = 0
+
+        def count_refine_nodes(client: viser.ClientHandle) -> None:
+            nonlocal num_refines
+            num_refines += 1
+            refine_nodes(client)
+
+        monkeypatch.setattr(handle, "_refine_nodes", count_refine_nodes)
+        for _ in range(50):
+            handle._on_camera_update(client.camera)
+        time.sleep(0.5)
+
+        # One refinement right away, and one for the updates in the meantime.
+        assert num_refines == 2
+        assert len(handle._impl_aux.refining_client_ids) == 0
+        handle.remove()
+
+    _connect_client(server, run)
+
+
+def test_point_cloud_updates_send_changed_rows(server: viser.ViserServer) -> None:
+    points = onp.random.uniform(size=(100, 3)).astype(onp.float32)
+    handle = server.scene.add_point_cloud("/a", points=points, colors=(255, 0, 0))
+
+    def last_update() -> _messages.SceneNodeArrayUpdateMessage:
+        return [
+            m
+            for m in _buffered_messages(server)
+            if isinstance(m, _messages.SceneNodeArrayUpdateMessage)
+        ][-1]
+
+    # Unchanged arrays aren't sent.
+    handle.points = points.copy()
+    assert not any(
+        isinstance(m, _messages.SceneNodeArrayUpdateMessage)
+        for m in _buffered_messages(server)
+    )
+
+    # Nearby rows are sent as a range.
+    points = points.copy()
+    points[10:12] += 1.0
+    handle.points = points
+    message = last_update()
+    assert not message.full and message.row_indices is None
+    assert message.start_row == 10
+    assert onp.array_equal(message.values, points[10:12])
+
+    # Partial updates include every row changed since the last full update. Rows
+    # that are far apart are sent sparsely.
+    points = points.copy()
+    points[90] += 1.0
+    handle.points = points
+    message = last_update()
+    assert not message.full and message.row_indices is not None
+    assert list(message.row_indices) == [10, 11, 90]
+    assert onp.array_equal(message.values, points[[10, 11, 90]])
+
+    # Large changes are sent in full.
+    points = points + 1.0
+    handle.points = points
+    message = last_update()
+    assert message.full
+    assert onp.array_equal(message.values, points)
+    assert onp.array_equal(handle.points, points)
+
+
+def test_in_place_array_updates_are_sent(server: viser.ViserServer) -> None:
+    points = onp.zeros((10, 3), dtype=onp.float32)
+    handle = server.scene.add_point_cloud("/a", points=points, colors=(255, 0, 0))
+    (added,) = [
+        m
+        for m in _buffered_messages(server)
+        if isinstance(m, _messages.PointCloudMessage)
+    ]
+
+    # Mutating the array we get back shouldn't touch the buffered message, and
+    # assigning it back should send the change.
+    mutated = handle.points
+    mutated[0] = 5.0
+    handle.points = mutated
+    assert onp.array_equal(added.points, onp.zeros_like(points))
+    (update,) = [
+        m
+        for m in _buffered_messages(server)
+        if isinstance(m, _messages.SceneNodeArrayUpdateMessage)
+    ]
+    assert update.start_row == 0
+    assert onp.array_equal(update.values, [[5.0, 5.0, 5.0]])
+
+    # Same for meshes.
+    vertices = onp.zeros((3, 3), dtype=onp.float32)
+    mesh = server.scene.add_mesh_simple(
+        "/mesh", vertices=vertices, faces=onp.array([[0, 1, 2]], dtype=onp.uint32)
+    )
+    mutated = mesh.vertices
+    mutated[1] = 1.0
+    mesh.vertices = mutated
+    assert onp.array_equal(mesh.vertices, mutated)
+    assert any(
+        isinstance(m, _messages.SceneNodeArrayUpdateMessage) and m.name == "/mesh"
+        for m in _buffered_messages(server)
+    )
+
+
+def test_compact_point_cloud_encodings(server: viser.ViserServer) -> None:
+    rng = onp.random.default_rng(0)
+    points = rng.uniform(-5.0, 5.0, size=(1000, 3)).astype(onp.float32)
+    palette = rng.integers(0, 256, size=(16, 3), dtype=onp.uint8)
+    colors = palette[rng.integers(0, 16, size=1000)]
+
+    def last_point_cloud() -> _messages.PointCloudMessage:
+        return [
+            m
+            for m in _buffered_messages(server)
+            if isinstance(m, _messages.PointCloudMessage)
+        ][-1]
+
+    server.scene.add_point_cloud(
+        "/a", points, colors, position_precision="float16", color_palette=True
+    )
+    message = last_point_cloud()
+    assert message.points.dtype == onp.float16
+    assert onp.allclose(message.points.astype(onp.float32), points, atol=1e-2)
+    assert message.colors.shape == (1000,) and message.colors.dtype == onp.uint8
+    assert message.color_palette is not None
+    assert onp.array_equal(message.color_palette[message.colors], colors)
+
+    # Quantized positions are relative to the bounding box of the points.
+    server.scene.add_point_cloud("/a", points, colors, position_precision="int16")
+    message = last_point_cloud()
+    assert message.points.dtype == onp.int16 and message.points_bbox is not None
+    bbox_min = onp.array(message.points_bbox[:3])
+    bbox_max = onp.array(message.points_bbox[3:])
+    decoded = (message.points.astype(onp.float64) + 32768.0) / 65535.0 * (
+        bbox_max - bbox_min
+    ) + bbox_min
+    assert onp.allclose(decoded, points, atol=1e-3)
+    assert message.color_palette is None
+    assert onp.array_equal(message.colors, colors)
+
+    # A single color isn't tiled on the server.
+    server.scene.add_point_cloud("/a", points, (255, 0, 0))
+    assert last_point_cloud().colors.shape == (3,)
+
+
+def test_batched_scene_nodes(server: viser.ViserServer) -> None:
+    names = [f"/frames/{i}" for i in range(5)]
+    positions = onp.arange(15, dtype=onp.float32).reshape((5, 3))
+    frames = server.scene.add_frames(names, positions=positions)
+    server.scene.add_point_clouds(
+        [f"{name}/points" for name in names],
+        points=[onp.zeros((i + 1, 3), dtype=onp.float32) for i in range(5)],
+        colors=(255, 0, 0),
+    )
+
+    # Each batch is sent as a single message, with poses included.
+    messages = [m for m in _buffered_messages(server) if m.persistent_scopes() != ()]
+    assert [type(m) for m in messages] == [
+        _messages.FramesMessage,
+        _messages.PointCloudsMessage,
+    ]
+    assert messages[0].persistent_scopes() == tuple(names)
+    assert onp.array_equal(messages[0].positions, positions)  # type: ignore
+    assert list(messages[1].point_counts) == [1, 2, 3, 4, 5]  # type: ignore
+
+    # Nodes can be indexed, and state is shared with the batch.
+    assert len(frames) == 5
+    assert isinstance(frames[1], viser.FrameHandle)
+    assert onp.array_equal(frames[1].position, positions[1])
+    frames[1].position = (0.0, 0.0, 0.0)
+    assert onp.array_equal(frames.positions[1], (0.0, 0.0, 0.0))
+
+    # Only changed nodes are sent.
+    new_positions = frames.positions
+    new_positions[3] += 1.0
+    frames.positions = new_positions
+    (update,) = [
+        m
+        for m in _buffered_messages(server)
+        if isinstance(m, _messages.SetPositionsMessage)
+    ]
+    assert update.names == (names[3],)
+    assert onp.array_equal(update.positions, new_positions[3:4])
+
+
+def test_timeline_playback(server: viser.ViserServer) -> None:
+    frame_names = [f"/timeline/t{i}" for i in range(5)]
+    timeline = server.scene.add_timeline("/timeline", frame_names, fps=10.0)
+
+    def playback() -> _messages.TimelinePlaybackMessage:
+        (message,) = [
+            m
+            for m in _buffered_messages(server)
+            if isinstance(m, _messages.TimelinePlaybackMessage)
+        ]
+        return message
+
+    assert not playback().playing and playback().frame == 0
+
+    # Frames are advanced by clients; the server only estimates them.
+    timeline.play()
+    assert playback().playing
+    timeline._impl_aux.frame_time -= 0.65
+    assert timeline.frame == 6 % 5
+
+    # Changes restart playback from the current frame.
+    timeline.loop = False
+    assert playback().frame == 1 and not playback().loop
+    timeline._impl_aux.frame_time -= 10.0
+    assert timeline.frame == 4
+
+    timeline.frame = -2
+    timeline.pause()
+    message = playback()
+    assert message.frame == 3 and not message.playing
+    assert message.name == "/timeline"
+
+    # Removing the timeline drops its messages for new clients.
+    timeline.remove()
+    assert not any(
+        isinstance(m, (_messages.TimelineMessage, _messages.TimelinePlaybackMessage))
+        for m in _buffered_messages(server)
+    )
+
+
+def test_camera_aware_streaming_ranks_visible_geometry_first() -> None:
+    server = viser.ViserServer(
+        host="127.0.0.1", port=8106, verbose=False, camera_aware_streaming=True
+    )
+
+    def run() -> None:
+        # The client's camera is at (0, 0, -5), looking along +z.
+        (client_id,) = server.get_clients().keys()
+        points = onp.random.uniform(-0.5, 0.5, size=(100, 3)).astype(onp.float32)
+        for name, position in (
+            ("/near", (0.0, 0.0, 0.0)),
+            ("/far", (0.0, 0.0, 30.0)),
+            ("/behind", (0.0, 0.0, -10.0)),
+        ):
+            server.scene.add_point_cloud(name, points, (255, 0, 0), position=position)
+
+        rank_from_name = {
+            message.name: server._rank_bulk_message(client_id, message)
+            for message in _buffered_messages(server)
+            if isinstance(message, _messages.PointCloudMessage)
+        }
+        assert rank_from_name["/near"] > rank_from_name["/far"] > 1.0
+        assert rank_from_name["/behind"] < 1.0
+
+        # Messages that aren't scene geometry aren't deferred.
+        assert server._rank_bulk_message(
+            client_id, _messages.SetCameraFovMessage(1.0)
+        ) == float("inf")
+
+    try:
+        _connect_client(server, run)
+    finally:
+        server.stop()
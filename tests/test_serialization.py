@@ -0,0 +1,97 @@
+"""Tests for serializing windows of outgoing messages."""
+
+from __future__ import annotations
+
+from typing import List, Sequence
+
+import numpy as onp
+
+import viser
+from viser import _messages
+from viser.infra import Message
+from viser.infra._serialization import Fragment, encode_window
+
+
+def _messages_with_arrays() -> List[Message]:
+    rng = onp.random.default_rng(0)
+    return [
+        _messages.SetPositionMessage("/a", (1.0, 2.0, 3.0)),
+        _messages.PointCloudMessage(
+            "/b",
+            points=rng.normal(size=(10_000, 3)).astype(onp.float32),
+            colors=rng.integers(0, 256, size=(10_000, 3), dtype=onp.uint8),
+            point_size=0.1,
+            point_ball_norm=2.0,
+            precision="float32",
+            points_bbox=None,
+            color_palette=None,
+        ),
+        _messages.SetCameraFovMessage(1.0),
+    ]
+
+
+def _join(fragments: Sequence[Fragment]) -> bytes:
+    return b"".join(bytes(fragment) for fragment in fragments)
+
+
+def test_zero_copy_fragments_match_default_encoding() -> None:
+    messages = _messages_with_arrays()
+    points = messages[1].points  # type: ignore
+    for client_api_version in (0, 1):
+        default_nbytes: List[int] = []
+        default = encode_window(
+            messages, client_api_version, message_nbytes=default_nbytes
+        )
+        zero_copy_nbytes: List[int] = []
+        zero_copy = encode_window(
+            messages,
+            client_api_version,
+            zero_copy_min_bytes=1024,
+            message_nbytes=zero_copy_nbytes,
+        )
+
+        # Clients receive the same bytes, and metrics see the same sizes.
+        assert [_join(fragments) for fragments in zero_copy] == [
+            _join(fragments) for fragments in default
+        ]
+        assert zero_copy_nbytes == default_nbytes
+
+        # Large arrays are sent as fragments that reference the original memory.
+        assert any(
+            isinstance(fragment, memoryview)
+            and onp.shares_memory(onp.frombuffer(fragment, dtype=onp.uint8), points)
+            for fragments in zero_copy
+            for fragment in fragments
+        )
+
+
+def test_compiled_serializers_match_reflective_serializers(
+    server: viser.ViserServer,
+) -> None:
+    server.scene.add_frame("/frame", wxyz=(0.0, 1.0, 0.0, 0.0))
+    server.scene.add_point_cloud(
+        "/points", onp.zeros((10, 3), dtype=onp.float32), (1.0, 0.5, 0.0)
+    )
+    server.scene.add_label("/label", "hello")
+    server.scene.add_icosphere("/sphere", radius=0.5, color=(255, 0, 0))
+    server.gui.add_slider("Slider", 0.0, 1.0, 0.1, 0.5)
+    server.gui.add_dropdown("Dropdown", ("a", "b"))
+    server.gui.add_button("Button").disabled = True
+
+    buffer = server._websock_server._broadcast_buffer
+    with buffer.buffer_lock:
+        messages = list(buffer.message_from_id.values())
+    assert len({type(message) for message in messages}) > 10
+    for message in messages:
+        assert (
+            message.as_serializable_dict() == message._as_serializable_dict_reflective()
+        )
+
+        # Default redundancy keys are built from the type name and name or ID.
+        if type(message).redundancy_key is _messages.Message.redundancy_key:
+            parts = [type(message).__name__] + [
+                getattr(message, k)
+                for k in ("name", "id")
+                if getattr(message, k, None) is not None
+            ]
+            assert message.redundancy_key() == "_".join(parts)
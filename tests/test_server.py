@@ -0,0 +1,156 @@
+"""End-to-end tests for the websocket server, using the headless client."""
+
+from __future__ import annotations
+
+import asyncio
+import urllib.request
+from typing import List
+
+import imageio.v3 as iio
+import numpy as onp
+import pytest
+
+import viser
+from viser import _messages, infra
+
+
+def _url(server: viser.ViserServer) -> str:
+    return f"ws://127.0.0.1:{server.get_port()}"
+
+
+def test_serialization_workers_keep_message_order() -> None:
+    server = viser.ViserServer(
+        host="127.0.0.1", port=8103, verbose=False, serialization_workers=2
+    )
+    try:
+        for i in range(50):
+            server.scene.add_frame(f"/frame_{i}")
+        received: List[float] = []
+
+        async def main() -> None:
+            async with infra.WebsockClient(_url(server), _messages.Message) as client:
+                client.register_handler(
+                    _messages.SetPositionMessage,
+                    lambda message: received.append(message.position[0]),
+                )
+                await client.wait_for_idle(0.5)
+                assert {f"/frame_{i}" for i in range(50)} <= {
+                    scope
+                    for message in client.mirrored_messages
+                    for scope in message.persistent_scopes()
+                }
+
+                received.clear()
+                frame = server.scene.add_frame("/moving")
+                for i in range(200):
+                    frame.position = (float(i), 0.0, 0.0)
+                    await asyncio.sleep(0.0)
+                await asyncio.sleep(0.5)
+                await client.wait_for_idle(0.5)
+
+        asyncio.run(main())
+    finally:
+        server.stop()
+
+    # Windows are serialized in parallel, but still arrive in order.
+    assert received == sorted(received)
+    assert received[-1] == 199.0
+
+
+def test_metrics_report_sends_and_encoded_messages() -> None:
+    server = viser.ViserServer(
+        host="127.0.0.1", port=8104, verbose=False, metrics_path="/metrics"
+    )
+    try:
+        server.scene.add_frame("/frame")
+
+        async def main() -> None:
+            async with infra.WebsockClient(_url(server), _messages.Message) as client:
+                await client.wait_for_idle(0.5)
+                server.scene.add_frame("/other")
+                await asyncio.sleep(0.5)
+                await client.wait_for_idle(0.5)
+
+                metrics = server.get_metrics()
+                (client_metrics,) = metrics.clients.values()
+                assert client_metrics.windows_sent > 0
+                assert client_metrics.bytes_sent >= client.bytes_received
+                assert client_metrics.queue_depth == 0
+                assert metrics.message_types["FrameMessage"].messages_encoded >= 1
+                assert metrics.persistent_messages > 0
+
+                # Metrics are also served in the Prometheus text format.
+                url = f"http://127.0.0.1:{server.get_port()}/metrics"
+                text = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: urllib.request.urlopen(url).read().decode()
+                )
+                metric = 'viser_encoded_messages_total{message_type="FrameMessage"}'
+                assert metric in text
+
+        asyncio.run(main())
+    finally:
+        server.stop()
+
+
+def test_degraded_messages_are_shared_and_kept_off_the_event_loop(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    degrade = _messages.CameraFrustumMessage.degrade
+    calls_from_loop: List[bool] = []
+
+    def counting_degrade(
+        self: _messages.CameraFrustumMessage,
+    ) -> _messages.CameraFrustumMessage:
+        try:
+            asyncio.get_running_loop()
+            calls_from_loop.append(True)
+        except RuntimeError:
+            calls_from_loop.append(False)
+        return degrade(self)
+
+    monkeypatch.setattr(_messages.CameraFrustumMessage, "degrade", counting_degrade)
+
+    # Without any allowed lag, every client is slow as soon as messages are queued.
+    server = viser.ViserServer(
+        host="127.0.0.1",
+        port=8107,
+        verbose=False,
+        slow_client_policy=infra.SlowClientPolicy(action="degrade", max_message_lag=0),
+    )
+    try:
+        received: List[_messages.CameraFrustumMessage] = []
+
+        async def main() -> None:
+            clients = [
+                infra.WebsockClient(_url(server), _messages.Message, mirror=False)
+                for _ in range(3)
+            ]
+            for client in clients:
+                client.register_handler(_messages.CameraFrustumMessage, received.append)
+                await client.connect()
+            await asyncio.sleep(0.5)
+            for client in clients:
+                await client.wait_for_idle(0.5)
+
+            server.scene.add_camera_frustum(
+                "/frustum",
+                fov=1.0,
+                aspect=1.0,
+                image=onp.zeros((64, 64, 3), dtype=onp.uint8),
+            )
+            await asyncio.sleep(0.5)
+            for client in clients:
+                await client.wait_for_idle(0.5)
+                await client.close()
+
+        asyncio.run(main())
+    finally:
+        server.stop()
+
+    # Each client gets the half-resolution image, which is only encoded once.
+    assert len(received) == 3
+    for message in received:
+        assert message.image_binary is not None
+        image = iio.imread(message.image_binary, extension=".jpeg")
+        assert image.shape[:2] == (32, 32)
+    assert calls_from_loop == [False]
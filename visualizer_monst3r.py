@@ -96,40 +96,36 @@ def main(
         gui_timestep.disabled = gui_playing.value or gui_show_all_frames.value
         gui_next_frame.disabled = gui_playing.value or gui_show_all_frames.value
         gui_prev_frame.disabled = gui_playing.value or gui_show_all_frames.value
+        timeline.playing = gui_playing.value
 
-    # Toggle frame visibility when the timestep slider changes.
+    # Frames are advanced by the viewer while playing, so the timestep slider
+    # only seeks when we're paused.
     @gui_timestep.on_update
     def _(_) -> None:
-        nonlocal prev_timestep
-        current_timestep = gui_timestep.value
-        if not gui_show_all_frames.value:
-            with server.atomic():
-                frame_nodes[current_timestep].visible = True
-                frame_nodes[prev_timestep].visible = False
-        prev_timestep = current_timestep
-        server.flush()  # Optional!
+        if not gui_playing.value:
+            timeline.frame = gui_timestep.value
+
+    @gui_framerate.on_update
+    def _(_) -> None:
+        timeline.fps = gui_framerate.value
 
     # Show or hide all frames based on the checkbox.
     @gui_show_all_frames.on_update
     def _(_) -> None:
         gui_stride.disabled = not gui_show_all_frames.value  # Enable/disable stride slider
+        timeline.show_all = gui_show_all_frames.value
         if gui_show_all_frames.value:
             # Show frames with stride
             stride = gui_stride.value
-            with server.atomic():
-                for i, frame_node in enumerate(frame_nodes):
-                    frame_node.visible = (i % stride == 0)
+            frame_nodes.visible = onp.arange(num_frames) % stride == 0
             # Disable playback controls
             gui_playing.disabled = True
             gui_timestep.disabled = True
             gui_next_frame.disabled = True
             gui_prev_frame.disabled = True
         else:
-            # Show only the current frame
-            current_timestep = gui_timestep.value
-            with server.atomic():
-                for i, frame_node in enumerate(frame_nodes):
-                    frame_node.visible = i == current_timestep
+            # The timeline shows only the current frame
+            frame_nodes.visible = True
             # Re-enable playback controls
             gui_playing.disabled = False
             gui_timestep.disabled = gui_playing.value
@@ -142,9 +138,7 @@ def main(
         if gui_show_all_frames.value:
             # Update frame visibility based on new stride
             stride = gui_stride.value
-            with server.atomic():
-                for i, frame_node in enumerate(frame_nodes):
-                    frame_node.visible = (i % stride == 0)
+            frame_nodes.visible = onp.arange(num_frames) % stride == 0
 
     # Recording handler
     @gui_record_scene.on_click
@@ -152,14 +146,11 @@ def main(
         gui_record_scene.disabled = True
 
         # Save the original frame visibility state
-        original_visibility = [frame_node.visible for frame_node in frame_nodes]
+        original_visibility = frame_nodes.visible
 
         rec = server._start_scene_recording()
         rec.set_loop_start()
         
-        # Determine sleep duration based on current FPS
-        sleep_duration = 1.0 / gui_framerate.value if gui_framerate.value > 0 else 0.033  # Default to ~30 FPS
-        
         if gui_show_all_frames.value:
             # Record all frames according to the stride
             stride = gui_stride.value
@@ -167,19 +158,16 @@ def main(
         else:
             # Record the frames in sequence
             frames_to_record = range(num_frames)
-        
-        for t in frames_to_record:
-            # Update the scene to show frame t
-            with server.atomic():
-                for i, frame_node in enumerate(frame_nodes):
-                    frame_node.visible = (i == t) if not gui_show_all_frames.value else (i % gui_stride.value == 0)
-            server.flush()
-            rec.insert_sleep(sleep_duration)
+
+        # The viewer advances the timeline itself, so we only record the
+        # command to start playback, followed by one pass through the frames.
+        timeline.frame = 0
+        timeline.playing = not gui_show_all_frames.value
+        server.flush()
+        rec.insert_sleep(len(frames_to_record) / gui_framerate.value)
 
         # set all invisible
-        with server.atomic():
-            for frame_node in frame_nodes:
-                frame_node.visible = False
+        frame_nodes.visible = False
         
         # Finish recording
         bs = rec.end_and_serialize()
@@ -191,81 +179,94 @@ def main(
         output_path.write_bytes(bs)
         print(f"Recording saved to {output_path.resolve()}")
         
-        # Restore the original frame visibility state
-        with server.atomic():
-            for frame_node, visibility in zip(frame_nodes, original_visibility):
-                frame_node.visible = visibility
+        # Restore the original frame visibility and playback state
+        frame_nodes.visible = original_visibility
+        timeline.playing = gui_playing.value
+        if not gui_playing.value:
+            timeline.frame = gui_timestep.value
         server.flush()
         
         gui_record_scene.disabled = False
 
-    # Load in frames.
-    server.scene.add_frame(
+    # Load in frames. The timeline shows one frame at a time, and is played back
+    # by the viewer at the requested FPS.
+    frame_names = [f"/frames/t{i}" for i in range(num_frames)]
+    timeline = server.scene.add_timeline(
         "/frames",
+        frame_names,
+        fps=gui_framerate.value,
+        playing=gui_playing.value,
+        frame=gui_timestep.value,
+        show_all=gui_show_all_frames.value,
         wxyz=tf.SO3.exp(onp.array([onp.pi / 2.0, 0.0, 0.0])).wxyz,
         position=(0, 0, 0),
-        show_axes=False,
     )
-    frame_nodes: list[viser.FrameHandle] = []
     bg_positions = []
     bg_colors = []
+    frame_positions = []
+    frame_colors = []
+    frustum_fovs = []
+    frustum_aspects = []
+    frustum_images = []
+    frustum_wxyzs = []
+    frustum_positions = []
     for i in tqdm(range(num_frames)):
         frame = loader.get_frame(i)
         position, color, bg_position, bg_color = frame.get_point_cloud(downsample_factor, bg_downsample_factor)
 
         bg_positions.append(bg_position)
         bg_colors.append(bg_color)
+        frame_positions.append(position)
+        frame_colors.append(color)
 
-        # Add base frame.
-        frame_nodes.append(server.scene.add_frame(f"/frames/t{i}", show_axes=False))
+        frustum_fovs.append(2 * onp.arctan2(frame.rgb.shape[0] / 2, frame.K[0, 0]))
+        frustum_aspects.append(frame.rgb.shape[1] / frame.rgb.shape[0])
+        frustum_images.append(frame.rgb[::downsample_factor, ::downsample_factor])
+        frustum_wxyzs.append(tf.SO3.from_matrix(frame.T_world_camera[:3, :3]).wxyz)
+        frustum_positions.append(frame.T_world_camera[:3, 3])
 
-        # Place the point cloud in the frame.
-        server.scene.add_point_cloud(
-            name=f"/frames/t{i}/point_cloud",
-            points=position,
-            colors=color,
-            point_size=point_size,
-            point_shape="rounded",
-        )
+    # Add all frames at once. Each batch is sent to clients as a single message.
+    frame_nodes = server.scene.add_frames(frame_names, show_axes=False)
 
-        # Compute color for frustum based on frame index.
-        norm_i = i / (num_frames - 1) if num_frames > 1 else 0  # Normalize index to [0, 1]
-        color_rgba = cm.viridis(norm_i)  # Get RGBA color from colormap
-        color_rgb = color_rgba[:3]  # Use RGB components
-
-        # Place the frustum with the computed color.
-        fov = 2 * onp.arctan2(frame.rgb.shape[0] / 2, frame.K[0, 0])
-        aspect = frame.rgb.shape[1] / frame.rgb.shape[0]
-        server.scene.add_camera_frustum(
-            f"/frames/t{i}/frustum",
-            fov=fov,
-            aspect=aspect,
-            scale=camera_frustum_scale,
-            image=frame.rgb[::downsample_factor, ::downsample_factor],
-            wxyz=tf.SO3.from_matrix(frame.T_world_camera[:3, :3]).wxyz,
-            position=frame.T_world_camera[:3, 3],
-            color=color_rgb,  # Set the color for the frustum
-            thickness=cam_thickness,
-        )
+    # Place the point clouds in the frames.
+    server.scene.add_point_clouds(
+        [f"{name}/point_cloud" for name in frame_names],
+        points=frame_positions,
+        colors=frame_colors,
+        point_size=point_size,
+        point_shape="rounded",
+    )
 
-        # Add some axes.
-        server.scene.add_frame(
-            f"/frames/t{i}/frustum/axes",
-            axes_length=camera_frustum_scale * axes_scale * 10,
-            axes_radius=camera_frustum_scale * axes_scale,
-        )
+    # Place the frustums, with colors based on frame index.
+    norm_i = onp.arange(num_frames) / (num_frames - 1) if num_frames > 1 else onp.zeros(1)  # Normalize index to [0, 1]
+    server.scene.add_camera_frustums(
+        [f"{name}/frustum" for name in frame_names],
+        fovs=onp.array(frustum_fovs),
+        aspects=onp.array(frustum_aspects),
+        scale=camera_frustum_scale,
+        images=frustum_images,
+        wxyzs=onp.array(frustum_wxyzs),
+        positions=onp.array(frustum_positions),
+        colors=cm.viridis(norm_i)[:, :3],  # Use RGB components
+        thickness=cam_thickness,
+    )
+
+    # Add some axes.
+    server.scene.add_frames(
+        [f"{name}/frustum/axes" for name in frame_names],
+        axes_length=camera_frustum_scale * axes_scale * 10,
+        axes_radius=camera_frustum_scale * axes_scale,
+    )
 
     # Initialize frame visibility.
-    for i, frame_node in enumerate(frame_nodes):
-        if gui_show_all_frames.value:
-            frame_node.visible = (i % gui_stride.value == 0)
-        else:
-            frame_node.visible = i == gui_timestep.value
+    if gui_show_all_frames.value:
+        frame_nodes.visible = onp.arange(num_frames) % gui_stride.value == 0
 
-    # Add background frame.
+    # Add background frame. Accumulated backgrounds can have tens of millions of
+    # points, so they're streamed at multiple levels of detail.
     bg_positions = onp.concatenate(bg_positions, axis=0)
     bg_colors = onp.concatenate(bg_colors, axis=0)
-    server.scene.add_point_cloud(
+    server.scene.add_point_cloud_lod(
         name=f"/frames/background",
         points=bg_positions,
         colors=bg_colors,
@@ -273,11 +274,10 @@ def main(
         point_shape="rounded",
     )
 
-    # Playback update loop.
-    prev_timestep = gui_timestep.value
+    # Playback runs in the viewer; we only keep the timestep slider in sync.
     while True:
         if gui_playing.value and not gui_show_all_frames.value:
-            gui_timestep.value = (gui_timestep.value + 1) % num_frames
+            gui_timestep.value = timeline.frame
         time.sleep(1.0 / gui_framerate.value)
 
 